@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+"""
+Benchmark offline de los parsers y generadores de listas
+========================================================
+Mide tiempo, memoria pico y rendimiento (entradas/s) de los parsers del
+repositorio sobre las capturas reales guardadas en debug/ y sobre los
+ficheros generados (eventos_livetv_sx.xml, lista_sportsonlineci.xml, ...).
+No hace ninguna petición de red: las descargas se sustituyen por las
+capturas locales.
+
+Cada benchmark da el mejor tiempo de --repeat muestras; los que tardan
+menos de MIN_SAMPLE_SECONDS se ejecutan en bucle dentro de cada muestra, y
+por debajo de --floor no se comprueba la regresión relativa (es ruido).
+La línea base debe guardarse con las mismas opciones con que se compara.
+
+Uso:
+    python benchmark_parsers.py                    # ejecutar y comparar con la línea base
+    python benchmark_parsers.py --save-baseline    # guardar resultados como línea base
+    python benchmark_parsers.py --only platinsport # filtrar por nombre
+"""
+
+import argparse
+import contextlib
+import glob
+import html
+import io
+import json
+import logging
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from unittest import mock
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEBUG_DIR = os.path.join(BASE_DIR, "debug")
+BASELINE_FILE = os.path.join(BASE_DIR, "benchmark_baseline.json")
+# Duración mínima de cada muestra: las pruebas más cortas se repiten en bucle
+MIN_SAMPLE_SECONDS = 0.05
+MAX_LOOPS = 10000
+
+sys.path.insert(0, BASE_DIR)
+
+
+class FakeResponse:
+    """Respuesta mínima compatible con requests.Response"""
+
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+def load_platinsport_pages(limit):
+    """Capturas de platinsport: páginas diarias + los primeros `limit` popups"""
+    paths = sorted(glob.glob(os.path.join(DEBUG_DIR, "daily_page*.html")))
+    popups = sorted(glob.glob(os.path.join(DEBUG_DIR, "popup_*.html")))
+    paths += popups[:limit] if limit else popups
+    pages = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            pages.append(f.read())
+    return pages
+
+
+def load_livetv_events():
+    root = ET.parse(os.path.join(BASE_DIR, "eventos_livetv_sx.xml")).getroot()
+    return [{child.tag: (child.text or "") for child in evento} for evento in root.findall("evento")]
+
+
+def build_livetv_sport_page(events):
+    """Reconstruye una página allupcomingsports con las filas de eventos_livetv_sx.xml"""
+    rows = []
+    for e in events:
+        path = e["url"].replace("https://livetv.sx", "")
+        rows.append(
+            f'<tr class="evdesc"><td><a href="{path}">{e["nombre"]}</a><br>'
+            f'<span>{e["fecha"]}, {e["hora"]}</span> ({e["competicion"]})</td></tr>'
+        )
+    return "<html><body><h1>Hoy</h1><table>" + "".join(rows) + "</table></body></html>"
+
+
+def load_livetv_streams():
+    root = ET.parse(os.path.join(BASE_DIR, "eventos_livetv_sx_con_reproductores.xml")).getroot()
+    pages = []
+    for evento in root.findall("evento"):
+        streams = evento.findall("streams/stream")
+        if not streams:
+            continue
+        rows = []
+        iframes = {}
+        for s in streams:
+            flag = (s.findtext("idioma") or "").rsplit("/", 1)[-1].replace(".png", "") or "1"
+            original = s.findtext("enlace_original") or ""
+            iframes[original] = (s.findtext("url") or "").replace("\n", "")
+            rows.append(
+                f'<tr><td><img src="/img/linkflag/{flag}.gif"></td>'
+                f'<td><a href="{original}">play</a></td></tr>'
+            )
+        html = f'<html><body><table id="links_block">{"".join(rows)}</table></body></html>'
+        pages.append((evento.findtext("url"), html, iframes))
+    return pages
+
+
+def build_script_pages(limit):
+    """
+    Reconstruye las capturas de platinsport con la estructura que analiza
+    script.extraer_eventos: <div class="myDiv1"> con <p> de liga, <time> y
+    los enlaces acestream de cada partido
+    """
+    import platinsport
+    pages = []
+    for page in load_platinsport_pages(limit):
+        parts = []
+        league = match = None
+        for e in platinsport.parse_html_for_streams_lxml(page):
+            if e.league != league:
+                league, match = e.league, None
+                parts.append(f"<p>{html.escape(e.league)}</p>")
+            if (e.time, e.match) != match:
+                match = (e.time, e.match)
+                parts.append(f'<time datetime="{e.time}">{e.time}</time> {html.escape(e.match)}')
+            parts.append(f'<a href="{e.url}">{html.escape(e.channel or "")}</a>')
+        pages.append(f'<html><body><div class="myDiv1">{"".join(parts)}</div></body></html>')
+    return pages
+
+
+def build_sportsonline_prog():
+    """Reconstruye un prog.txt de sportsonline a partir de lista_sportsonlineci.xml"""
+    root = ET.parse(os.path.join(BASE_DIR, "lista_sportsonlineci.xml")).getroot()
+    day = datetime.now(timezone.utc).strftime("%A").upper()
+    lines = [day]
+    for track in root.findall("track"):
+        title = (track.findtext("title") or "").strip()
+        if len(title) < 7:
+            continue
+        hora, nombre = title[:5], title[6:]
+        for url in track.findall("url"):
+            lines.append(f"{hora}    {nombre} | {url.text.strip()}")
+    for item in root.findall("additional/item"):
+        lines.append(item.text.strip())
+    return "\n".join(lines)
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks: cada uno devuelve (preparar, ejecutar) donde ejecutar()
+# retorna el número de entradas producidas
+# ---------------------------------------------------------------------------
+
+def bench_platinsport(parser_name, limit):
+    def setup():
+        import platinsport
+        pages = load_platinsport_pages(limit)
+        parser = platinsport.PARSERS[parser_name]
+
+        def run():
+            return sum(len(parser(page)) for page in pages)
+        return run
+    return setup
+
+
+def bench_platinsport_write_m3u(limit):
+    def setup():
+        import platinsport
+        from stream_entries import StreamTable
+        entries = StreamTable()
+        for page in load_platinsport_pages(limit):
+            entries.extend(platinsport.parse_html_for_streams_lxml(page))
+        out = os.path.join(tempfile.mkdtemp(), "lista.m3u")
+
+        def run():
+            platinsport.write_m3u(entries, out)
+            return len(entries)
+        return run
+    return setup
+
+
+def bench_platinsport_write_variants(limit):
+    def setup():
+        import platinsport
+        from stream_entries import StreamTable
+        entries = StreamTable()
+        for page in load_platinsport_pages(limit):
+            entries.extend(platinsport.parse_html_for_streams_lxml(page))
+        out = tempfile.mkdtemp()
+
+        def run():
+            entries.write_variants(out, "AGENDA PLATINSPORT", "20:00")
+            return len(entries)
+        return run
+    return setup
+
+
+def bench_league_matcher(limit):
+    def setup():
+        import lxml.html
+        from league_matcher import get_matcher
+        matcher = get_matcher()
+        texts = []
+        for page in load_platinsport_pages(limit):
+            root = lxml.html.document_fromstring(page)
+            texts.extend(p.text_content().strip() for p in root.iter("p"))
+
+        def run():
+            return sum(1 for text in texts if matcher.match(text))
+        return run
+    return setup
+
+
+def bench_script_extraer_eventos(limit):
+    def setup():
+        import script
+        pages = build_script_pages(limit)
+
+        def run():
+            total = 0
+            for page in pages:
+                with mock.patch.object(script.requests, "get", return_value=FakeResponse(page)):
+                    total += len(script.extraer_eventos("https://www.platinsport.com/fixture"))
+            assert total, "script.extraer_eventos no extrajo ningún evento del fixture"
+            return total
+        return run
+    return setup
+
+
+def bench_script_guardar_lista_m3u(max_entries):
+    def setup():
+        import platinsport
+        import script
+        entries = platinsport.parse_html_for_streams_lxml(load_platinsport_pages(0)[0])[:max_entries]
+        eventos = []
+        for e in entries:
+            hora = datetime.strptime(e.time or "00:00", "%H:%M").time()
+            eventos.append({
+                "hora": hora,
+                "nombre": f"{e.league} - {e.match}",
+                "canal": e.channel,
+                "url": e.url,
+            })
+        out = os.path.join(tempfile.mkdtemp(), "lista.m3u")
+
+        def run():
+            # buscar_logo lee logos.xml con ruta relativa y descarga la lista de peticiones
+            with contextlib.ExitStack() as stack:
+                stack.enter_context(mock.patch.object(script.requests, "get", return_value=FakeResponse("")))
+                cwd = os.getcwd()
+                os.chdir(BASE_DIR)
+                stack.callback(os.chdir, cwd)
+                # Cada ejecución parte sin índices de logos cargados (como un proceso nuevo)
+                # y sin la caché persistente de logos
+                if hasattr(script, "LOGO_CACHE"):
+                    stack.enter_context(mock.patch.object(script.LOGO_CACHE, "enabled", False))
+                for loader in ("cargar_indice_archive", "cargar_indice_url", "descargar_peticiones",
+                               "version_archive", "version_url"):
+                    if hasattr(script, loader):
+                        getattr(script, loader).cache_clear()
+                script.guardar_lista_m3u(list(eventos), out)
+            return len(eventos)
+        return run
+    return setup
+
+
+def bench_livetv_extract_events():
+    def setup():
+        import script_lista_livetv_sx as livetv
+        events = load_livetv_events()
+        html = build_livetv_sport_page(events)
+        scraper = livetv.EventScraper()
+        scraper.sports_mapping = {1: "Fútbol"}
+        scraper.session.get = lambda *a, **k: FakeResponse(html)
+
+        def run():
+            with mock.patch.object(livetv.time, "sleep"):
+                return len(scraper.extract_events_from_page(1))
+        return run
+    return setup
+
+
+def bench_livetv_create_xml():
+    def setup():
+        import script_lista_livetv_sx as livetv
+        events = load_livetv_events()
+        scraper = livetv.EventScraper()
+        out = os.path.join(tempfile.mkdtemp(), "eventos.xml")
+
+        def run():
+            return scraper.create_xml(events, out)
+        return run
+    return setup
+
+
+def bench_livetv_extraer_streams():
+    def setup():
+        import script_lista_livetv_sx_reproductores as repro
+        pages = load_livetv_streams()
+        responses = {}
+        for url, html, iframes in pages:
+            responses[url] = html
+            for original, iframe in iframes.items():
+                responses[original] = f'<html><body><iframe src="{iframe}"></iframe></body></html>'
+
+        def fake_get(url, *args, **kwargs):
+            return FakeResponse(responses.get(url, "<html></html>"))
+
+        def run():
+            with mock.patch.object(repro.requests, "get", side_effect=fake_get):
+                return sum(len(repro.extraer_streams_evento(url)) for url, _, _ in pages)
+        return run
+    return setup
+
+
+def bench_sportsonline_generar_lista_xml():
+    def setup():
+        import script_lista_sportsonlineci as sportsonline
+        prog = build_sportsonline_prog()
+        out = os.path.join(tempfile.mkdtemp(), "lista_sportsonlineci.xml")
+
+        def run():
+            agrupados, adicionales = lista = sportsonline.generar_lista_xml(prog)
+            with mock.patch.object(sportsonline, "OUTPUT_FILE", out):
+                sportsonline.guardar_archivo_xml(lista)
+            return sum(len(urls) for urls in agrupados.values()) + len(adicionales)
+        return run
+    return setup
+
+
+def bench_playtorrio_generate_m3u():
+    def setup():
+        import playtorrio
+        with open(os.path.join(BASE_DIR, "playtorrio_events.json"), encoding="utf-8") as f:
+            events = json.load(f)["events"]
+        extractor = playtorrio.PlayTorrioEventsExtractor()
+        extractor.events = events
+        out = os.path.join(tempfile.mkdtemp(), "playtorrio.m3u")
+
+        def run():
+            extractor.generate_m3u(out)
+            return sum(len(e["sources"]) for e in events)
+        return run
+    return setup
+
+
+def build_benchmarks(args):
+    return {
+        "platinsport.parse_html_for_streams": bench_platinsport("bs4", args.limit),
+        "platinsport.parse_html_for_streams_lxml": bench_platinsport("lxml", args.limit),
+        "platinsport.write_m3u": bench_platinsport_write_m3u(args.limit),
+        "StreamTable.write_variants": bench_platinsport_write_variants(args.limit),
+        "LeagueMatcher.match": bench_league_matcher(args.limit),
+        "script.extraer_eventos": bench_script_extraer_eventos(args.limit),
+        "script.guardar_lista_m3u": bench_script_guardar_lista_m3u(args.logo_entries),
+        "EventScraper.extract_events_from_page": bench_livetv_extract_events(),
+        "EventScraper.create_xml": bench_livetv_create_xml(),
+        "extraer_streams_evento": bench_livetv_extraer_streams(),
+        "generar_lista_xml": bench_sportsonline_generar_lista_xml(),
+        "playtorrio.generate_m3u": bench_playtorrio_generate_m3u(),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Ejecución
+# ---------------------------------------------------------------------------
+
+def measure(run, repeat, min_sample=MIN_SAMPLE_SECONDS):
+    """
+    Toma `repeat` muestras de run() sin salida por consola y se queda con la
+    mejor; cada muestra repite run() en bucle hasta durar al menos min_sample
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        entries = run()
+        first = time.perf_counter() - t0
+    loops = min(MAX_LOOPS, math.ceil(min_sample / first)) if 0 < first < min_sample else 1
+
+    timings = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            for _ in range(loops):
+                entries = run()
+            timings.append((time.perf_counter() - t0) / loops)
+
+    # Memoria en una pasada aparte para no distorsionar los tiempos
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    seconds = min(timings)
+    return {
+        "seconds": round(seconds, 6),
+        "loops": loops,
+        "entries": entries,
+        "entries_per_s": round(entries / seconds, 1) if seconds > 0 else 0.0,
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def load_baseline(path):
+    if not os.path.isfile(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("results", {})
+
+
+def save_baseline(path, results):
+    data = {
+        "generated_at": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline de parsers y generadores")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por benchmark (default: 3)")
+    parser.add_argument("--limit", type=int, default=40, help="Número de popups de debug/ a usar (0 = todos)")
+    parser.add_argument("--logo-entries", type=int, default=25,
+                        help="Entradas para guardar_lista_m3u, que busca logos por entrada (default: 25)")
+    parser.add_argument("--only", type=str, default="", help="Ejecutar solo benchmarks cuyo nombre contenga este texto")
+    parser.add_argument("--baseline", type=str, default=BASELINE_FILE, help="Fichero de línea base")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Ralentización relativa que se considera regresión (default: 0.25)")
+    parser.add_argument("--floor", type=float, default=0.005,
+                        help="Por debajo de estos segundos no se comprueba la regresión (default: 0.005)")
+    parser.add_argument("--save-baseline", action="store_true", help="Guardar los resultados como línea base")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    baseline = load_baseline(args.baseline)
+    results = {}
+    regressions = []
+
+    print("=" * 90)
+    print(f"{'BENCHMARK':42} {'TIEMPO':>10} {'ENTRADAS':>9} {'ENTR/S':>11} {'PICO KB':>10}  ESTADO")
+    print("=" * 90)
+
+    for name, setup in build_benchmarks(args).items():
+        if args.only and args.only not in name:
+            continue
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                run = setup()
+        except ImportError as e:
+            print(f"{name:42} {'—':>10} {'—':>9} {'—':>11} {'—':>10}  omitido ({e.name} no instalado)")
+            continue
+
+        result = measure(run, args.repeat)
+        results[name] = result
+
+        status = "nuevo"
+        base = baseline.get(name)
+        if base and base.get("seconds"):
+            change = result["seconds"] / base["seconds"] - 1
+            if max(result["seconds"], base["seconds"]) < args.floor:
+                status = f"ok {change:+.0%} (< {args.floor * 1000:.0f} ms)"
+            elif change > args.threshold:
+                status = f"⚠️  REGRESIÓN {change:+.0%}"
+                regressions.append(name)
+            else:
+                status = f"ok {change:+.0%}"
+
+        print(f"{name:42} {result['seconds']:>9.3f}s {result['entries']:>9} "
+              f"{result['entries_per_s']:>11.1f} {result['peak_kb']:>10.1f}  {status}")
+
+    print("=" * 90)
+
+    if args.save_baseline:
+        merged = dict(baseline)
+        merged.update(results)
+        save_baseline(args.baseline, merged)
+        print(f"💾 Línea base guardada en {args.baseline}")
+
+    if regressions:
+        print(f"❌ {len(regressions)} regresiones respecto a la línea base: {', '.join(regressions)}")
+        sys.exit(1)
+    print("✅ Sin regresiones")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,533 @@
+"""
+Servicio de navegador persistente
+=================================
+Mantiene navegadores Chromium (Playwright) ya arrancados, cada uno con un
+contexto "caliente", y los pone a disposición de los scrapers mediante una
+pequeña API HTTP local. Así los scrapers se ahorran el arranque en frío del
+navegador en cada ejecución.
+
+- Cada worker es un hilo con su propio Playwright, navegador y contexto
+- Los contextos se reciclan cada N trabajos o tras un error
+- Un chequeo de salud periódico relanza el navegador si ha dejado de responder
+
+API (solo en 127.0.0.1):
+    GET  /health   estado de los workers
+    POST /jobs     ejecuta un trabajo JSON y devuelve el resultado
+
+Trabajos:
+    {"action": "capture", "url": ..., "capture": "source-list.php",
+     "click": "<selector>", "popup": true, "cookies": [...],
+     "block_types": [...], "allow_domains": [...], "deny_domains": [...],
+     "timeout_ms": 15000}
+        -> {"ok": true, "body": "<respuesta capturada>", "stats": {...}}
+
+    {"action": "selector", "url": ..., "selector": "textarea",
+     "property": "value", "timeout_ms": 30000}
+        -> {"ok": true, "body": "<valor de la propiedad>"}
+
+Uso:
+    python browser_service.py serve [--port 8765] [--workers 2]
+    python browser_service.py health
+
+Configuración por variables de entorno:
+    BROWSER_SERVICE_URL        URL del servicio para los clientes; platinsport.py
+                               solo usa el servicio si está definida (o con
+                               PLATINSPORT_MODE=service)
+    BROWSER_SERVICE_WORKERS    navegadores en el pool (default: 2)
+    BROWSER_SERVICE_RECYCLE    trabajos por contexto antes de reciclarlo (default: 20)
+    BROWSER_SERVICE_HEALTH     segundos entre chequeos de salud (default: 30)
+"""
+
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8765
+SERVICE_URL = os.environ.get("BROWSER_SERVICE_URL", f"http://127.0.0.1:{DEFAULT_PORT}")
+WORKERS = int(os.environ.get("BROWSER_SERVICE_WORKERS", "2"))
+RECYCLE_AFTER = int(os.environ.get("BROWSER_SERVICE_RECYCLE", "20"))
+HEALTH_INTERVAL = float(os.environ.get("BROWSER_SERVICE_HEALTH", "30"))
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/131.0.0.0 Safari/537.36"
+)
+
+LAUNCH_ARGS = [
+    "--no-sandbox",
+    "--disable-setuid-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+]
+
+
+class CaptureRouter:
+    """
+    Interceptor de peticiones de una captura con navegador.
+    Captura la respuesta cuya URL contiene `capture`, bloquea recursos por
+    tipo y dominio y, una vez capturada, aborta cualquier otra petición.
+    Los scripts y peticiones XHR bloqueados se responden vacíos en lugar de
+    abortarse para que la detección de adblock de las webs no salte.
+    """
+
+    STUB_TYPES = {"script", "xhr", "fetch"}
+
+    def __init__(self, capture, block_types=(), allow_domains=(), deny_domains=()):
+        self.capture = capture
+        self.block_types = set(block_types)
+        self.allow_domains = list(allow_domains)
+        self.deny_domains = list(deny_domains)
+        self.raw_html = ""
+        self.blocked = {}
+        self.passed = 0
+        self.bytes_loaded = 0
+
+    @staticmethod
+    def _host_in(host: str, domains) -> bool:
+        return any(host == d or host.endswith("." + d) for d in domains)
+
+    def decide(self, url: str, resource_type: str) -> str:
+        """Retorna la acción para una petición: capture, continue, abort o stub"""
+        if self.capture and self.capture in url:
+            return "capture"
+        if self.raw_html:
+            return "abort"
+
+        host = (urllib.parse.urlsplit(url).hostname or "").lower()
+        if self._host_in(host, self.deny_domains):
+            return "stub" if resource_type in self.STUB_TYPES else "abort"
+        if self.allow_domains and not self._host_in(host, self.allow_domains):
+            return "stub" if resource_type in self.STUB_TYPES else "abort"
+        if resource_type in self.block_types:
+            return "abort"
+        return "continue"
+
+    def on_capture(self, body: str):
+        """Se llama al capturar la respuesta (para guardar depuración, etc.)"""
+
+    def handle_route(self, route, request):
+        action = self.decide(request.url, request.resource_type)
+
+        if action == "capture":
+            print(f"[4] Interceptando: {request.url}")
+
+            response = route.fetch()
+            body = response.text()
+
+            self.raw_html = body
+            print(f"[5] HTML capturado: {len(body)} bytes")
+            self.on_capture(body)
+
+            route.fulfill(response=response)
+        elif action == "continue":
+            self.passed += 1
+            route.continue_()
+        else:
+            key = "tras captura" if self.raw_html else request.resource_type
+            self.blocked[key] = self.blocked.get(key, 0) + 1
+            if action == "stub":
+                route.fulfill(status=200, body="")
+            else:
+                route.abort()
+
+    def on_request_finished(self, request):
+        """Acumula los bytes realmente descargados por las peticiones permitidas"""
+        try:
+            sizes = request.sizes()
+            self.bytes_loaded += sizes.get("responseBodySize", 0) + sizes.get("responseHeadersSize", 0)
+        except Exception:
+            pass
+
+    def wait_for_capture(self, page, timeout_ms: int = 15000) -> bool:
+        """Espera (procesando eventos del navegador) hasta capturar el HTML"""
+        waited = 0
+        while not self.raw_html and waited < timeout_ms:
+            page.wait_for_timeout(100)
+            waited += 100
+        return bool(self.raw_html)
+
+    def summary(self) -> dict:
+        return {"passed": self.passed, "bytes_loaded": self.bytes_loaded, "blocked": dict(self.blocked)}
+
+    def print_summary(self, stats: dict = None):
+        stats = stats or self.summary()
+        blocked = stats.get("blocked", {})
+        print(f"[i] Peticiones permitidas: {stats.get('passed', 0)} "
+              f"({stats.get('bytes_loaded', 0) / 1024:.1f} KB descargados)")
+        print(f"[i] Peticiones bloqueadas: {sum(blocked.values())}")
+        for key, count in sorted(blocked.items(), key=lambda x: x[1], reverse=True):
+            print(f"     {key}: {count}")
+
+
+# ---------------------------------------------------------------------------
+# Servidor
+# ---------------------------------------------------------------------------
+
+class BrowserWorker(threading.Thread):
+    """Hilo con un navegador y un contexto caliente que atiende trabajos de la cola"""
+
+    def __init__(self, index: int, jobs: queue.Queue, recycle_after: int = RECYCLE_AFTER,
+                 health_interval: float = HEALTH_INTERVAL):
+        super().__init__(name=f"browser-worker-{index}", daemon=True)
+        self.index = index
+        self.jobs = jobs
+        self.recycle_after = recycle_after
+        self.health_interval = health_interval
+        self.ready = threading.Event()
+        self.playwright = None
+        self.browser = None
+        self.context = None
+        self.jobs_done = 0
+        self.context_jobs = 0
+        self.recycles = 0
+        self.restarts = 0
+        self.healthy = False
+        self.last_check = 0.0
+        self.last_error = ""
+
+    # --- ciclo de vida del navegador ---
+
+    def _launch(self):
+        self.browser = self.playwright.chromium.launch(headless=True, args=LAUNCH_ARGS)
+        self._new_context()
+        self.healthy = True
+
+    def _new_context(self):
+        self.context = self.browser.new_context(
+            user_agent=USER_AGENT,
+            viewport={"width": 1920, "height": 1080},
+            locale="en-US",
+            java_script_enabled=True,
+            ignore_https_errors=True,
+        )
+        # Calentar el contexto: el primer about:blank ya crea el proceso de render
+        page = self.context.new_page()
+        page.goto("about:blank")
+        page.close()
+        self.context_jobs = 0
+
+    def _recycle_context(self):
+        try:
+            self.context.close()
+        except Exception:
+            pass
+        try:
+            self._new_context()
+            self.recycles += 1
+        except Exception as e:
+            self.last_error = f"reciclado: {e}"
+            self._restart()
+
+    def _restart(self):
+        try:
+            self.browser.close()
+        except Exception:
+            pass
+        try:
+            self._launch()
+            self.restarts += 1
+        except Exception as e:
+            self.healthy = False
+            self.last_error = f"relanzamiento: {e}"
+            print(f"❌ [{self.name}] {self.last_error}")
+
+    def _health_check(self):
+        self.last_check = time.time()
+        try:
+            if not self.browser.is_connected():
+                raise RuntimeError("navegador desconectado")
+            page = self.context.new_page()
+            page.evaluate("1 + 1")
+            page.close()
+            self.healthy = True
+        except Exception as e:
+            self.last_error = f"chequeo de salud: {e}"
+            print(f"⚠ [{self.name}] {self.last_error}; relanzando navegador")
+            self.healthy = False
+            self._restart()
+
+    def run(self):
+        from playwright.sync_api import sync_playwright
+
+        with sync_playwright() as playwright:
+            self.playwright = playwright
+            try:
+                self._launch()
+                print(f"✓ [{self.name}] navegador listo")
+            except Exception as e:
+                self.last_error = f"arranque: {e}"
+                print(f"❌ [{self.name}] {self.last_error}")
+            self.ready.set()
+
+            while True:
+                try:
+                    item = self.jobs.get(timeout=self.health_interval)
+                except queue.Empty:
+                    self._health_check()
+                    continue
+                if item is None:
+                    break
+
+                job, future = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if not self.healthy or not self.browser.is_connected():
+                    self._restart()
+
+                t0 = time.perf_counter()
+                try:
+                    result = self._run_job(job)
+                    result.update(ok=True, worker=self.index, elapsed=round(time.perf_counter() - t0, 3))
+                    future.set_result(result)
+                except Exception as e:
+                    self.last_error = str(e)
+                    future.set_result({"ok": False, "error": str(e), "worker": self.index,
+                                       "elapsed": round(time.perf_counter() - t0, 3)})
+                    self._recycle_context()
+                else:
+                    self.jobs_done += 1
+                    self.context_jobs += 1
+                    if self.context_jobs >= self.recycle_after:
+                        self._recycle_context()
+
+            try:
+                self.browser.close()
+            except Exception:
+                pass
+
+    # --- trabajos ---
+
+    def _run_job(self, job: dict) -> dict:
+        action = job.get("action")
+        try:
+            if action == "capture":
+                return self._run_capture(job)
+            if action == "selector":
+                return self._run_selector(job)
+            raise ValueError(f"Acción desconocida: {action}")
+        finally:
+            for page in list(self.context.pages):
+                page.close()
+
+    def _run_capture(self, job: dict) -> dict:
+        router = CaptureRouter(
+            job.get("capture", ""),
+            block_types=job.get("block_types", ()),
+            allow_domains=job.get("allow_domains", ()),
+            deny_domains=job.get("deny_domains", ()),
+        )
+        if job.get("cookies"):
+            self.context.add_cookies(job["cookies"])
+
+        self.context.on("requestfinished", router.on_request_finished)
+        self.context.route("**/*", router.handle_route)
+        try:
+            page = self.context.new_page()
+            page.goto(job["url"], timeout=job.get("goto_timeout_ms", 60000), wait_until="domcontentloaded")
+            target = page
+            if job.get("click"):
+                button = page.locator(job["click"]).first
+                button.wait_for(state="visible", timeout=10000)
+                if job.get("popup"):
+                    with page.expect_popup(timeout=30000) as popup_info:
+                        button.click()
+                    target = popup_info.value
+                else:
+                    button.click()
+            router.wait_for_capture(target, job.get("timeout_ms", 15000))
+        finally:
+            self.context.unroute("**/*", router.handle_route)
+            self.context.remove_listener("requestfinished", router.on_request_finished)
+
+        return {"body": router.raw_html, "stats": router.summary()}
+
+    def _run_selector(self, job: dict) -> dict:
+        timeout = job.get("timeout_ms", 30000)
+        page = self.context.new_page()
+        page.goto(job["url"], timeout=timeout, wait_until="domcontentloaded")
+        element = page.wait_for_selector(job["selector"], timeout=timeout, state="attached")
+        prop = job.get("property", "value")
+        if prop == "html":
+            body = page.content()
+        else:
+            body = element.evaluate("(el, prop) => el[prop]", prop) or ""
+        return {"body": body}
+
+    def status(self) -> dict:
+        return {
+            "worker": self.index,
+            "alive": self.is_alive(),
+            "healthy": self.healthy,
+            "jobs": self.jobs_done,
+            "context_jobs": self.context_jobs,
+            "recycles": self.recycles,
+            "restarts": self.restarts,
+            "last_check": self.last_check,
+            "last_error": self.last_error,
+        }
+
+
+class BrowserService:
+    """Pool de workers con una cola de trabajos compartida"""
+
+    def __init__(self, workers: int = WORKERS, recycle_after: int = RECYCLE_AFTER,
+                 health_interval: float = HEALTH_INTERVAL):
+        self.jobs = queue.Queue()
+        self.workers = [BrowserWorker(i, self.jobs, recycle_after, health_interval)
+                        for i in range(max(1, workers))]
+        self.started_at = time.time()
+
+    def start(self, timeout: float = 120):
+        for worker in self.workers:
+            worker.start()
+        for worker in self.workers:
+            worker.ready.wait(timeout)
+
+    def stop(self):
+        for _ in self.workers:
+            self.jobs.put(None)
+        for worker in self.workers:
+            worker.join(timeout=30)
+
+    def submit(self, job: dict, timeout: float = 180) -> dict:
+        future = Future()
+        self.jobs.put((job, future))
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            future.cancel()
+            return {"ok": False, "error": f"tiempo de espera agotado ({timeout}s)"}
+
+    def health(self) -> dict:
+        workers = [w.status() for w in self.workers]
+        healthy = sum(1 for w in workers if w["alive"] and w["healthy"])
+        return {
+            "status": "ok" if healthy == len(workers) else ("degraded" if healthy else "down"),
+            "uptime": round(time.time() - self.started_at, 1),
+            "queue": self.jobs.qsize(),
+            "workers": workers,
+        }
+
+
+def make_handler(service: BrowserService):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, payload: dict):
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/health":
+                health = service.health()
+                self._send(200 if health["status"] != "down" else 503, health)
+            else:
+                self._send(404, {"ok": False, "error": "no encontrado"})
+
+        def do_POST(self):
+            if self.path != "/jobs":
+                self._send(404, {"ok": False, "error": "no encontrado"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", "0"))
+                job = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError as e:
+                self._send(400, {"ok": False, "error": f"JSON inválido: {e}"})
+                return
+            self._send(200, service.submit(job, timeout=job.get("service_timeout", 180)))
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(port: int = DEFAULT_PORT, workers: int = WORKERS):
+    service = BrowserService(workers=workers)
+    print(f"🚀 Arrancando {len(service.workers)} navegadores...")
+    service.start()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(service))
+    print(f"✓ Servicio de navegador en http://127.0.0.1:{port} (Ctrl+C para salir)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+        print("✓ Servicio detenido")
+
+
+# ---------------------------------------------------------------------------
+# Cliente
+# ---------------------------------------------------------------------------
+
+class BrowserServiceClient:
+    """Cliente de la API local del servicio de navegador"""
+
+    def __init__(self, base_url: str = SERVICE_URL):
+        self.base_url = base_url.rstrip("/")
+
+    def health(self, timeout: float = 2) -> dict:
+        try:
+            with urllib.request.urlopen(self.base_url + "/health", timeout=timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return json.loads(e.read() or b"{}")
+        except (OSError, ValueError):
+            return {}
+
+    def available(self) -> bool:
+        return self.health().get("status") in ("ok", "degraded")
+
+    def run(self, job: dict, timeout: float = 180) -> dict:
+        data = json.dumps(dict(job, service_timeout=timeout)).encode("utf-8")
+        request = urllib.request.Request(
+            self.base_url + "/jobs", data=data, headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout + 10) as response:
+                return json.loads(response.read())
+        except (OSError, ValueError) as e:
+            return {"ok": False, "error": str(e)}
+
+    def capture(self, url: str, capture: str, **options) -> dict:
+        return self.run(dict(options, action="capture", url=url, capture=capture))
+
+    def read_selector(self, url: str, selector: str, prop: str = "value", timeout_ms: int = 30000) -> dict:
+        return self.run({"action": "selector", "url": url, "selector": selector,
+                         "property": prop, "timeout_ms": timeout_ms})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio de navegador persistente")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve_parser = sub.add_parser("serve", help="Arrancar el servicio")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--workers", type=int, default=WORKERS)
+    sub.add_parser("health", help="Consultar el estado del servicio")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.port, args.workers)
+        return 0
+
+    health = BrowserServiceClient().health()
+    print(json.dumps(health, indent=2, ensure_ascii=False) if health else "❌ Servicio no disponible")
+    return 0 if health.get("status") == "ok" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Descargas asíncronas con cortesía por host
+==========================================
+Sustituye los time.sleep() a ciegas entre peticiones por un planificador:
+
+- una única sesión aiohttp con keep-alive (las conexiones se reutilizan)
+- límite de peticiones simultáneas en total y por host
+- separación mínima entre peticiones al mismo host y backoff ante 429/502/503/504
+  mediante el limitador adaptativo (rate_limiter)
+
+Uso:
+    async with PoliteCrawler(headers=headers) as crawler:
+        status, html = await crawler.fetch(url)
+        pages = await crawler.fetch_many(urls)
+
+Configuración por variables de entorno:
+    CRAWLER_TOTAL      peticiones simultáneas en total (default: 16)
+    CRAWLER_PER_HOST   peticiones simultáneas por host (default: 4)
+    CRAWLER_RPS        peticiones/s iniciales por host (default: 4)
+    CRAWLER_TIMEOUT    timeout por petición en s (default: 30)
+    CRAWLER_RETRIES    reintentos ante saturación o error de red (default: 2)
+"""
+
+import asyncio
+import os
+from urllib.parse import urlparse
+
+from rate_limiter import AdaptiveRateLimiter
+
+TOTAL = int(os.environ.get("CRAWLER_TOTAL", "16"))
+PER_HOST = int(os.environ.get("CRAWLER_PER_HOST", "4"))
+RPS = float(os.environ.get("CRAWLER_RPS", "4"))
+TIMEOUT = float(os.environ.get("CRAWLER_TIMEOUT", "30"))
+RETRIES = int(os.environ.get("CRAWLER_RETRIES", "2"))
+
+# Respuestas que indican saturación del host: frenan y se reintentan.
+# Un 500 de una página concreta se devuelve sin penalizar al resto del host.
+THROTTLE_STATUSES = {429, 502, 503, 504}
+
+
+class PoliteCrawler:
+    """Sesión aiohttp compartida con límites por host y separación mínima entre peticiones"""
+
+    def __init__(self, headers: dict = None, total: int = TOTAL, per_host: int = PER_HOST,
+                 rps: float = RPS, timeout: float = TIMEOUT, retries: int = RETRIES,
+                 verify_ssl: bool = False, state_path: str = None):
+        self.headers = headers or {}
+        self.total = total
+        self.per_host = per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.verify_ssl = verify_ssl
+        # Sin fichero de estado por defecto: la tasa se aprende en cada ejecución
+        self.limiter = AdaptiveRateLimiter(state_path=state_path, initial_rps=rps, max_rps=max(rps, 1),
+                                           throttle_statuses=THROTTLE_STATUSES)
+        self.session = None
+        self._global = None
+        self._hosts = {}
+        self.stats = {"requests": 0, "errors": 0, "bytes": 0}
+
+    async def __aenter__(self):
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(limit=self.total, limit_per_host=self.per_host,
+                                         ssl=None if self.verify_ssl else False,
+                                         keepalive_timeout=60)
+        self.session = aiohttp.ClientSession(connector=connector, headers=self.headers,
+                                             timeout=aiohttp.ClientTimeout(total=self.timeout))
+        self._global = asyncio.Semaphore(self.total)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+        self.limiter.save()
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self.per_host)
+        return self._hosts[host]
+
+    async def fetch(self, url: str, headers: dict = None):
+        """GET cortés; retorna (status, texto) o (None, '') si falla la conexión"""
+        for attempt in range(self.retries + 1):
+            # Primero la espera del limitador (backoff incluido) sin ocupar
+            # plazas: un host en espera no bloquea las peticiones a otros hosts
+            await self.limiter.acquire(url)
+            async with self._global, self._host_limit(url):
+                try:
+                    async with self.session.get(url, headers=headers) as response:
+                        text = await response.text(errors="replace")
+                        status = response.status
+                        retry_after = response.headers.get("Retry-After")
+                except Exception as e:
+                    status, text, retry_after = None, "", None
+                    error = e
+            self.stats["requests"] += 1
+            delay = self.limiter.record(url, status, retry_after)
+            if not delay:
+                self.stats["bytes"] += len(text)
+                return status, text
+            if attempt == self.retries:
+                break
+        self.stats["errors"] += 1
+        if status is None:
+            print(f"⚠️  Error descargando {url}: {error}")
+        return status, ""
+
+    async def fetch_many(self, urls) -> list:
+        """Descarga todas las URLs respetando los límites; mismo orden que la entrada"""
+        return await asyncio.gather(*(self.fetch(url) for url in urls))
+
+    def print_stats(self):
+        s = self.stats
+        print(f"🕸  Crawler: {s['requests']} peticiones, {s['errors']} fallidas, "
+              f"{s['bytes'] / 1024:.0f} KB")
+        self.limiter.print_stats()
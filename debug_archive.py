@@ -0,0 +1,294 @@
+"""
+Archivo de artefactos de depuración
+===================================
+Guarda las páginas capturadas (HTML de depuración) sin bloquear la captura:
+
+- submit() solo encola; un hilo en segundo plano comprime y escribe
+- los ficheros se guardan comprimidos (zstd si está instalado, si no gzip)
+  y direccionados por contenido (sha256): una página idéntica se guarda una vez
+- index.json relaciona cada ejecución (marca de tiempo) con sus artefactos
+- al cerrar se aplica la rotación por antigüedad y por tamaño total
+
+Configuración por variables de entorno:
+    DEBUG_ARCHIVE_DIR          directorio del archivo (default: debug/archive)
+    DEBUG_ARCHIVE_MAX_MB       tamaño total máximo en MB (default: 50)
+    DEBUG_ARCHIVE_MAX_DAYS     antigüedad máxima de una ejecución (default: 7)
+    DEBUG_ARCHIVE_COMPRESSION  auto | zstd | gzip (default: auto)
+
+Uso desde línea de comandos:
+    python debug_archive.py list
+    python debug_archive.py show <hash> > pagina.html
+    python debug_archive.py import debug/*.html
+    python debug_archive.py rotate
+"""
+
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ARCHIVE_DIR = os.environ.get("DEBUG_ARCHIVE_DIR", os.path.join("debug", "archive"))
+MAX_BYTES = int(float(os.environ.get("DEBUG_ARCHIVE_MAX_MB", "50")) * 1024 * 1024)
+MAX_AGE_DAYS = float(os.environ.get("DEBUG_ARCHIVE_MAX_DAYS", "7"))
+COMPRESSION = os.environ.get("DEBUG_ARCHIVE_COMPRESSION", "auto").lower()
+
+INDEX_FILE = "index.json"
+EXTENSIONS = {"zstd": ".zst", "gzip": ".gz"}
+
+
+def _compress(data: bytes, method: str) -> bytes:
+    if method == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _decompress(data: bytes, path: str) -> bytes:
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError("Se necesita el paquete 'zstandard' para leer " + path)
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class DebugArchive:
+    """Archivo comprimido de capturas con escritura en segundo plano"""
+
+    def __init__(self, root: str = ARCHIVE_DIR, max_bytes: int = MAX_BYTES,
+                 max_age_days: float = MAX_AGE_DAYS, compression: str = COMPRESSION):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        if compression == "auto":
+            compression = "zstd" if zstandard is not None else "gzip"
+        if compression == "zstd" and zstandard is None:
+            print("⚠ zstandard no está instalado, usando gzip")
+            compression = "gzip"
+        self.compression = compression
+        self.run_id = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self._pending = []
+        self.stats = {"submitted": 0, "stored": 0, "deduplicated": 0,
+                      "raw_bytes": 0, "stored_bytes": 0}
+
+    # ------------------------------------------------------------------
+    # Captura (no bloqueante)
+    # ------------------------------------------------------------------
+
+    def submit(self, name: str, data, plain_copy: str = None):
+        """
+        Encola un artefacto. `plain_copy` escribe además una copia sin
+        comprimir (p.ej. la última página capturada) desde el hilo de fondo.
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        with self._lock:
+            if self._closed:
+                return
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name="debug-archive", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+        self.stats["submitted"] += 1
+        self._queue.put((name, data, plain_copy, time.time()))
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            try:
+                self._store(*item)
+            except Exception as e:
+                print(f"⚠ Error guardando artefacto de depuración {item[0]}: {e}")
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest + EXTENSIONS[self.compression])
+
+    def _find_object(self, digest: str):
+        for ext in EXTENSIONS.values():
+            path = os.path.join(self.root, "objects", digest[:2], digest + ext)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _store(self, name, data, plain_copy, captured_at):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._find_object(digest)
+        if path:
+            self.stats["deduplicated"] += 1
+        else:
+            path = self._object_path(digest)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            compressed = _compress(data, self.compression)
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(compressed)
+            os.replace(tmp, path)
+            self.stats["stored"] += 1
+            self.stats["stored_bytes"] += len(compressed)
+        self.stats["raw_bytes"] += len(data)
+
+        if plain_copy:
+            os.makedirs(os.path.dirname(plain_copy) or ".", exist_ok=True)
+            with open(plain_copy, "wb") as f:
+                f.write(data)
+
+        self._record(name, digest, path, len(data), captured_at)
+
+    # ------------------------------------------------------------------
+    # Índice
+    # ------------------------------------------------------------------
+
+    def _index_path(self) -> str:
+        return os.path.join(self.root, INDEX_FILE)
+
+    def load_index(self) -> dict:
+        try:
+            with open(self._index_path(), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index: dict):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self._index_path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp, self._index_path())
+
+    def _record(self, name, digest, path, size, captured_at):
+        self._pending.append({
+            "name": name,
+            "sha256": digest,
+            "path": os.path.relpath(path, self.root),
+            "size": size,
+            "captured_at": datetime.fromtimestamp(captured_at, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        })
+
+    # ------------------------------------------------------------------
+    # Cierre y rotación
+    # ------------------------------------------------------------------
+
+    def close(self):
+        """Vacía la cola, actualiza el índice y aplica la rotación"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is None:
+            return
+        self._queue.put(None)
+        thread.join()
+
+        index = self.load_index()
+        index.setdefault(self.run_id, []).extend(self._pending)
+        self._pending = []
+        self.rotate(index)
+        s = self.stats
+        print(f"🗄 Archivo de depuración: {s['stored']} guardados, {s['deduplicated']} duplicados, "
+              f"{s['raw_bytes'] / 1024:.0f} KB -> {s['stored_bytes'] / 1024:.0f} KB ({self.root})")
+
+    def rotate(self, index: dict = None):
+        """Elimina ejecuciones antiguas y las más viejas si se supera el tamaño máximo"""
+        if index is None:
+            index = self.load_index()
+        now = datetime.now(timezone.utc)
+
+        def age_days(run_id):
+            try:
+                ts = datetime.strptime(run_id, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+            except ValueError:
+                return float("inf")
+            return (now - ts).total_seconds() / 86400
+
+        runs = sorted(index)
+        for run_id in runs:
+            if run_id != self.run_id and age_days(run_id) > self.max_age_days:
+                del index[run_id]
+
+        removed = self._collect_garbage(index)
+        while self._total_size() > self.max_bytes and len(index) > 1:
+            del index[min(index)]
+            removed += self._collect_garbage(index)
+
+        self._save_index(index)
+        if removed:
+            print(f"🗄 Rotación: {removed} artefactos eliminados")
+
+    def _objects(self):
+        base = os.path.join(self.root, "objects")
+        for dirpath, _, files in os.walk(base):
+            for name in files:
+                yield os.path.join(dirpath, name)
+
+    def _total_size(self) -> int:
+        return sum(os.path.getsize(p) for p in self._objects())
+
+    def _collect_garbage(self, index: dict) -> int:
+        """Borra los objetos que ya no referencia ninguna ejecución"""
+        referenced = {os.path.normpath(os.path.join(self.root, a["path"]))
+                      for artifacts in index.values() for a in artifacts}
+        removed = 0
+        for path in list(self._objects()):
+            if os.path.normpath(path) not in referenced:
+                os.remove(path)
+                removed += 1
+        return removed
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def read(self, digest: str) -> bytes:
+        path = self._find_object(digest)
+        if path is None:
+            matches = [p for p in self._objects() if os.path.basename(p).startswith(digest)]
+            if len(matches) != 1:
+                raise KeyError(digest)
+            path = matches[0]
+        with open(path, "rb") as f:
+            return _decompress(f.read(), path)
+
+
+def main(argv):
+    archive = DebugArchive()
+    command = argv[1] if len(argv) > 1 else "list"
+
+    if command == "list":
+        for run_id, artifacts in sorted(archive.load_index().items()):
+            print(f"{run_id}: {len(artifacts)} artefactos")
+            for a in artifacts:
+                print(f"  {a['sha256'][:12]}  {a['size']:>9}  {a['name']}")
+    elif command == "show" and len(argv) == 3:
+        sys.stdout.buffer.write(archive.read(argv[2]))
+    elif command == "import" and len(argv) > 2:
+        for path in argv[2:]:
+            with open(path, "rb") as f:
+                archive.submit(os.path.basename(path), f.read())
+        archive.close()
+    elif command == "rotate":
+        archive.rotate()
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
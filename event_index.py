@@ -0,0 +1,488 @@
+"""
+Índice canónico de eventos entre proveedores
+============================================
+Cada proveedor publica su propia lista con su propia forma de nombrar los
+eventos. Este módulo las une en un solo almacén de eventos y una sola
+lista M3U:
+
+- normalización de títulos: separadores "vs" / "v" / "x" / "-" / "–",
+  acentos, sufijos de club (FC, CF...) y alias de equipos y países
+- bloqueo por franja de 30 minutos y deporte: cada evento solo se compara
+  con los eventos canónicos de su franja y de las franjas vecinas, así que
+  el coste crece casi linealmente con el número de proveedores
+- puntuación aproximada por equipos (sin importar el orden local/visitante)
+- unión de las fuentes de stream de todos los proveedores en el evento
+  canónico
+
+Proveedores (se leen sus ficheros generados, en este orden de prioridad):
+    platinsport     lista.m3u
+    playtorrio      playtorrio_events.json
+    livetv          eventos_livetv_sx_con_reproductores.xml / eventos_livetv_sx.xml
+    sportsonline    lista_sportsonlineci.xml (horas de UK)
+    agenda          lista_agenda_DEPORTE-LIBRE.FANS.xml
+
+Uso:
+    python event_index.py                  # eventos_unificados.json + .m3u
+    python event_index.py --day 2025-08-08 # fecha para las listas que solo traen la hora
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+import xml.etree.ElementTree as ET
+from collections import Counter, defaultdict
+from datetime import datetime, date, timedelta
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+from league_matcher import COUNTRY_QUALIFIERS, get_matcher, normalize
+from stream_entries import ACESTREAM_PLAYER, ACESTREAM_PREFIX
+from time_zones import UK_TZ, convert_wall_time, localize, parse_fecha_es, to_spain
+
+OUTPUT_JSON = "eventos_unificados.json"
+OUTPUT_M3U = "eventos_unificados.m3u"
+
+BUCKET_MINUTES = 30
+# Diferencia máxima de hora de inicio entre dos listados del mismo evento
+TIME_TOLERANCE_MINUTES = int(os.environ.get("EVENT_INDEX_TOLERANCE", "30"))
+MATCH_THRESHOLD = float(os.environ.get("EVENT_INDEX_THRESHOLD", "0.8"))
+
+# Separador entre equipos: "A vs B", "A v B", "A x B", "A - B", "A – B", "A @ B"
+_TEAM_SEP = re.compile(r"\s+(?:vs\.?|v\.?|x|@|-)\s+|\s*[–—]\s*", re.IGNORECASE)
+_TIME_RE = re.compile(r"^(\d{1,2}):(\d{2})$")
+
+# Palabras que no distinguen a un equipo
+FILLER_WORDS = {"fc", "cf", "sc", "ac", "afc", "cd", "ud", "sd", "club", "de", "the", "sk", "fk", "bc"}
+# Marcas que sí distinguen equipos con el mismo nombre (femenino, sub-20, filiales...)
+MARKER_WORDS = {"women", "u17", "u18", "u19", "u20", "u21", "u23", "ii", "b", "reserves"}
+# Variantes de la marca femenina ("(M)" = mujeres en livetv)
+WOMEN_WORDS = {"w", "woman", "fem", "femenino", "feminino", "ladies", "m", "mujeres"}
+_SUB_RE = re.compile(r"\bsub (\d{2})\b")
+
+TEAM_ALIASES = {
+    "man utd": "manchester united", "man united": "manchester united",
+    "man city": "manchester city", "spurs": "tottenham", "tottenham hotspur": "tottenham",
+    "wolves": "wolverhampton", "wolverhampton wanderers": "wolverhampton",
+    "nottm forest": "nottingham forest", "west ham united": "west ham",
+    "newcastle united": "newcastle", "brighton hove albion": "brighton",
+    "psg": "paris saint germain", "paris sg": "paris saint germain",
+    # Aquí la palabra "de relleno" es lo que distingue al club (no se quita)
+    "paris fc": "paris fc",
+    "inter": "internazionale", "inter milan": "internazionale", "inter milano": "internazionale",
+    "juve": "juventus", "ssc napoli": "napoli",
+    "bayern": "bayern munchen", "bayern munich": "bayern munchen", "bayern munique": "bayern munchen",
+    "atletico": "atletico madrid", "atl madrid": "atletico madrid",
+    "betis": "real betis", "sporting": "sporting cp", "sporting lisbon": "sporting cp",
+    "standard lieja": "standard liege", "olympiakos": "olympiacos",
+    "red star belgrade": "crvena zvezda", "estrella roja": "crvena zvezda",
+    "dinamo bucharest": "dinamo bucuresti", "lokomotiv m": "lokomotiv moscow",
+    "newells": "newells old boys",
+}
+# Nombres de país en español -> inglés (selecciones nacionales)
+TEAM_ALIASES.update({es: en for en, es in COUNTRY_QUALIFIERS.items()})
+
+# Palabra clave (normalizada) -> deporte canónico
+SPORT_KEYWORDS = {
+    "futbol": "Fútbol", "soccer": "Fútbol",
+    "baloncesto": "Baloncesto", "basket": "Baloncesto", "basketball": "Baloncesto",
+    "tenis": "Tenis", "tennis": "Tenis",
+    "hockey": "Hockey", "beisbol": "Béisbol", "baseball": "Béisbol",
+    "rugby": "Rugby", "voleibol": "Voleibol", "volleyball": "Voleibol",
+    "balonmano": "Balonmano", "handball": "Balonmano",
+    "boxeo": "Boxeo", "boxing": "Boxeo", "mma": "MMA", "ufc": "MMA",
+    "cricket": "Cricket", "golf": "Golf", "ciclismo": "Ciclismo", "cycling": "Ciclismo",
+    "american": "Fútbol americano", "nfl": "Fútbol americano",
+    "motorsports": "Motor", "formula": "Motor", "motogp": "Motor",
+    "esports": "Esports", "snooker": "Snooker", "dardos": "Dardos", "darts": "Dardos",
+}
+
+
+def sport_key(text: str) -> str:
+    """Deporte canónico de un texto libre ("Fútbol (Fútbol Asociación)" -> "Fútbol"); "" si no se sabe"""
+    for word in normalize(text).split():
+        if word in SPORT_KEYWORDS:
+            return SPORT_KEYWORDS[word]
+    return ""
+
+
+def league_sport(league: str) -> str:
+    """Deporte de una competición según LOGOS-LIGAS.xml"""
+    if not league:
+        return ""
+    known = get_matcher().match(league)
+    return sport_key(known.sport) if known else ""
+
+
+@lru_cache(maxsize=None)
+def normalize_team(name: str) -> str:
+    text = _SUB_RE.sub(r"u\1", normalize(name))
+    # Alias del nombre completo antes de quitar las palabras de relleno
+    alias = TEAM_ALIASES.get(text)
+    if alias is None:
+        text = " ".join(w for w in text.split() if w not in FILLER_WORDS)
+        alias = TEAM_ALIASES.get(text, text)
+    text = alias
+    return " ".join("women" if w in WOMEN_WORDS else w for w in text.split())
+
+
+def split_teams(title: str):
+    """'Burnley –  Notts County' -> ('burnley', 'notts county'); (título, '') si no hay rival"""
+    parts = _TEAM_SEP.split(title.strip(), maxsplit=1)
+    if len(parts) == 2 and parts[0].strip() and parts[1].strip():
+        return normalize_team(parts[0]), normalize_team(parts[1])
+    return normalize_team(title), ""
+
+
+def _markers(team: str) -> frozenset:
+    return frozenset(w for w in team.split() if w in MARKER_WORDS)
+
+
+@lru_cache(maxsize=65536)
+def team_similarity(a: str, b: str) -> float:
+    if a == b:
+        return 1.0
+    if not a or not b or _markers(a) != _markers(b):
+        return 0.0
+    wa, wb = set(a.split()), set(b.split())
+    # "leverkusen" / "bayer leverkusen": un nombre contenido en el otro
+    if wa <= wb or wb <= wa:
+        return 0.9
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def event_similarity(home1, away1, home2, away2) -> float:
+    """Parecido de dos eventos por sus equipos, en cualquier orden"""
+    if not away1 or not away2:
+        if away1 or away2:
+            return 0.0
+        return team_similarity(home1, home2)
+    direct = team_similarity(home1, home2) + team_similarity(away1, away2)
+    swapped = team_similarity(home1, away2) + team_similarity(away1, home2)
+    return max(direct, swapped) / 2
+
+
+class CanonicalEvent:
+    __slots__ = ("id", "title", "home", "away", "league", "sport", "start",
+                 "providers", "sources", "_urls")
+
+    def __init__(self, event: dict):
+        self.title = event["title"]
+        self.home, self.away = event["home"], event["away"]
+        self.league = event.get("league", "")
+        self.sport = event.get("sport", "")
+        self.start = event.get("start")
+        self.providers = []
+        self.sources = []
+        self._urls = set()
+        stamp = self.start.strftime("%Y%m%d-%H%M") if self.start else "sin-hora"
+        slug = "-".join((self.home + " " + self.away).split())[:60]
+        self.id = f"{stamp}-{slug}"
+        self.add(event)
+
+    def add(self, event: dict):
+        if event["provider"] not in self.providers:
+            self.providers.append(event["provider"])
+        if not self.league and event.get("league"):
+            self.league = event["league"]
+        if not self.sport and event.get("sport"):
+            self.sport = event["sport"]
+        for source in event.get("sources", ()):
+            if source["url"] and source["url"] not in self._urls:
+                self._urls.add(source["url"])
+                self.sources.append(dict(source, provider=event["provider"]))
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "title": self.title,
+            "league": self.league,
+            "sport": self.sport,
+            "start": self.start.isoformat() if self.start else None,
+            "time": self.start.strftime("%H:%M") if self.start else "",
+            "providers": self.providers,
+            "sources": self.sources,
+        }
+
+
+class EventIndex:
+    """Eventos canónicos bloqueados por (franja de 30 min, deporte)"""
+
+    def __init__(self, threshold: float = MATCH_THRESHOLD,
+                 tolerance_minutes: int = TIME_TOLERANCE_MINUTES):
+        self.threshold = threshold
+        self.tolerance = timedelta(minutes=tolerance_minutes)
+        self.events = []
+        self._blocks = defaultdict(list)
+        self._sports = defaultdict(set)
+        self.stats = Counter()
+
+    @staticmethod
+    def _bucket(start: datetime) -> int:
+        return int(start.timestamp() // (BUCKET_MINUTES * 60))
+
+    def _block(self, event: CanonicalEvent, sport: str):
+        bucket = self._bucket(event.start)
+        self._blocks[(bucket, sport)].append(event)
+        self._sports[bucket].add(sport)
+
+    def _candidates(self, start: datetime, sport: str):
+        seen = set()
+        bucket = self._bucket(start)
+        for b in (bucket - 1, bucket, bucket + 1):
+            # Con deporte conocido solo se mira ese deporte y los eventos sin deporte
+            sports = (sport, "") if sport else self._sports.get(b, ())
+            for s in sports:
+                for event in self._blocks.get((b, s), ()):
+                    if id(event) not in seen:
+                        seen.add(id(event))
+                        yield event
+
+    def add(self, event: dict) -> CanonicalEvent:
+        """Añade el listado de un proveedor; retorna el evento canónico al que se unió"""
+        self.stats["listings"] += 1
+        start, sport = event.get("start"), event.get("sport", "")
+        if start is not None:
+            best, best_score = None, self.threshold
+            for candidate in self._candidates(start, sport):
+                if abs(candidate.start - start) > self.tolerance:
+                    continue
+                self.stats["comparisons"] += 1
+                score = event_similarity(event["home"], event["away"], candidate.home, candidate.away)
+                if score >= best_score:
+                    best, best_score = candidate, score
+            if best is not None:
+                had_sport = best.sport
+                best.add(event)
+                if best.sport and not had_sport:
+                    self._block(best, best.sport)
+                self.stats["merged"] += 1
+                return best
+
+        canonical = CanonicalEvent(event)
+        self.events.append(canonical)
+        if start is not None:
+            self._block(canonical, canonical.sport)
+        return canonical
+
+    def extend(self, events):
+        for event in events:
+            self.add(event)
+
+    def sorted_events(self) -> list:
+        return sorted(self.events, key=lambda e: (e.start is None, e.start or datetime.min, e.title))
+
+    def to_json(self, out_path: str = OUTPUT_JSON):
+        events = self.sorted_events()
+        providers = Counter(p for e in events for p in e.providers)
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "generated_at": datetime.now().isoformat(timespec="seconds"),
+                "total_events": len(events),
+                "multi_provider_events": sum(1 for e in events if len(e.providers) > 1),
+                "providers": dict(providers),
+                "events": [e.as_dict() for e in events],
+            }, f, ensure_ascii=False, indent=2)
+
+    def to_m3u(self, out_path: str = OUTPUT_M3U) -> int:
+        """Una entrada por fuente: HH:MM | Liga | Evento | Canal, agrupadas por deporte"""
+        written = 0
+        with open(out_path, "w", encoding="utf-8") as f:
+            f.write("#EXTM3U\n")
+            for event in self.sorted_events():
+                if event.start is None:
+                    continue
+                for source in event.sources:
+                    parts = [event.start.strftime("%H:%M")]
+                    if event.league:
+                        parts.append(event.league)
+                    parts.append(event.title)
+                    channel = source.get("channel") or source["provider"]
+                    parts.append(channel)
+                    url = source["url"]
+                    if url.startswith(ACESTREAM_PREFIX):
+                        url = ACESTREAM_PLAYER + url[len(ACESTREAM_PREFIX):]
+                    f.write(f'#EXTINF:-1 tvg-id="{event.id}" tvg-name="{channel}" '
+                            f'group-title="{event.sport or "Eventos"}",{" | ".join(parts)}\n{url}\n')
+                    written += 1
+        return written
+
+    def print_stats(self):
+        s = self.stats
+        print(f"🔗 {s['listings']} listados -> {len(self.events)} eventos canónicos "
+              f"({s['merged']} unidos, {s['comparisons']} comparaciones)")
+
+
+# ----------------------------------------------------------------------
+# Proveedores
+# ----------------------------------------------------------------------
+
+def _listing(provider, title, start, league="", sport="", sources=()):
+    home, away = split_teams(title)
+    return {"provider": provider, "title": title.strip(), "home": home, "away": away,
+            "league": league, "sport": sport or league_sport(league), "start": start,
+            "sources": list(sources)}
+
+
+def _spain_wall_time(day: date, hhmm: str):
+    """Hora de reloj de España de una lista que solo trae HH:MM"""
+    m = _TIME_RE.match((hhmm or "").strip())
+    if not m or int(m.group(1)) > 23 or int(m.group(2)) > 59:
+        return None
+    return localize(datetime(day.year, day.month, day.day, int(m.group(1)), int(m.group(2))))
+
+
+def load_platinsport(day: date, path: str = "lista.m3u") -> list:
+    """Reagrupa las entradas de lista.m3u (una por canal) en eventos"""
+    if not os.path.exists(path):
+        return []
+    grouped = {}
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    for extinf, url in zip(lines, lines[1:]):
+        if not extinf.startswith("#EXTINF") or url.startswith("#"):
+            continue
+        attrs = dict(re.findall(r'([\w-]+)="([^"]*)"', extinf.split(",", 1)[0]))
+        parts = extinf.split(",", 1)[1].split(" | ")
+        channel = attrs.get("tvg-name", "")
+        if parts and parts[-1].startswith("["):
+            parts = parts[:-1]
+        if parts and parts[-1] == channel:
+            parts = parts[:-1]
+        hhmm = parts.pop(0) if parts and _TIME_RE.match(parts[0]) else ""
+        league, title = (parts[0], parts[1]) if len(parts) >= 2 else ("", parts[0] if parts else "")
+        if not title:
+            continue
+        key = (hhmm, league, title)
+        if key not in grouped:
+            grouped[key] = _listing("platinsport", title, _spain_wall_time(day, hhmm), league)
+        grouped[key]["sources"].append({"channel": channel, "url": url,
+                                        "lang": attrs.get("tvg-country", "")})
+    return list(grouped.values())
+
+
+def load_playtorrio(path: str = "playtorrio_events.json") -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    listings = []
+    for event in data.get("events", []):
+        timestamp = event.get("timestamp")
+        start = to_spain(timestamp, ms=True) if timestamp else None
+        sources = [{"channel": s.get("channel") or s.get("name", ""), "url": s.get("url", ""),
+                    "lang": s.get("country", "")} for s in event.get("sources", [])]
+        listings.append(_listing("playtorrio", event.get("title", ""), start,
+                                 event.get("league", ""), sources=sources))
+    return listings
+
+
+def load_livetv(paths=("eventos_livetv_sx_con_reproductores.xml", "eventos_livetv_sx.xml")) -> list:
+    """Eventos de livetv.sx; las fuentes salen del XML con reproductores si existe"""
+    streams = {}
+    events = {}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        for evento in ET.parse(path).getroot().iter("evento"):
+            url = evento.findtext("url", "")
+            events.setdefault(url, evento)
+            for stream in evento.iter("stream"):
+                stream_url = (stream.findtext("url") or "").strip()
+                if stream_url:
+                    streams.setdefault(url, []).append({
+                        "channel": stream.findtext("idioma_nombre", "") or "livetv",
+                        "url": stream_url, "lang": stream.findtext("idioma_nombre", ""),
+                    })
+
+    listings = []
+    year = datetime.now().year
+    for url, evento in events.items():
+        try:
+            start = localize(parse_fecha_es(evento.findtext("fecha", ""), evento.findtext("hora", ""), year))
+        except ValueError:
+            start = None
+        competicion = evento.findtext("competicion", "")
+        sport = league_sport(competicion) or sport_key(evento.findtext("deporte", ""))
+        listings.append(_listing("livetv", evento.findtext("nombre", ""), start, competicion, sport,
+                                 streams.get(url, ())))
+    return listings
+
+
+def load_sportsonline(day: date, path: str = "lista_sportsonlineci.xml") -> list:
+    """Pistas "HH:MM Equipo x Equipo" con las horas en hora de UK"""
+    if not os.path.exists(path):
+        return []
+    listings = []
+    previous = None
+    for track in ET.parse(path).getroot().iter("track"):
+        title = track.findtext("title", "").strip()
+        hhmm, _, name = title.partition(" ")
+        try:
+            start = convert_wall_time(day, hhmm, UK_TZ)
+        except ValueError:
+            start, name = None, title
+        # La lista sigue en orden de hora: volver atrás significa pasar la medianoche
+        if start is not None and previous is not None and start < previous - timedelta(hours=6):
+            day += timedelta(days=1)
+            start = convert_wall_time(day, hhmm, UK_TZ)
+        previous = start or previous
+        sources = [{"channel": "sportsonline", "url": u.text.strip(), "lang": ""}
+                   for u in track.findall("url") if u.text]
+        listings.append(_listing("sportsonline", name, start, sources=sources))
+    return listings
+
+
+def load_agenda(day: date, path: str = "lista_agenda_DEPORTE-LIBRE.FANS.xml") -> list:
+    """Eventos de la agenda ("Competición : Evento"), ya en hora de España"""
+    if not os.path.exists(path):
+        return []
+    listings = []
+    for event in ET.parse(path).getroot().iter("event"):
+        name = event.findtext("name", "")
+        league, _, title = name.rpartition(" : ")
+        sources = [{"channel": ch.findtext("name", ""), "url": u.text.strip(), "lang": ""}
+                   for ch in event.iter("channel") for u in ch.findall("url") if u.text]
+        listings.append(_listing("agenda", title or name, _spain_wall_time(day, event.findtext("time", "")),
+                                 league.strip(), sources=sources))
+    return listings
+
+
+def load_all(day: date = None) -> dict:
+    day = day or to_spain(time.time()).date()
+    return {
+        "platinsport": load_platinsport(day),
+        "playtorrio": load_playtorrio(),
+        "livetv": load_livetv(),
+        "sportsonline": load_sportsonline(day),
+        "agenda": load_agenda(day),
+    }
+
+
+def build_index(day: date = None) -> EventIndex:
+    index = EventIndex()
+    for provider, listings in load_all(day).items():
+        print(f"📥 {provider}: {len(listings)} eventos")
+        index.extend(listings)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Índice unificado de eventos de todos los proveedores")
+    parser.add_argument("--day", help="Fecha (AAAA-MM-DD) de las listas que solo traen la hora")
+    parser.add_argument("--json", default=OUTPUT_JSON)
+    parser.add_argument("--m3u", default=OUTPUT_M3U)
+    args = parser.parse_args()
+
+    day = datetime.strptime(args.day, "%Y-%m-%d").date() if args.day else None
+    t0 = time.perf_counter()
+    index = build_index(day)
+    index.print_stats()
+    index.to_json(args.json)
+    written = index.to_m3u(args.m3u)
+    print(f"✅ {args.json} y {args.m3u} ({written} fuentes) en {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
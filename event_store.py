@@ -0,0 +1,337 @@
+"""
+Almacén local de eventos (SQLite)
+=================================
+Los consumidores de eventos_livetv_sx.xml, eventos_livetv_sx_con_reproductores.xml
+y playtorrio_events.json analizaban el fichero completo solo para filtrar
+por fecha. Este almacén guarda los eventos en SQLite:
+
+- una fila por evento, con la URL del evento como clave (upsert): volver a
+  cargar una lista actualiza los eventos existentes sin duplicarlos
+- índices por hora de inicio, deporte y competición, así que "hoy",
+  "próximas 3 horas" o "solo fútbol" son consultas indexadas
+- cada carga completa de una fuente es una "ejecución": las consultas y
+  exportaciones solo ven los eventos presentes en la última, en el orden
+  del origen
+- los streams resueltos de cada evento se guardan con su fecha, de modo
+  que una ejecución puede saltarse los eventos ya resueltos hace poco
+- los eventos que llevan más de EVENT_STORE_RETENTION_DAYS sin aparecer en
+  la fuente se borran al cargarla (la base de datos no crece sin límite)
+
+Los ficheros XML/JSON se siguen generando, pero como vistas del almacén.
+
+Configuración por variables de entorno:
+    EVENT_STORE_DB                  ruta de la base de datos (default: events.sqlite)
+    EVENT_STORE_RESOLVED_TTL_MIN    validez de unos streams resueltos (default: 30)
+    EVENT_STORE_RETENTION_DAYS      días que se conservan los eventos que ya no
+                                    aparecen en la fuente (default: 3)
+
+Uso desde línea de comandos:
+    python event_store.py stats
+    python event_store.py hoy [fuente]
+    python event_store.py proximas 3 [fuente]
+    python event_store.py deporte Fútbol [fuente]
+"""
+
+import atexit
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from time_zones import localize, parse_fecha_es, to_spain
+
+STORE_DB = os.environ.get("EVENT_STORE_DB", "events.sqlite")
+RESOLVED_TTL = float(os.environ.get("EVENT_STORE_RESOLVED_TTL_MIN", "30")) * 60
+RETENTION = float(os.environ.get("EVENT_STORE_RETENTION_DAYS", "3")) * 86400
+
+# Escrituras acumuladas antes de confirmar la transacción
+COMMIT_EVERY = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    url         TEXT PRIMARY KEY,
+    source      TEXT NOT NULL,
+    name        TEXT,
+    sport       TEXT,
+    competition TEXT,
+    fecha       TEXT,
+    hora        TEXT,
+    start_ts    REAL,
+    position    INTEGER,
+    run_at      REAL NOT NULL,
+    extra       TEXT,
+    streams     TEXT,
+    resolved_at REAL
+);
+CREATE INDEX IF NOT EXISTS events_start ON events (start_ts);
+CREATE INDEX IF NOT EXISTS events_sport ON events (sport, start_ts);
+CREATE INDEX IF NOT EXISTS events_competition ON events (competition, start_ts);
+CREATE INDEX IF NOT EXISTS events_source ON events (source, run_at, position);
+CREATE TABLE IF NOT EXISTS runs (
+    source TEXT PRIMARY KEY,
+    run_at REAL NOT NULL,
+    total  INTEGER NOT NULL
+);
+"""
+
+UPSERT = """
+INSERT INTO events (url, source, name, sport, competition, fecha, hora, start_ts, position, run_at, extra)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(url) DO UPDATE SET
+    source = excluded.source, name = excluded.name, sport = excluded.sport,
+    competition = excluded.competition, fecha = excluded.fecha, hora = excluded.hora,
+    start_ts = excluded.start_ts, position = excluded.position, run_at = excluded.run_at,
+    extra = excluded.extra
+"""
+
+# Streams de un evento que quizá aún no se ha cargado (modo combinado): se
+# inserta sin ejecución y la siguiente carga completa le pone los datos
+SET_STREAMS = """
+INSERT INTO events (url, source, name, sport, competition, fecha, hora, start_ts, extra, run_at, streams, resolved_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?)
+ON CONFLICT(url) DO UPDATE SET streams = excluded.streams, resolved_at = excluded.resolved_at
+"""
+
+
+def livetv_start(fecha: str, hora: str):
+    """Inicio (epoch) de un evento de livetv.sx, en hora de España; None si la fecha no es válida"""
+    try:
+        return localize(parse_fecha_es(fecha, hora)).timestamp()
+    except ValueError:
+        return None
+
+
+def livetv_row(event: dict) -> tuple:
+    """Evento de livetv.sx (nombre, deporte, ... url) -> columnas del almacén"""
+    return (event["url"], event["nombre"], event["deporte"], event["competicion"],
+            event["fecha"], event["hora"], livetv_start(event["fecha"], event["hora"]), None)
+
+
+def playtorrio_row(event: dict) -> tuple:
+    """Evento de PlayTorrio -> columnas; el evento completo va en extra"""
+    key = f"playtorrio://{event.get('timestamp', 0)}/{event.get('title', '')}"
+    timestamp = event.get("timestamp") or None
+    return (key, event.get("title"), None, event.get("league"), None, event.get("time"),
+            timestamp / 1000 if timestamp else None, json.dumps(event, ensure_ascii=False))
+
+
+ROW_BUILDERS = {"livetv": livetv_row, "playtorrio": playtorrio_row}
+
+
+def day_bounds(day=None):
+    """(inicio, fin) en epoch del día indicado en España (hoy por defecto)"""
+    day = day or to_spain(time.time()).date()
+    start = localize(datetime.combine(day, datetime.min.time()))
+    end = localize(datetime.combine(day + timedelta(days=1), datetime.min.time()))
+    return start.timestamp(), end.timestamp()
+
+
+class EventStore:
+    """Eventos por URL con índices por inicio, deporte y competición"""
+
+    def __init__(self, path: str = STORE_DB, resolved_ttl: float = RESOLVED_TTL,
+                 retention: float = RETENTION):
+        self.path = path
+        self.resolved_ttl = resolved_ttl
+        self.retention = retention
+        self._conn = None
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.stats = {"upserted": 0, "reused": 0, "resolved": 0, "pruned": 0}
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.executescript(SCHEMA)
+            atexit.register(self.close)
+        return self._conn
+
+    def upsert_events(self, source: str, events) -> int:
+        """
+        Carga completa de una fuente: inserta o actualiza cada evento por su
+        URL y marca la ejecución. Si una URL se repite cuenta la primera
+        aparición (como al generar el XML). Después borra los eventos de la
+        fuente que no aparecen en ninguna carga desde hace `retention`
+        segundos (incluidos los que solo tenían streams, con run_at 0).
+        """
+        build = ROW_BUILDERS[source]
+        run_at = time.time()
+        seen = set()
+        rows = []
+        for event in events:
+            url, *fields, extra = build(event)
+            if url in seen:
+                continue
+            seen.add(url)
+            rows.append((url, source, *fields, len(rows), run_at, extra))
+        with self._lock:
+            db = self._db()
+            db.executemany(UPSERT, rows)
+            db.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?)", (source, run_at, len(rows)))
+            pruned = db.execute("DELETE FROM events WHERE source = ? AND run_at < ?",
+                                (source, run_at - self.retention)).rowcount
+            db.commit()
+        self.stats["upserted"] += len(rows)
+        self.stats["pruned"] += pruned
+        return len(rows)
+
+    def _last_run(self, db, source: str):
+        row = db.execute("SELECT run_at FROM runs WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else None
+
+    def query(self, source: str, start: float = None, end: float = None, sport: str = None,
+              competition: str = None, resolved: bool = None, resolved_after: float = None,
+              limit: int = None) -> list:
+        """
+        Eventos de la última ejecución de la fuente, en el orden del origen.
+        start/end acotan la hora de inicio (epoch, [start, end));
+        resolved_after deja solo los resueltos desde ese instante.
+        """
+        sql = ["SELECT * FROM events WHERE source = ? AND run_at = ?"]
+        with self._lock:
+            db = self._db()
+            params = [source, self._last_run(db, source)]
+            if start is not None:
+                sql.append("AND start_ts >= ?")
+                params.append(start)
+            if end is not None:
+                sql.append("AND start_ts < ?")
+                params.append(end)
+            if sport is not None:
+                sql.append("AND sport = ?")
+                params.append(sport)
+            if competition is not None:
+                sql.append("AND competition = ?")
+                params.append(competition)
+            if resolved is not None:
+                sql.append("AND streams IS NOT NULL" if resolved else "AND streams IS NULL")
+            if resolved_after is not None:
+                sql.append("AND resolved_at >= ?")
+                params.append(resolved_after)
+            sql.append("ORDER BY position")
+            if limit:
+                sql.append("LIMIT ?")
+                params.append(limit)
+            return db.execute(" ".join(sql), params).fetchall()
+
+    def today(self, source: str, **filters) -> list:
+        start, end = day_bounds()
+        return self.query(source, start=start, end=end, **filters)
+
+    def upcoming(self, source: str, hours: float, **filters) -> list:
+        now = time.time()
+        return self.query(source, start=now, end=now + hours * 3600, **filters)
+
+    def livetv_events(self, rows) -> list:
+        """Filas -> dicts de evento de livetv.sx (mismos campos que EventScraper)"""
+        return [{"nombre": r["name"], "deporte": r["sport"], "competicion": r["competition"],
+                 "fecha": r["fecha"], "hora": r["hora"], "url": r["url"]} for r in rows]
+
+    def playtorrio_events(self, rows) -> list:
+        return [json.loads(r["extra"]) for r in rows]
+
+    def events(self, source: str, **filters) -> list:
+        """Vista de la última ejecución con el formato original de la fuente"""
+        rows = self.query(source, **filters)
+        if source == "playtorrio":
+            return self.playtorrio_events(rows)
+        return self.livetv_events(rows)
+
+    def resolved_streams(self, url: str):
+        """Streams resueltos hace menos de resolved_ttl; None si hay que resolverlos"""
+        with self._lock:
+            row = self._db().execute("SELECT streams, resolved_at FROM events WHERE url = ?",
+                                     (url,)).fetchone()
+        if row is None or row["streams"] is None:
+            return None
+        if time.time() - row["resolved_at"] > self.resolved_ttl:
+            return None
+        self.stats["reused"] += 1
+        return json.loads(row["streams"])
+
+    def set_streams(self, source: str, event: dict, streams: list):
+        """Guarda los streams resueltos de un evento (aunque aún no esté cargado)"""
+        url, *fields, extra = ROW_BUILDERS[source](event)
+        with self._lock:
+            db = self._db()
+            db.execute(SET_STREAMS, (url, source, *fields, extra,
+                                     json.dumps(streams, ensure_ascii=False), time.time()))
+            self._writes += 1
+            if self._writes >= COMMIT_EVERY:
+                db.commit()
+                self._writes = 0
+        self.stats["resolved"] += 1
+
+    def streams_of(self, rows) -> dict:
+        """URL -> streams guardados (sin mirar la caducidad)"""
+        return {r["url"]: json.loads(r["streams"]) for r in rows if r["streams"] is not None}
+
+    def summary(self) -> list:
+        """(fuente, eventos de la última ejecución, resueltos, fecha de la ejecución)"""
+        with self._lock:
+            return self._db().execute(
+                "SELECT r.source, r.total, COUNT(e.streams), r.run_at FROM runs r "
+                "LEFT JOIN events e ON e.source = r.source AND e.run_at = r.run_at "
+                "GROUP BY r.source ORDER BY r.source").fetchall()
+
+    def print_stats(self):
+        s = self.stats
+        print(f"🗄  Almacén de eventos: {s['upserted']} cargados, {s['resolved']} resueltos, "
+              f"{s['reused']} reutilizados, {s['pruned']} antiguos borrados")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+
+
+_default = None
+
+
+def get_store() -> EventStore:
+    """Almacén compartido del proceso"""
+    global _default
+    if _default is None:
+        _default = EventStore()
+    return _default
+
+
+def print_rows(rows):
+    for r in rows:
+        start = to_spain(r["start_ts"]).strftime("%d/%m %H:%M") if r["start_ts"] else "--"
+        resolved = "✅" if r["streams"] is not None else "  "
+        print(f"{resolved} {start}  {r['sport'] or '-'}  {r['competition'] or '-'}  {r['name']}")
+    print(f"{len(rows)} eventos")
+
+
+def main(argv):
+    store = get_store()
+    command = argv[1] if len(argv) > 1 else "stats"
+
+    if command == "stats":
+        rows = store.summary()
+        if not rows:
+            print(f"Almacén vacío ({store.path})")
+        for source, total, resolved, run_at in rows:
+            print(f"{source}: {total} eventos, {resolved} con streams "
+                  f"(cargados {datetime.fromtimestamp(run_at):%Y-%m-%d %H:%M})")
+    elif command == "hoy":
+        print_rows(store.today(argv[2] if len(argv) > 2 else "livetv"))
+    elif command == "proximas" and len(argv) > 2:
+        print_rows(store.upcoming(argv[3] if len(argv) > 3 else "livetv", float(argv[2])))
+    elif command == "deporte" and len(argv) > 2:
+        print_rows(store.query(argv[3] if len(argv) > 3 else "livetv", sport=argv[2]))
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
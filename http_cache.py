@@ -0,0 +1,236 @@
+"""
+Caché de descargas con GET condicional
+======================================
+Las listas y catálogos de raw.githubusercontent.com se descargan en cada
+ejecución aunque no hayan cambiado. Esta capa guarda en disco el cuerpo de
+cada URL junto con su ETag / Last-Modified y, en la siguiente ejecución,
+envía If-None-Match / If-Modified-Since:
+
+- 304 Not Modified: se reutiliza el cuerpo guardado (sin descarga)
+- fetch_parsed(): además guarda el resultado ya analizado, así que un 304
+  tampoco vuelve a analizar el fichero; el resultado va asociado a la
+  identidad del analizador (módulo, nombre y código) y a una versión que
+  pasa el llamador: cambiar la función invalida lo guardado, y los cambios
+  en las funciones auxiliares que llama se invalidan subiendo su
+  PARSE_CACHE_VERSION
+- contadores de aciertos, fallos y bytes ahorrados (print_stats)
+
+Configuración por variables de entorno:
+    HTTP_CACHE_DIR       directorio de la caché (default: .http_cache)
+    HTTP_CACHE_DISABLED  1 para descargar siempre sin caché
+
+Uso:
+    from http_cache import get_downloads
+
+    resp = get_downloads().fetch(url, timeout=30)
+    resp.raise_for_status()
+    resp.text, resp.content, resp.from_cache
+
+    logos = get_downloads().fetch_parsed(url, parse_logos, version=PARSE_CACHE_VERSION)
+"""
+
+import hashlib
+import json
+import marshal
+import os
+import pickle
+import sys
+import time
+
+import requests
+
+CACHE_DIR = os.environ.get("HTTP_CACHE_DIR", ".http_cache")
+DISABLED = os.environ.get("HTTP_CACHE_DISABLED", "").lower() in ("1", "true", "yes")
+
+
+def parser_key(parse, version: str = "") -> str:
+    """
+    Identidad de un analizador: módulo, nombre y hash de su código (incluye
+    constantes y funciones anidadas). `version` permite invalidar a mano
+    cuando cambia algo que el código de la función no refleja.
+    """
+    func = getattr(parse, "__func__", parse)
+    code = getattr(func, "__code__", None)
+    if code is None and not hasattr(func, "__qualname__"):
+        func = type(parse)
+        code = getattr(getattr(func, "__call__", None), "__code__", None)
+    digest = hashlib.sha256(marshal.dumps(code)).hexdigest()[:16] if code is not None else ""
+    name = f"{getattr(func, '__module__', '')}.{getattr(func, '__qualname__', repr(func))}"
+    return f"{name}:{digest}:{version}"
+
+
+class CachedResponse:
+    """Respuesta mínima compatible con el uso que hacen los scripts de requests.Response"""
+
+    def __init__(self, url, status_code, content, from_cache, encoding=None):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.from_cache = from_cache
+        self.encoding = encoding or "utf-8"
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error para la URL: {self.url}")
+
+
+class DownloadCache:
+    """Descargas con validación condicional y cuerpo guardado en disco"""
+
+    def __init__(self, root: str = CACHE_DIR, session=None, enabled: bool = not DISABLED):
+        self.root = root
+        self.session = session or requests.Session()
+        self.enabled = enabled
+        self.stats = {"hits": 0, "misses": 0, "bytes_saved": 0, "bytes_downloaded": 0}
+
+    def _paths(self, url: str):
+        base = os.path.join(self.root, hashlib.sha256(url.encode("utf-8")).hexdigest()[:32])
+        return base + ".json", base + ".body", base + ".parsed"
+
+    def _load_meta(self, meta_path: str, body_path: str):
+        if not (os.path.exists(meta_path) and os.path.exists(body_path)):
+            return None
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write(path: str, data: bytes):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def fetch(self, url: str, timeout: float = 30, headers: dict = None) -> CachedResponse:
+        """
+        GET de la URL. Si hay copia guardada se pide de forma condicional y
+        un 304 devuelve el cuerpo en disco (from_cache=True).
+        """
+        if not self.enabled:
+            resp = self.session.get(url, timeout=timeout, headers=headers)
+            return CachedResponse(url, resp.status_code, resp.content, False, resp.encoding)
+
+        meta_path, body_path, parsed_path = self._paths(url)
+        meta = self._load_meta(meta_path, body_path)
+
+        request_headers = dict(headers or {})
+        if meta:
+            if meta.get("etag"):
+                request_headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                request_headers["If-Modified-Since"] = meta["last_modified"]
+
+        resp = self.session.get(url, timeout=timeout, headers=request_headers)
+
+        if resp.status_code == 304 and meta:
+            with open(body_path, "rb") as f:
+                content = f.read()
+            self.stats["hits"] += 1
+            self.stats["bytes_saved"] += len(content)
+            print(f"♻ Sin cambios (304): {url}")
+            return CachedResponse(url, 200, content, True, meta.get("encoding"))
+
+        content = resp.content
+        self.stats["misses"] += 1
+        self.stats["bytes_downloaded"] += len(content)
+
+        if resp.status_code == 200:
+            os.makedirs(self.root, exist_ok=True)
+            self._write(body_path, content)
+            if os.path.exists(parsed_path):
+                os.remove(parsed_path)
+            meta = {
+                "url": url,
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+                "encoding": resp.encoding,
+                "size": len(content),
+                "fetched_at": time.time(),
+            }
+            self._write(meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+        return CachedResponse(url, resp.status_code, content, False, resp.encoding)
+
+    def fetch_parsed(self, url: str, parse, timeout: float = 30, headers: dict = None,
+                     version: str = ""):
+        """
+        Descarga la URL y devuelve parse(respuesta). Si el servidor responde
+        304 y hay un resultado guardado por el mismo analizador (ver
+        parser_key), se devuelve sin analizar.
+        Lanza requests.HTTPError si la respuesta es un error.
+        """
+        resp = self.fetch(url, timeout=timeout, headers=headers)
+        resp.raise_for_status()
+        _, _, parsed_path = self._paths(url)
+        key = parser_key(parse, version)
+
+        if resp.from_cache and os.path.exists(parsed_path):
+            try:
+                with open(parsed_path, "rb") as f:
+                    saved_key, result = pickle.load(f)
+                if saved_key == key:
+                    return result
+            except Exception:
+                pass
+
+        result = parse(resp)
+        if self.enabled:
+            try:
+                self._write(parsed_path, pickle.dumps((key, result), protocol=pickle.HIGHEST_PROTOCOL))
+            except Exception as e:
+                print(f"⚠ No se pudo guardar el resultado analizado de {url}: {e}")
+        return result
+
+    def print_stats(self):
+        s = self.stats
+        total = s["hits"] + s["misses"]
+        if total:
+            print(f"♻ Caché de descargas: {s['hits']}/{total} sin cambios, "
+                  f"{s['bytes_saved'] / 1024:.0f} KB ahorrados, "
+                  f"{s['bytes_downloaded'] / 1024:.0f} KB descargados")
+
+
+_default = None
+
+
+def get_downloads() -> DownloadCache:
+    """Caché de descargas compartida del proceso"""
+    global _default
+    if _default is None:
+        _default = DownloadCache()
+    return _default
+
+
+def main(argv):
+    cache = get_downloads()
+    command = argv[1] if len(argv) > 1 else "list"
+
+    if command == "list":
+        if not os.path.isdir(cache.root):
+            print(f"Caché vacía ({cache.root})")
+            return 0
+        for name in sorted(os.listdir(cache.root)):
+            if name.endswith(".json"):
+                with open(os.path.join(cache.root, name), encoding="utf-8") as f:
+                    meta = json.load(f)
+                print(f"{meta['size']:>9}  {meta.get('etag') or meta.get('last_modified') or '-'}  {meta['url']}")
+    elif command == "clear":
+        removed = 0
+        if os.path.isdir(cache.root):
+            for name in os.listdir(cache.root):
+                os.remove(os.path.join(cache.root, name))
+                removed += 1
+        print(f"🗑 {removed} ficheros eliminados")
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
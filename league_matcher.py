@@ -0,0 +1,188 @@
+"""
+Reconocimiento de ligas/competiciones
+=====================================
+Detecta si un texto es un encabezado de liga y devuelve un identificador
+canónico en una sola pasada sobre el texto. Combina en una única expresión
+regular precompilada:
+
+- las ligas conocidas de LOGOS-LIGAS.xml (cargadas una vez por proceso)
+- las palabras clave genéricas que ya usaba platinsport.py
+
+Uso:
+    from league_matcher import get_matcher
+    league = get_matcher().match("Spain La Liga")
+    if league:
+        print(league.id, league.name, league.logo)
+"""
+
+import os
+import re
+import unicodedata
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+LIGAS_XML = os.path.join(os.path.dirname(os.path.abspath(__file__)), "LOGOS-LIGAS.xml")
+
+# Palabras clave históricas de platinsport.py (coincidencia como subcadena)
+HEADER_KEYWORDS = [
+    'league', 'liga', 'serie', 'bundesliga', 'ligue',
+    'eredivisie', 'championship', 'cup', 'portugal', 'primeira',
+    'super league', 'pro league', 'paulista', 'carioca', 'profesional',
+]
+
+# Palabras clave adicionales (coincidencia como palabra completa)
+HEADER_WORDS = [
+    'lig', 'division', 'divisie', 'coppa', 'copa', 'pokal', 'trophy',
+    'nba', 'nfl', 'nhl', 'mlb', 'mls', 'uefa', 'conference',
+]
+
+# Deporte preferido cuando un nombre de liga aparece en varios deportes
+PREFERRED_SPORT = "Fútbol (Fútbol Asociación)"
+
+# Países en inglés (como aparecen en los encabezados) -> calificador de LOGOS-LIGAS.xml
+COUNTRY_QUALIFIERS = {
+    "spain": "espana", "italy": "italia", "germany": "alemania",
+    "france": "francia", "england": "inglaterra", "netherlands": "holanda",
+    "scotland": "escocia", "brazil": "brasil", "argentina": "argentina",
+    "mexico": "mexico", "saudi arabia": "arabia saudita", "switzerland": "suiza",
+    "russia": "rusia", "japan": "japon", "korea": "corea", "usa": "estados unidos",
+    "colombia": "colombia", "europe": "europa",
+}
+
+_TIER_SUFFIX = re.compile(r" \d+\b")
+
+
+class League(NamedTuple):
+    id: str
+    name: str
+    sport: str
+    logo: str
+
+
+def normalize(text: str) -> str:
+    """Minúsculas, sin acentos y solo caracteres alfanuméricos separados por espacios"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text).split())
+
+
+def slugify(text: str) -> str:
+    return normalize(text).replace(" ", "-")
+
+
+def _split_qualifier(name: str):
+    """'Serie A (Italia)' -> ('Serie A', 'italia')"""
+    qualifiers = re.findall(r"\(([^)]*)\)", name)
+    base = re.sub(r"\s*\([^)]*\)", "", name).strip()
+    return base, normalize(" ".join(qualifiers))
+
+
+class LeagueMatcher:
+    """
+    Autómata de reconocimiento de ligas: una expresión regular combinada con
+    las ligas conocidas (primero, de mayor a menor longitud) y las palabras
+    clave genéricas, evaluada una sola vez sobre el texto normalizado.
+    """
+
+    def __init__(self, xml_path: str = LIGAS_XML):
+        self.leagues = {}
+        self._aliases = {}
+        self._load_known(xml_path)
+        self._pattern = self._compile()
+
+    def _load_known(self, xml_path):
+        if not os.path.isfile(xml_path):
+            print(f"⚠ No se encontró {xml_path}; solo se usarán palabras clave")
+            return
+        try:
+            root = ET.parse(xml_path).getroot()
+        except ET.ParseError as e:
+            print(f"⚠ Error leyendo {xml_path}: {e}")
+            return
+
+        for sport in root.findall("sport"):
+            sport_name = sport.get("name", "")
+            for league in sport.findall("league"):
+                name = league.get("name", "").strip()
+                base, qualifier = _split_qualifier(name)
+                alias = normalize(base)
+                if not alias:
+                    continue
+                entry = League(
+                    id=slugify(name),
+                    name=name,
+                    sport=sport_name,
+                    logo=(league.findtext("logo_url") or "").strip(),
+                )
+                self.leagues.setdefault(entry.id, entry)
+                self._aliases.setdefault(alias, []).append((qualifier, entry))
+
+    def _compile(self):
+        known = sorted(self._aliases, key=len, reverse=True)
+        keywords = sorted({normalize(k) for k in HEADER_KEYWORDS}, key=len, reverse=True)
+        words = sorted({normalize(w) for w in HEADER_WORDS}, key=len, reverse=True)
+
+        parts = []
+        if known:
+            parts.append(r"(?P<known>\b(?:%s)\b)" % "|".join(map(re.escape, known)))
+        parts.append(r"(?P<kw>%s|\b(?:%s)\b)" % (
+            "|".join(map(re.escape, keywords)),
+            "|".join(map(re.escape, words)),
+        ))
+        return re.compile("|".join(parts))
+
+    def _resolve_alias(self, alias: str, text: str) -> League:
+        """Elige entre ligas homónimas usando el país del texto y el deporte preferido"""
+        candidates = self._aliases[alias]
+        if len(candidates) == 1:
+            return candidates[0][1]
+        for country, qualifier in COUNTRY_QUALIFIERS.items():
+            if re.search(r"\b%s\b" % country, text):
+                same_country = [c for c in candidates if qualifier in c[0]]
+                if same_country:
+                    candidates = same_country
+                    break
+        for _, entry in candidates:
+            if entry.sport == PREFERRED_SPORT:
+                return entry
+        return candidates[0][1]
+
+    def match(self, text: str) -> Optional[League]:
+        """
+        Retorna la liga reconocida en el texto o None si no parece un
+        encabezado de liga. Las ligas desconocidas que coinciden con una
+        palabra clave reciben un id derivado del propio texto.
+        """
+        norm = normalize(text)
+        if not norm:
+            return None
+
+        best_known = None
+        keyword_hit = False
+        for m in self._pattern.finditer(norm):
+            if m.lastgroup == "known":
+                # "Bundesliga 2" es otra categoría distinta de "Bundesliga"
+                if _TIER_SUFFIX.match(norm, m.end()):
+                    keyword_hit = True
+                    continue
+                if best_known is None or len(m.group()) > len(best_known):
+                    best_known = m.group()
+            else:
+                keyword_hit = True
+
+        if best_known:
+            return self._resolve_alias(best_known, norm)
+        if keyword_hit:
+            clean = " ".join((text or "").split())
+            return League(id=slugify(clean), name=clean, sport="", logo="")
+        return None
+
+    def get(self, league_id: str) -> Optional[League]:
+        return self.leagues.get(league_id)
+
+
+@lru_cache(maxsize=None)
+def get_matcher(xml_path: str = LIGAS_XML) -> LeagueMatcher:
+    """Instancia compartida (el XML se carga una sola vez por proceso)"""
+    return LeagueMatcher(xml_path)
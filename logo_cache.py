@@ -0,0 +1,265 @@
+"""
+Caché persistente de resolución de logos
+========================================
+Todos los generadores de listas buscan el logo de cada canal con
+coincidencia aproximada (difflib / fuzzywuzzy) sobre un catálogo de
+logos. El resultado solo depende del nombre normalizado y del catálogo,
+así que se guarda en SQLite y se reutiliza entre ejecuciones:
+
+- clave: (resolvedor, versión del catálogo, nombre normalizado)
+- la versión es el sha256 del contenido del catálogo: si logos.xml o
+  LOGOS-CANALES-TV.xml cambian, las entradas antiguas dejan de usarse y
+  se eliminan al registrar la nueva versión
+- se guardan también los resultados negativos (sin logo), con un TTL
+  más corto que los positivos
+- cada entrada guarda la URL elegida y la puntuación de la coincidencia
+
+Configuración por variables de entorno:
+    LOGO_CACHE_DB             ruta de la base de datos (default: logo_cache.sqlite)
+    LOGO_CACHE_TTL_DAYS       validez de un logo encontrado (default: 30)
+    LOGO_CACHE_NEG_TTL_HOURS  validez de un "sin logo" (default: 24)
+    LOGO_CACHE_DISABLED       1 para no usar la caché
+
+Uso desde línea de comandos:
+    python logo_cache.py stats
+    python logo_cache.py invalidate                    # todo
+    python logo_cache.py invalidate logos.xml          # por resolvedor o catálogo
+    python logo_cache.py prune                         # solo lo caducado
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+CACHE_DB = os.environ.get("LOGO_CACHE_DB", "logo_cache.sqlite")
+TTL_DAYS = float(os.environ.get("LOGO_CACHE_TTL_DAYS", "30"))
+NEGATIVE_TTL_HOURS = float(os.environ.get("LOGO_CACHE_NEG_TTL_HOURS", "24"))
+DISABLED = os.environ.get("LOGO_CACHE_DISABLED", "").lower() in ("1", "true", "yes")
+
+# Escrituras acumuladas antes de confirmar la transacción
+COMMIT_EVERY = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalogs (
+    resolver   TEXT PRIMARY KEY,
+    source     TEXT NOT NULL,
+    version    TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS logos (
+    resolver   TEXT NOT NULL,
+    version    TEXT NOT NULL,
+    name       TEXT NOT NULL,
+    url        TEXT,
+    score      REAL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (resolver, version, name)
+);
+"""
+
+
+def catalog_version(catalog) -> str:
+    """
+    Huella del catálogo de logos: acepta el contenido en bruto (bytes o
+    str) o el diccionario nombre -> URL ya cargado.
+    """
+    if isinstance(catalog, dict):
+        catalog = json.dumps(sorted(catalog.items()), ensure_ascii=False)
+    if isinstance(catalog, str):
+        catalog = catalog.encode("utf-8")
+    return hashlib.sha256(catalog).hexdigest()[:16]
+
+
+def file_version(path: str) -> str:
+    with open(path, "rb") as f:
+        return catalog_version(f.read())
+
+
+class LogoCache:
+    """Resultados de búsqueda de logos por (resolvedor, catálogo, nombre)"""
+
+    def __init__(self, path: str = CACHE_DB, ttl_days: float = TTL_DAYS,
+                 negative_ttl_hours: float = NEGATIVE_TTL_HOURS, enabled: bool = not DISABLED):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.negative_ttl = negative_ttl_hours * 3600
+        self.enabled = enabled
+        self._conn = None
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.stats = {"hits": 0, "misses": 0, "negative_hits": 0}
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript(SCHEMA)
+            atexit.register(self.close)
+        return self._conn
+
+    def register(self, resolver: str, source: str, catalog) -> str:
+        """
+        Registra la versión actual del catálogo de un resolvedor y devuelve
+        esa versión. Si el catálogo cambió, borra las entradas anteriores.
+        """
+        version = catalog_version(catalog)
+        if not self.enabled:
+            return version
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT version FROM catalogs WHERE resolver = ?", (resolver,)).fetchone()
+            if row is None or row[0] != version:
+                if row is not None:
+                    removed = db.execute("DELETE FROM logos WHERE resolver = ? AND version != ?",
+                                         (resolver, version)).rowcount
+                    print(f"🖼 Catálogo de logos '{resolver}' actualizado: {removed} entradas invalidadas")
+                db.execute("INSERT OR REPLACE INTO catalogs VALUES (?, ?, ?, ?)",
+                           (resolver, source, version, time.time()))
+                db.commit()
+        return version
+
+    def get(self, resolver: str, version: str, name: str):
+        """Retorna (encontrado, url); url es None si se guardó un resultado negativo"""
+        if not self.enabled:
+            return False, None
+        with self._lock:
+            row = self._db().execute(
+                "SELECT url, created_at FROM logos WHERE resolver = ? AND version = ? AND name = ?",
+                (resolver, version, name)).fetchone()
+        if row is None:
+            return False, None
+        url, created_at = row
+        ttl = self.ttl if url else self.negative_ttl
+        if time.time() - created_at > ttl:
+            return False, None
+        return True, url
+
+    def put(self, resolver: str, version: str, name: str, url, score=None):
+        if not self.enabled:
+            return
+        with self._lock:
+            db = self._db()
+            db.execute("INSERT OR REPLACE INTO logos VALUES (?, ?, ?, ?, ?, ?)",
+                       (resolver, version, name, url or None, score, time.time()))
+            self._writes += 1
+            if self._writes >= COMMIT_EVERY:
+                db.commit()
+                self._writes = 0
+
+    def resolve(self, resolver: str, version: str, name: str, search):
+        """
+        Logo de `name` desde la caché o, si no está, calculándolo con
+        `search(name)`, que devuelve la URL o una tupla (url, puntuación).
+        """
+        if version is None:
+            result = search(name)
+            return result[0] if isinstance(result, tuple) else result
+
+        found, url = self.get(resolver, version, name)
+        if found:
+            self.stats["hits" if url else "negative_hits"] += 1
+            return url
+
+        self.stats["misses"] += 1
+        result = search(name)
+        url, score = result if isinstance(result, tuple) else (result, None)
+        self.put(resolver, version, name, url, score)
+        return url
+
+    def invalidate(self, target: str = None) -> int:
+        """Borra las entradas de un resolvedor o catálogo (todas si no se indica)"""
+        with self._lock:
+            db = self._db()
+            if target is None:
+                removed = db.execute("DELETE FROM logos").rowcount
+                db.execute("DELETE FROM catalogs")
+            else:
+                resolvers = [r for (r,) in db.execute(
+                    "SELECT resolver FROM catalogs WHERE resolver = ? OR source LIKE ?",
+                    (target, f"%{target}"))]
+                if target not in resolvers:
+                    resolvers.append(target)
+                removed = 0
+                for resolver in resolvers:
+                    removed += db.execute("DELETE FROM logos WHERE resolver = ?", (resolver,)).rowcount
+                    db.execute("DELETE FROM catalogs WHERE resolver = ?", (resolver,))
+            db.commit()
+        return removed
+
+    def prune(self) -> int:
+        """Borra las entradas caducadas"""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            removed = db.execute(
+                "DELETE FROM logos WHERE (url IS NOT NULL AND created_at < ?) "
+                "OR (url IS NULL AND created_at < ?)",
+                (now - self.ttl, now - self.negative_ttl)).rowcount
+            db.commit()
+        return removed
+
+    def summary(self) -> list:
+        """(resolvedor, catálogo, versión, con logo, sin logo) por resolvedor"""
+        with self._lock:
+            return self._db().execute(
+                "SELECT c.resolver, c.source, c.version, "
+                "COUNT(l.url), SUM(CASE WHEN l.name IS NOT NULL AND l.url IS NULL THEN 1 ELSE 0 END) "
+                "FROM catalogs c LEFT JOIN logos l "
+                "ON l.resolver = c.resolver AND l.version = c.version "
+                "GROUP BY c.resolver ORDER BY c.resolver").fetchall()
+
+    def print_stats(self):
+        s = self.stats
+        total = s["hits"] + s["negative_hits"] + s["misses"]
+        if total:
+            print(f"🖼 Caché de logos: {s['hits'] + s['negative_hits']}/{total} aciertos "
+                  f"({s['negative_hits']} sin logo), {s['misses']} búsquedas")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+
+
+_default = None
+
+
+def get_cache() -> LogoCache:
+    """Caché compartida del proceso"""
+    global _default
+    if _default is None:
+        _default = LogoCache()
+    return _default
+
+
+def main(argv):
+    cache = get_cache()
+    command = argv[1] if len(argv) > 1 else "stats"
+
+    if command == "stats":
+        rows = cache.summary()
+        if not rows:
+            print(f"Caché vacía ({cache.path})")
+        for resolver, source, version, positives, negatives in rows:
+            print(f"{resolver}: {positives} con logo, {negatives or 0} sin logo "
+                  f"(versión {version}, {source})")
+    elif command == "invalidate":
+        targets = argv[2:] or [None]
+        removed = sum(cache.invalidate(target) for target in targets)
+        print(f"🗑 {removed} entradas eliminadas")
+    elif command == "prune":
+        print(f"🗑 {cache.prune()} entradas caducadas eliminadas")
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
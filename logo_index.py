@@ -0,0 +1,94 @@
+"""
+Índice de logos en memoria
+==========================
+Sustituye a `difflib.get_close_matches` sobre todos los nombres de logos
+por una búsqueda con índice invertido por carácter (no de n-gramas):
+
+- cada carácter apunta a los nombres que lo contienen y cuántas veces:
+  para cada consulta solo se puntúan los nombres cuyo recuento de
+  caracteres comunes alcanza el umbral (es exactamente el filtro `quick_ratio` de difflib, así que el
+  resultado y su orden son idénticos a get_close_matches)
+- acierto exacto: el nombre idéntico devuelve su logo sin puntuar
+- caché por consulta: los nombres de canal repetidos no se recalculan
+
+Uso:
+    index = LogoIndex({"dazn 1": "https://...", ...})
+    index.close_matches("dazn1")   # igual que get_close_matches(..., n=3, cutoff=0.6);
+                                   # max_matches hace de n (número de resultados)
+    index.best("dazn1")            # mismo criterio que script.buscar_logo_en_archive
+"""
+
+import heapq
+from collections import Counter
+from difflib import SequenceMatcher
+
+
+class LogoIndex:
+    def __init__(self, logos: dict, max_matches: int = 3, cutoff: float = 0.6):
+        self.logos = logos
+        self.names = list(logos)
+        self.max_matches = max_matches
+        self.cutoff = cutoff
+        self._lengths = [len(name) for name in self.names]
+        self._postings = {}
+        for i, name in enumerate(self.names):
+            for char, count in Counter(name).items():
+                self._postings.setdefault(char, []).append((i, count))
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def _candidates(self, query: str) -> list:
+        """Índices de los nombres que superan el filtro quick_ratio de difflib"""
+        shared = {}
+        for char, wanted in Counter(query).items():
+            for i, count in self._postings.get(char, ()):
+                shared[i] = shared.get(i, 0) + (count if count < wanted else wanted)
+        size = len(query)
+        lengths = self._lengths
+        cutoff = self.cutoff
+        return [i for i, matches in shared.items()
+                if 2.0 * matches / (size + lengths[i]) >= cutoff]
+
+    def close_matches(self, query: str) -> list:
+        """Mismo resultado que get_close_matches(query, names, max_matches, cutoff)"""
+        return [name for _, name in self._scored(query)]
+
+    def _scored(self, query: str) -> list:
+        """Los max_matches mejores (ratio, nombre) por encima del umbral"""
+        matcher = SequenceMatcher()
+        matcher.set_seq2(query)
+        scored = []
+        for i in self._candidates(query):
+            matcher.set_seq1(self.names[i])
+            ratio = matcher.ratio()
+            if ratio >= self.cutoff:
+                scored.append((ratio, self.names[i]))
+        return heapq.nlargest(self.max_matches, scored)
+
+    def best(self, query: str):
+        """
+        Logo del nombre más parecido, prefiriendo entre los mejores el que
+        contiene la consulta. Retorna None si ninguno supera el umbral.
+        """
+        return self.best_scored(query)[0]
+
+    def best_scored(self, query: str) -> tuple:
+        """Como best(), pero retorna (logo, ratio del nombre elegido)"""
+        if query in self.logos:
+            return self.logos[query], 1.0
+        if query in self._cache:
+            return self._cache[query]
+
+        result = (None, None)
+        scored = self._scored(query)
+        if scored:
+            ratio, name = scored[0]
+            result = (self.logos[name], ratio)
+            for ratio, name in scored:
+                if query in name:
+                    result = (self.logos[name], ratio)
+                    break
+        self._cache[query] = result
+        return result
@@ -0,0 +1,170 @@
+"""
+Validación de logos con revalidación
+====================================
+Comprueba que las URLs de logos devuelven una imagen sin descargarla:
+
+- HEAD y, si el servidor no lo admite (405/501/403 o sin content-type),
+  un GET con Range de un solo byte
+- una sesión aiohttp con conexiones reutilizadas y límite por host
+- caché persistente por URL (LOGO_VALIDATION_CACHE) con estado, ETag /
+  Last-Modified y caducidad: solo se comprueban los logos nuevos o
+  caducados, y los caducados con ETag se revalidan con If-None-Match
+  (un 304 renueva la entrada)
+- un error de red o un timeout no invalida un logo que era válido: se
+  conserva la entrada anterior y se reintenta pronto
+- al guardar se descartan las entradas caducadas hace más de
+  LOGO_VALIDATION_TTL_DAYS (las recién caducadas se guardan para poder
+  revalidarlas con su ETag)
+
+Configuración por variables de entorno:
+    LOGO_VALIDATION_CACHE      fichero de la caché (default: logo_validation.json)
+    LOGO_VALIDATION_TTL_DAYS   validez de un logo válido (default: 7)
+    LOGO_VALIDATION_TTL_BAD_H  validez de un logo inválido (default: 12)
+    LOGO_VALIDATION_RETRY_MIN  reintento tras un error de red o timeout (default: 30)
+    LOGO_VALIDATION_PER_HOST   peticiones simultáneas por host (default: 8)
+"""
+
+import asyncio
+import json
+import os
+import time
+from urllib.parse import urlparse
+
+CACHE_FILE = os.environ.get("LOGO_VALIDATION_CACHE", "logo_validation.json")
+TTL_VALID = float(os.environ.get("LOGO_VALIDATION_TTL_DAYS", "7")) * 86400
+TTL_BAD = float(os.environ.get("LOGO_VALIDATION_TTL_BAD_H", "12")) * 3600
+TTL_RETRY = float(os.environ.get("LOGO_VALIDATION_RETRY_MIN", "30")) * 60
+PER_HOST = int(os.environ.get("LOGO_VALIDATION_PER_HOST", "8"))
+TOTAL = 64
+TIMEOUT = 15
+
+# Respuestas a HEAD que obligan a probar con GET
+HEAD_UNSUPPORTED = {403, 405, 501}
+
+
+class LogoValidator:
+    """Validación asíncrona de logos con caché persistente por URL"""
+
+    def __init__(self, cache_path: str = CACHE_FILE, headers: dict = None,
+                 per_host: int = PER_HOST, ttl_valid: float = TTL_VALID, ttl_bad: float = TTL_BAD,
+                 ttl_retry: float = TTL_RETRY):
+        self.cache_path = cache_path
+        self.headers = headers or {}
+        self.per_host = per_host
+        self.ttl_valid = ttl_valid
+        self.ttl_bad = ttl_bad
+        self.ttl_retry = ttl_retry
+        self.cache = self._load()
+        self.stats = {"cached": 0, "revalidated": 0, "head": 0, "range_get": 0}
+
+    def _load(self) -> dict:
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        # Se conservan las vigentes y las caducadas hace poco (revalidables con ETag)
+        keep_after = time.time() - self.ttl_valid
+        cache = {url: e for url, e in self.cache.items() if e.get("expires_at", 0) > keep_after}
+        tmp = self.cache_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp, self.cache_path)
+
+    def _entry(self, status, http_status, headers=None, previous=None, ttl=None) -> dict:
+        headers = headers or {}
+        if ttl is None:
+            ttl = self.ttl_valid if status == "valid" else self.ttl_bad
+        previous = previous or {}
+        return {
+            "status": status,
+            "http_status": http_status,
+            "content_type": headers.get("Content-Type", previous.get("content_type", "")),
+            "etag": headers.get("ETag", previous.get("etag")),
+            "last_modified": headers.get("Last-Modified", previous.get("last_modified")),
+            "expires_at": int(time.time() + ttl),
+        }
+
+    @staticmethod
+    def _status(http_status: int, content_type: str) -> str:
+        return "valid" if http_status in (200, 206) and content_type.startswith("image/") else "invalid"
+
+    async def _check(self, session, url: str, previous: dict) -> dict:
+        conditional = {}
+        if previous and previous.get("status") == "valid":
+            if previous.get("etag"):
+                conditional["If-None-Match"] = previous["etag"]
+            elif previous.get("last_modified"):
+                conditional["If-Modified-Since"] = previous["last_modified"]
+
+        async with session.head(url, headers=conditional, allow_redirects=True) as resp:
+            self.stats["head"] += 1
+            if resp.status == 304 and previous:
+                self.stats["revalidated"] += 1
+                return self._entry(previous["status"], previous.get("http_status"), previous=previous)
+            content_type = resp.headers.get("Content-Type", "")
+            if resp.status not in HEAD_UNSUPPORTED and content_type:
+                return self._entry(self._status(resp.status, content_type), resp.status, resp.headers)
+
+        # HEAD no admitido: GET de un byte (sin descargar la imagen)
+        headers = dict(conditional, Range="bytes=0-0")
+        async with session.get(url, headers=headers, allow_redirects=True) as resp:
+            self.stats["range_get"] += 1
+            if resp.status == 304 and previous:
+                self.stats["revalidated"] += 1
+                return self._entry(previous["status"], previous.get("http_status"), previous=previous)
+            await resp.content.read(1)
+            content_type = resp.headers.get("Content-Type", "")
+            return self._entry(self._status(resp.status, content_type), resp.status, resp.headers)
+
+    async def validate(self, session, limits: dict, url: str) -> dict:
+        host = urlparse(url).netloc
+        limit = limits.setdefault(host, asyncio.Semaphore(self.per_host))
+        previous = self.cache.get(url)
+        async with limit:
+            try:
+                entry = await asyncio.wait_for(self._check(session, url, previous), TIMEOUT)
+            except Exception:
+                # Fallo transitorio: un logo válido lo sigue siendo hasta el reintento
+                if previous and previous.get("status") == "valid":
+                    entry = self._entry("valid", previous.get("http_status"), previous=previous,
+                                        ttl=self.ttl_retry)
+                else:
+                    entry = self._entry("error", None, previous=previous, ttl=self.ttl_retry)
+        self.cache[url] = entry
+        return entry
+
+    async def validate_all(self, urls) -> dict:
+        """Estado por URL; las vigentes en caché no generan ninguna petición"""
+        import aiohttp
+
+        now = time.time()
+        results, pending = {}, []
+        for url in dict.fromkeys(u for u in urls if u):
+            entry = self.cache.get(url)
+            if entry and entry.get("expires_at", 0) > now:
+                results[url] = entry
+                self.stats["cached"] += 1
+            else:
+                pending.append(url)
+
+        if pending:
+            connector = aiohttp.TCPConnector(limit=TOTAL, limit_per_host=self.per_host)
+            timeout = aiohttp.ClientTimeout(total=TIMEOUT)
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                             headers=self.headers) as session:
+                limits = {}
+                entries = await asyncio.gather(*(self.validate(session, limits, u) for u in pending))
+            results.update(zip(pending, entries))
+        return results
+
+    def validate_urls(self, urls) -> dict:
+        """Versión síncrona de validate_all"""
+        return asyncio.run(self.validate_all(urls))
+
+    def print_stats(self):
+        s = self.stats
+        print(f"🗂  Caché de logos: {s['cached']} vigentes, {s['head']} HEAD, "
+              f"{s['range_get']} GET parciales, {s['revalidated']} revalidados (304)")
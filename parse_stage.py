@@ -0,0 +1,83 @@
+"""
+Etapa de análisis en un pool de procesos
+========================================
+El análisis de HTML (BeautifulSoup + expresiones regulares) es CPU y en
+hilos queda serializado por el GIL. ParseStage envía el HTML ya descargado
+a un ProcessPoolExecutor:
+
+- la función de análisis debe estar definida a nivel de módulo y retornar
+  datos simples (tuplas, listas, str) para que viajen baratos entre procesos
+- el inicializador se ejecuta una vez por proceso: ahí se compilan los
+  patrones y se prepara el estado que no cambia entre páginas
+- con PARSE_WORKERS=0 se analiza en el propio proceso (depuración)
+
+Uso:
+    with ParseStage(parse_page, initializer=init_worker, initargs=(base_url,)) as stage:
+        events = stage.parse(html, page_num)            # síncrono
+        events = await stage.parse_async(html, page_num)  # desde asyncio
+
+Configuración por variables de entorno:
+    PARSE_WORKERS   procesos del pool (default: número de CPUs)
+"""
+
+import asyncio
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+
+WORKERS = int(os.environ.get("PARSE_WORKERS", str(os.cpu_count() or 1)))
+
+
+class ParseStage:
+    """Pool de procesos reutilizable para las funciones de análisis"""
+
+    def __init__(self, parser, initializer=None, initargs=(), workers: int = WORKERS):
+        self.parser = parser
+        self.initializer = initializer
+        self.initargs = initargs
+        self.workers = workers
+        self.pool = None
+        self.stats = {"parsed": 0, "bytes": 0}
+        if workers > 0:
+            self.pool = ProcessPoolExecutor(max_workers=workers, initializer=initializer,
+                                            initargs=initargs)
+        elif initializer:
+            initializer(*initargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.pool:
+            self.pool.shutdown()
+            self.pool = None
+
+    def _count(self, html):
+        self.stats["parsed"] += 1
+        self.stats["bytes"] += len(html or "")
+
+    def submit(self, html, *args):
+        """Envía el HTML al pool; retorna un Future"""
+        self._count(html)
+        if self.pool is None:
+            future = Future()
+            try:
+                future.set_result(self.parser(html, *args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return self.pool.submit(self.parser, html, *args)
+
+    def parse(self, html, *args):
+        return self.submit(html, *args).result()
+
+    async def parse_async(self, html, *args):
+        """Igual que parse() sin bloquear el bucle de eventos"""
+        return await asyncio.wrap_future(self.submit(html, *args))
+
+    def print_stats(self):
+        s = self.stats
+        print(f"🧩 Análisis: {s['parsed']} páginas ({s['bytes'] / 1024:.0f} KB) "
+              f"en {self.workers or 1} procesos")
@@ -1,14 +1,75 @@
-from playwright.sync_api import sync_playwright
 from bs4 import BeautifulSoup
 import re
 from datetime import datetime, timezone, timedelta
 import os
 import sys
+import time
 import html
+import urllib.parse
 import urllib.request
 
+from browser_service import BrowserServiceClient, CaptureRouter as BaseCaptureRouter
+from debug_archive import DebugArchive
+from league_matcher import get_matcher, normalize
+from logo_cache import get_cache
+from logo_index import LogoIndex
+from stream_entries import StreamEntry, StreamTable
+from time_zones import to_spain
+
 BASE_URL = "https://www.platinsport.com/"
+SOURCE_LIST_URL = BASE_URL + "source-list.php"
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/131.0.0.0 Safari/537.36"
+)
+PLAY_BUTTON_SELECTOR = "a[href=\"javascript:go('source-list.php')\"]"
 LOGOS_XML_URL = "https://raw.githubusercontent.com/tutw/platinsport-m3u-updater/refs/heads/main/LOGOS-CANALES-TV.xml"
+LOGOS_XML_FILE = "LOGOS-CANALES-TV.xml"
+
+# Modo de captura: "auto" (HTTP directo y, si falla, navegador propio),
+# "http", "service" o "browser"
+CAPTURE_MODE = os.environ.get("PLATINSPORT_MODE", "auto").lower()
+# El servicio de navegador (browser_service.py) es opcional: "auto" solo lo
+# prueba si se indica dónde está con BROWSER_SERVICE_URL
+USE_SERVICE = CAPTURE_MODE == "service" or (CAPTURE_MODE == "auto" and bool(os.environ.get("BROWSER_SERVICE_URL")))
+
+def _env_list(name: str, default: str) -> list:
+    """Lee una lista separada por comas de una variable de entorno"""
+    return [x.strip().lower() for x in os.environ.get(name, default).split(",") if x.strip()]
+
+# Política de interceptación del navegador
+BLOCKED_RESOURCE_TYPES = _env_list("PLATINSPORT_BLOCK_TYPES", "image,media,font,stylesheet")
+ALLOWED_DOMAINS = _env_list("PLATINSPORT_ALLOW_DOMAINS", "platinsport.com")
+DENIED_DOMAINS = _env_list(
+    "PLATINSPORT_DENY_DOMAINS",
+    "google-analytics.com,googletagmanager.com,googlesyndication.com,"
+    "doubleclick.net,adservice.google.com,haberdasherycorpse.com,stake.com",
+)
+
+# Analizador del HTML: "lxml" (una sola pasada) o "bs4" (BeautifulSoup)
+PARSER = os.environ.get("PLATINSPORT_PARSER", "lxml").lower()
+
+# Capturas de depuración: archivo comprimido + copia de la última página
+DEBUG_ARCHIVE = DebugArchive()
+DEBUG_PAGE = os.path.join("debug", "daily_page_intercepted.html")
+
+# Exportaciones adicionales a lista.m3u: "json", "csv" (separadas por comas)
+EXPORT_FORMATS = _env_list("PLATINSPORT_EXPORT", "")
+
+# Directorio de listas derivadas (por liga, país, próximas horas...); vacío = no generarlas
+VARIANTS_DIR = os.environ.get("PLATINSPORT_VARIANTS_DIR", "listas")
+
+# Reconocedor de encabezados de liga (ligas de LOGOS-LIGAS.xml + palabras clave)
+LEAGUE_MATCHER = get_matcher()
+
+# Logos de canal (tvg-logo) desde LOGOS-CANALES-TV.xml, con caché persistente.
+# Desactivado por defecto: cambia el formato de lista.m3u (PLATINSPORT_LOGOS=1 para activarlo)
+CHANNEL_LOGOS = os.environ.get("PLATINSPORT_LOGOS", "0").lower() in ("1", "true", "yes")
+LOGO_CUTOFF = 0.8
+LOGO_CACHE = get_cache()
+
+FLAG_CLASS_RE = re.compile(r"\bfi\b|\bfi-")
 
 # Mapeo extendido de códigos de país a nombres
 COUNTRY_CODES = {
@@ -49,28 +110,7 @@ def convert_utc_to_spain(utc_time_str: str) -> str:
         return ""
     
     try:
-        dt_utc = datetime.fromisoformat(utc_time_str.replace("Z", "+00:00"))
-        year = dt_utc.year
-        
-        # Calcular último domingo de marzo (cambio a verano)
-        march_last = datetime(year, 3, 31, 1, 0, tzinfo=timezone.utc)
-        while march_last.weekday() != 6:
-            march_last -= timedelta(days=1)
-        
-        # Calcular último domingo de octubre (cambio a invierno)
-        october_last = datetime(year, 10, 31, 1, 0, tzinfo=timezone.utc)
-        while october_last.weekday() != 6:
-            october_last -= timedelta(days=1)
-        
-        # Determinar el offset según la fecha
-        if march_last <= dt_utc < october_last:
-            spain_offset = timedelta(hours=2)  # CEST: UTC+2
-        else:
-            spain_offset = timedelta(hours=1)  # CET: UTC+1
-        
-        dt_spain = dt_utc + spain_offset
-        return dt_spain.strftime("%H:%M")
-        
+        return to_spain(utc_time_str).strftime("%H:%M")
     except Exception as e:
         print(f"⚠ Error convirtiendo hora: {e}")
         return ""
@@ -86,7 +126,7 @@ def clean_text(s: str) -> str:
 
 def extract_lang_from_flag(node) -> str:
     """Extrae el codigo de idioma de la bandera"""
-    flag = node.find("span", class_=re.compile(r"\bfi\b|\bfi-"))
+    flag = node.find("span", class_=FLAG_CLASS_RE)
     if not flag:
         return "XX"
     classes = flag.get("class", []) or []
@@ -153,6 +193,7 @@ def parse_html_for_streams(html_content: str):
     all_elements = soup.find_all(["p", "div"])
     
     current_league = "Unknown League"
+    current_league_id = "unknown-league"
     
     print(f"\n✓ Procesando elementos del HTML...")
     
@@ -161,12 +202,10 @@ def parse_html_for_streams(html_content: str):
         if elem.name == "p":
             text = elem.get_text().strip()
             # Verificar si es un encabezado de liga
-            if text and any(keyword in text.lower() for keyword in [
-                'league', 'liga', 'serie', 'bundesliga', 'ligue', 
-                'eredivisie', 'championship', 'cup', 'portugal', 'primeira',
-                'super league', 'pro league', 'paulista', 'carioca', 'profesional'
-            ]):
+            league = LEAGUE_MATCHER.match(text) if text else None
+            if league:
                 current_league = text
+                current_league_id = league.id
                 print(f"\n📋 Liga detectada: {current_league}")
         
         # Detectar partidos
@@ -195,7 +234,7 @@ def parse_html_for_streams(html_content: str):
                     continue
                 
                 # Eliminar banderas
-                for flag in a_copy.find_all("span", class_=re.compile(r"\bfi\b|\bfi-")):
+                for flag in a_copy.find_all("span", class_=FLAG_CLASS_RE):
                     flag.decompose()
                 
                 channel_name_raw = clean_text(a_copy.get_text())
@@ -210,99 +249,372 @@ def parse_html_for_streams(html_content: str):
                 # Generar tvg-id único
                 tvg_id = generate_tvg_id(channel_name, lang_code)
                 
-                entries.append({
-                    "time": event_time,
-                    "match": match_title,
-                    "league": current_league,
-                    "lang_code": lang_code,
-                    "country": country_name,
-                    "channel": channel_name,
-                    "url": href,
-                    "tvg_id": tvg_id,
-                })
+                entries.append(StreamEntry(
+                    time=event_time,
+                    match=match_title,
+                    league=current_league,
+                    league_id=current_league_id,
+                    lang_code=lang_code,
+                    country=country_name,
+                    channel=channel_name,
+                    url=href,
+                    tvg_id=tvg_id,
+                ))
+    
+    return entries
+
+def _lxml_text(node, skip=None) -> str:
+    """
+    Texto de un nodo lxml (equivalente a get_text) sin copiar ni modificar
+    el árbol. Omite comentarios y los subárboles para los que skip() es True.
+    """
+    parts = []
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            parts.append(item)
+            continue
+        if item.text and isinstance(item.tag, str):
+            parts.append(item.text)
+        # Se apilan en orden inverso: hijo, su tail, siguiente hijo...
+        for child in reversed(item):
+            if child.tail:
+                stack.append(child.tail)
+            if isinstance(child.tag, str) and not (skip and skip(child)):
+                stack.append(child)
+    return "".join(parts)
+
+def _lxml_classes(node) -> list:
+    return (node.get("class") or "").split()
+
+def _is_flag_span(node) -> bool:
+    return node.tag == "span" and any(FLAG_CLASS_RE.search(c) for c in _lxml_classes(node))
+
+def _is_time_tag(node) -> bool:
+    return node.tag == "time"
+
+def _lxml_lang_from_flag(a) -> str:
+    """Versión lxml de extract_lang_from_flag"""
+    for span in a.iter("span"):
+        if _is_flag_span(span):
+            for cls in _lxml_classes(span):
+                if cls.startswith("fi-") and len(cls) == 5:
+                    cc = cls.replace("fi-", "").upper()
+                    if cc == "UK":
+                        cc = "GB"
+                    return cc
+            return "XX"
+    return "XX"
+
+def _lxml_button_group(match_div):
+    """Primer hermano posterior <div class="button-group">"""
+    for sib in match_div.itersiblings():
+        if sib.tag == "div" and (
+            "button-group" in _lxml_classes(sib) or sib.get("class") == "button-group"
+        ):
+            return sib
+    return None
+
+def parse_html_for_streams_lxml(html_content: str):
+    """
+    Versión de parse_html_for_streams que recorre el árbol lxml una sola vez
+    y lee el texto de los nodos sin volver a serializarlos ni parsearlos.
+    Produce exactamente las mismas entradas que la versión BeautifulSoup.
+    """
+    import lxml.html
+
+    if isinstance(html_content, str) and html_content.lstrip().startswith("<?xml"):
+        html_content = html_content.encode("utf-8")
+    root = lxml.html.document_fromstring(html_content)
+    entries = []
+    
+    current_league = "Unknown League"
+    current_league_id = "unknown-league"
+    
+    print(f"\n✓ Procesando elementos del HTML...")
+    
+    for elem in root.iter("p", "div"):
+        # Detectar encabezados de liga
+        if elem.tag == "p":
+            text = _lxml_text(elem).strip()
+            league = LEAGUE_MATCHER.match(text) if text else None
+            if league:
+                current_league = text
+                current_league_id = league.id
+                print(f"\n📋 Liga detectada: {current_league}")
+        
+        # Detectar partidos
+        elif "match-title-bar" in _lxml_classes(elem):
+            event_time = ""
+            for time_tag in elem.iter("time"):
+                if "time" in _lxml_classes(time_tag) or time_tag.get("class") == "time":
+                    if time_tag.get("datetime"):
+                        event_time = convert_utc_to_spain(time_tag.get("datetime"))
+                    break
+            match_title = clean_text(_lxml_text(elem, skip=_is_time_tag))
+            
+            button_group = _lxml_button_group(elem)
+            if button_group is None:
+                continue
+            
+            links = [a for a in button_group.iter("a") if (a.get("href") or "").startswith("acestream://")]
+            
+            print(f"  ⚽ {match_title} ({current_league}) - {len(links)} streams")
+            
+            for a in links:
+                href = clean_text(a.get("href", ""))
+                if not href.startswith("acestream://"):
+                    continue
+                
+                lang_code = _lxml_lang_from_flag(a)
+                country_name = COUNTRY_CODES.get(lang_code, lang_code)
+                
+                # Texto del enlace sin las banderas
+                channel_name_raw = clean_text(_lxml_text(a, skip=_is_flag_span))
+                
+                if not channel_name_raw or channel_name_raw in ["", "STREAM HD", "HD", "STREAM"]:
+                    channel_name_raw = clean_text(a.get("title", ""))
+                    if not channel_name_raw or channel_name_raw in ["", "STREAM HD"]:
+                        channel_name_raw = f"Stream {lang_code}"
+                
+                channel_name = clean_channel_name(channel_name_raw)
+                tvg_id = generate_tvg_id(channel_name, lang_code)
+                
+                entries.append(StreamEntry(
+                    time=event_time,
+                    match=match_title,
+                    league=current_league,
+                    league_id=current_league_id,
+                    lang_code=lang_code,
+                    country=country_name,
+                    channel=channel_name,
+                    url=href,
+                    tvg_id=tvg_id,
+                ))
     
     return entries
 
+PARSERS = {
+    "bs4": parse_html_for_streams,
+    "lxml": parse_html_for_streams_lxml,
+}
+
+def compare_parsers(html_content: str) -> bool:
+    """Ejecuta ambos analizadores sobre el mismo HTML y muestra las diferencias"""
+    results = {}
+    for name, parser in PARSERS.items():
+        t0 = time.perf_counter()
+        results[name] = parser(html_content)
+        print(f"\n⏱ {name}: {len(results[name])} entradas en {time.perf_counter() - t0:.3f}s")
+
+    reference, candidate = results["bs4"], results["lxml"]
+    if reference == candidate:
+        print("✓ Ambos analizadores producen entradas idénticas")
+        return True
+
+    print(f"❌ Diferencias ({len(reference)} vs {len(candidate)} entradas):")
+    for i, (a, b) in enumerate(zip(reference, candidate)):
+        if a != b:
+            print(f"  #{i}: bs4={a}\n       lxml={b}")
+            break
+    return False
+
+def load_channel_logos() -> bytes:
+    """Descarga LOGOS-CANALES-TV.xml (o usa la copia local si falla)"""
+    try:
+        req = urllib.request.Request(LOGOS_XML_URL, headers={"User-Agent": USER_AGENT})
+        with urllib.request.urlopen(req, timeout=20) as resp:
+            return resp.read()
+    except Exception as e:
+        print(f"⚠ No se pudo descargar el catálogo de logos: {e}")
+    if os.path.exists(LOGOS_XML_FILE):
+        with open(LOGOS_XML_FILE, "rb") as f:
+            return f.read()
+    return b""
+
+def assign_channel_logos(all_entries) -> int:
+    """
+    Rellena el logo de cada entrada buscando el canal en el catálogo de
+    logos. Cada canal distinto se resuelve una vez, primero en la caché.
+    """
+    from lxml import etree
+
+    data = load_channel_logos()
+    if not data:
+        return 0
+    version = LOGO_CACHE.register("platinsport", LOGOS_XML_URL, data)
+
+    index = None
+    def search(name):
+        nonlocal index
+        if index is None:
+            logos = {}
+            for channel in etree.fromstring(data).iter("channel"):
+                url = (channel.findtext("logo_url") or "").strip()
+                if url:
+                    logos.setdefault(normalize(channel.get("name", "")), url)
+            index = LogoIndex(logos, cutoff=LOGO_CUTOFF)
+        return index.best_scored(name)
+
+    resolved = {}
+    found = 0
+    for e in all_entries:
+        if e.channel not in resolved:
+            key = normalize(e.channel)
+            resolved[e.channel] = LOGO_CACHE.resolve("platinsport", version, key, search) if key else None
+        logo = resolved[e.channel]
+        if logo:
+            e.logo = sys.intern(logo)
+            found += 1
+    LOGO_CACHE.print_stats()
+    return found
+
 def write_m3u(all_entries, out_path="lista.m3u"):
     """
     Escribe el archivo M3U con formato:
     HH:MM | Liga | Evento | Canal | [País]
     """
-    m3u = ["#EXTM3U"]
-    
     GROUP_NAME = "AGENDA PLATINSPORT"
     
-    for idx, e in enumerate(all_entries, 1):
-        event_time = e.get("time", "")
-        match = e.get("match", "Evento")
-        league = e.get("league", "")
-        country = e.get("country", "")
-        channel = e.get("channel", "STREAM")
-        url = e.get("url", "")
-        tvg_id = e.get("tvg_id", "")
-        lang_code = e.get("lang_code", "")
-        
-        tvg_name = channel
-        
-        # Construir nombre de visualización: HH:MM | Liga | Evento | Canal | [País]
-        display_name_parts = []
-        if event_time:
-            display_name_parts.append(event_time)
-        if league:
-            display_name_parts.append(league)
-        if match:
-            display_name_parts.append(match)
-        display_name_parts.append(channel)
-        if country and country != "Internacional":
-            display_name_parts.append(f"[{country}]")
-        
-        display_name = " | ".join(display_name_parts)
-        
-        # Construir línea EXTINF
-        extinf_parts = ['#EXTINF:-1']
-        
-        if tvg_id:
-            extinf_parts.append(f'tvg-id="{tvg_id}"')
-        
-        extinf_parts.append(f'tvg-name="{tvg_name}"')
-        extinf_parts.append(f'group-title="{GROUP_NAME}"')
-        
-        if lang_code and lang_code != "XX":
-            extinf_parts.append(f'tvg-country="{lang_code}"')
-        
-        extinf_line = ' '.join(extinf_parts) + f',{display_name}'
-        
-        m3u.append(extinf_line)
-        
-        # Convertir acestream:// a formato localhost
-        if url.startswith("acestream://"):
-            ace_id = url.replace("acestream://", "")
-            stream_url = f"http://127.0.0.1:6878/ace/getstream?id={ace_id}"
-        else:
-            stream_url = url
-        
-        m3u.append(stream_url)
-    
-    # Escribir archivo
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write("\n".join(m3u) + "\n")
+    table = all_entries if isinstance(all_entries, StreamTable) else StreamTable.from_entries(all_entries)
+    table.to_m3u(out_path, GROUP_NAME)
     
-    print(f"\n✓ Archivo {out_path} generado con {len(all_entries)} entradas")
+    print(f"\n✓ Archivo {out_path} generado con {len(table)} entradas")
     print(f"✓ Todos los eventos agrupados en: {GROUP_NAME}")
     print(f"✓ Formato: HORA | LIGA | EVENTO | CANAL | [PAÍS]")
 
-def main():
-    print("=" * 70)
-    print("=== PLATINSPORT M3U UPDATER - VERSIÓN CORREGIDA ===")
-    print("=== CON DETECCIÓN DE LIGAS Y SIN ELIMINAR DUPLICADOS ===")
-    print("=" * 70)
-    print(f"Python: {sys.version.split()[0]}")
-    print(f"Inicio: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}")
-    print("=" * 70)
+def looks_like_source_list(body: str) -> bool:
+    """Comprueba que el HTML capturado contiene partidos y enlaces acestream"""
+    return bool(body) and "match-title-bar" in body and "acestream://" in body
 
-    os.makedirs("debug", exist_ok=True)
+def _collect_cookies(response) -> dict:
+    """Extrae pares nombre=valor de las cabeceras Set-Cookie de una respuesta"""
+    cookies = {}
+    for header in response.headers.get_all("Set-Cookie") or []:
+        pair = header.split(";", 1)[0]
+        if "=" in pair:
+            name, value = pair.split("=", 1)
+            cookies[name.strip()] = value.strip()
+    return cookies
+
+def fetch_source_list_http(timeout: int = 20) -> str:
+    """
+    Ruta rápida sin navegador: abre la portada para obtener la sesión,
+    reenvía la cookie disclaimer_accepted junto con las cabeceras que
+    manda el popup y pide source-list.php directamente.
+    Retorna el HTML o "" si la respuesta no es válida.
+    """
+    base_headers = {
+        "User-Agent": USER_AGENT,
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.9",
+    }
+    cookies = {}
+
+    try:
+        print(f"[HTTP] Abriendo sesión en {BASE_URL}...")
+        request = urllib.request.Request(BASE_URL, headers=base_headers)
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            cookies.update(_collect_cookies(response))
+    except Exception as e:
+        # La portada solo aporta la cookie de sesión; se intenta igualmente
+        print(f"[HTTP] Aviso abriendo la portada: {e}")
+
+    cookies["disclaimer_accepted"] = "true"
+    headers = dict(base_headers)
+    headers["Referer"] = BASE_URL
+    headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in cookies.items())
+
+    try:
+        print(f"[HTTP] Pidiendo {SOURCE_LIST_URL}...")
+        request = urllib.request.Request(SOURCE_LIST_URL, headers=headers)
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            charset = response.headers.get_content_charset() or "utf-8"
+            body = response.read().decode(charset, errors="replace")
+    except Exception as e:
+        print(f"[HTTP] Error: {e}")
+        return ""
+
+    if not looks_like_source_list(body):
+        print(f"[HTTP] Respuesta sin partidos ({len(body)} bytes)")
+        return ""
+
+    print(f"[HTTP] HTML capturado: {len(body)} bytes")
+    DEBUG_ARCHIVE.submit("source-list-http.html", body, plain_copy=DEBUG_PAGE)
+    return body
+
+class CaptureRouter(BaseCaptureRouter):
+    """
+    Interceptor de la captura de source-list.php con los filtros de
+    platinsport; guarda la página capturada en el archivo de depuración.
+    """
+
+    def __init__(self, block_types=None, allow_domains=None, deny_domains=None):
+        super().__init__(
+            "source-list.php",
+            block_types=BLOCKED_RESOURCE_TYPES if block_types is None else block_types,
+            allow_domains=ALLOWED_DOMAINS if allow_domains is None else allow_domains,
+            deny_domains=DENIED_DOMAINS if deny_domains is None else deny_domains,
+        )
 
-    raw_html = None
+    def on_capture(self, body: str):
+        # Escritura en segundo plano: no bloquea el callback de la ruta
+        DEBUG_ARCHIVE.submit("source-list-browser.html", body, plain_copy=DEBUG_PAGE)
+        print(f"[6] Debug encolado: {DEBUG_PAGE}")
+
+def disclaimer_cookie() -> dict:
+    expiry = int((datetime.now(timezone.utc) + timedelta(days=1)).timestamp())
+    return {
+        "name": "disclaimer_accepted",
+        "value": "true",
+        "domain": ".platinsport.com",
+        "path": "/",
+        "expires": expiry,
+        "sameSite": "Lax"
+    }
+
+def fetch_source_list_service() -> str:
+    """
+    Ruta con el servicio de navegador persistente (browser_service.py):
+    misma captura que fetch_source_list_browser pero en un navegador ya
+    arrancado. Retorna el HTML o "" si el servicio no está disponible.
+    """
+    client = BrowserServiceClient()
+    if not client.available():
+        print(f"[SERVICIO] No disponible en {client.base_url}")
+        return ""
+
+    print(f"[SERVICIO] Capturando con el navegador persistente ({client.base_url})...")
+    result = client.capture(
+        BASE_URL,
+        "source-list.php",
+        click=PLAY_BUTTON_SELECTOR,
+        popup=True,
+        cookies=[disclaimer_cookie()],
+        block_types=BLOCKED_RESOURCE_TYPES,
+        allow_domains=ALLOWED_DOMAINS,
+        deny_domains=DENIED_DOMAINS,
+    )
+    if not result.get("ok"):
+        print(f"[SERVICIO] Error: {result.get('error')}")
+        return ""
+
+    body = result.get("body", "")
+    print(f"[SERVICIO] HTML capturado: {len(body)} bytes en {result.get('elapsed', 0):.2f}s")
+    CaptureRouter().print_summary(result.get("stats"))
+    if not looks_like_source_list(body):
+        return ""
+    DEBUG_ARCHIVE.submit("source-list-service.html", body, plain_copy=DEBUG_PAGE)
+    return body
+
+def fetch_source_list_browser() -> str:
+    """
+    Ruta lenta: abre Chromium con Playwright, pulsa PLAY e intercepta
+    la respuesta de source-list.php.
+    Retorna el HTML o "" si no se pudo capturar.
+    """
+    from playwright.sync_api import sync_playwright
 
     with sync_playwright() as p:
         print("\n[1] Lanzando navegador...")
@@ -317,49 +629,19 @@ def main():
         )
 
         context = browser.new_context(
-            user_agent=(
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/131.0.0.0 Safari/537.36"
-            ),
+            user_agent=USER_AGENT,
             viewport={"width": 1920, "height": 1080},
             locale="en-US",
             java_script_enabled=True,
             ignore_https_errors=True,
         )
         
-        expiry = int((datetime.now(timezone.utc) + timedelta(days=1)).timestamp())
-        context.add_cookies([{
-            "name": "disclaimer_accepted",
-            "value": "true",
-            "domain": ".platinsport.com",
-            "path": "/",
-            "expires": expiry,
-            "sameSite": "Lax"
-        }])
+        context.add_cookies([disclaimer_cookie()])
         print("[2] Cookie disclaimer establecida")
 
-        def handle_route(route, request):
-            nonlocal raw_html
-            
-            if "source-list.php" in request.url:
-                print(f"[4] Interceptando: {request.url}")
-                
-                response = route.fetch()
-                body = response.text()
-                
-                raw_html = body
-                print(f"[5] HTML capturado: {len(body)} bytes")
-                
-                with open("debug/daily_page_intercepted.html", "w", encoding="utf-8") as f:
-                    f.write(body)
-                print("[6] Debug guardado: debug/daily_page_intercepted.html")
-                
-                route.fulfill(response=response)
-            else:
-                route.continue_()
-        
-        context.route("**/*", handle_route)
+        router = CaptureRouter()
+        context.on("requestfinished", router.on_request_finished)
+        context.route("**/*", router.handle_route)
         print("[3] Interceptor registrado")
 
         page = context.new_page()
@@ -367,17 +649,16 @@ def main():
         print(f"[7] Navegando a {BASE_URL}...")
         try:
             page.goto(BASE_URL, timeout=120000, wait_until="domcontentloaded")
-            import time
             time.sleep(2)
             print("     Pagina principal cargada")
         except Exception as e:
             print(f"     Error: {e}")
             browser.close()
-            sys.exit(1)
+            return ""
 
         print("[8] Buscando boton PLAY...")
         try:
-            play_button = page.locator("a[href=\"javascript:go('source-list.php')\"]").first
+            play_button = page.locator(PLAY_BUTTON_SELECTOR).first
             
             if play_button.is_visible(timeout=10000):
                 print("     Boton encontrado")
@@ -391,23 +672,55 @@ def main():
                 
                 print(f"     SUCCESS! Popup abierto: {daily_url}")
                 
-                daily_page.wait_for_load_state("load")
-                time.sleep(2)
-                
+                # Se cierra el popup en cuanto source-list.php está capturado
+                router.wait_for_capture(daily_page)
                 daily_page.close()
             else:
                 print("     Boton no visible")
                 browser.close()
-                sys.exit(1)
+                return ""
                 
         except Exception as e:
             print(f"     Error: {e}")
             import traceback
             traceback.print_exc()
             browser.close()
-            sys.exit(1)
+            return ""
 
         browser.close()
+
+    router.print_summary()
+    return router.raw_html
+
+def main():
+    print("=" * 70)
+    print("=== PLATINSPORT M3U UPDATER - VERSIÓN CORREGIDA ===")
+    print("=== CON DETECCIÓN DE LIGAS Y SIN ELIMINAR DUPLICADOS ===")
+    print("=" * 70)
+    print(f"Python: {sys.version.split()[0]}")
+    print(f"Inicio: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}")
+    print(f"Modo de captura: {CAPTURE_MODE}")
+    print("=" * 70)
+
+    os.makedirs("debug", exist_ok=True)
+
+    raw_html = ""
+
+    if CAPTURE_MODE in ("auto", "http"):
+        t0 = time.perf_counter()
+        raw_html = fetch_source_list_http()
+        if raw_html:
+            print(f"✓ Captura HTTP directa en {time.perf_counter() - t0:.2f}s")
+        elif CAPTURE_MODE == "auto":
+            print("⚠ La ruta HTTP directa falló, probando con navegador...")
+
+    if not raw_html and USE_SERVICE:
+        raw_html = fetch_source_list_service()
+        if not raw_html and CAPTURE_MODE == "auto":
+            print("⚠ Servicio de navegador no disponible, usando el navegador...")
+
+    if not raw_html and CAPTURE_MODE in ("auto", "browser"):
+        raw_html = fetch_source_list_browser()
     
     if not raw_html:
         print("\n❌ ERROR: No se pudo capturar el HTML")
@@ -417,7 +730,9 @@ def main():
     print("PARSEANDO STREAMS CON DETECCIÓN DE LIGAS...")
     print("=" * 70)
     
-    all_entries = parse_html_for_streams(raw_html)
+    parser = PARSERS.get(PARSER, parse_html_for_streams_lxml)
+    print(f"Analizador: {PARSER}")
+    all_entries = parser(raw_html)
     
     print(f"\n✓ Total streams encontrados: {len(all_entries)}")
     
@@ -428,32 +743,52 @@ def main():
     # NO eliminamos duplicados - el usuario lo pidió expresamente
     print(f"✓ Conservando TODOS los streams (sin eliminar duplicados)")
 
-    # Guardar el M3U
-    write_m3u(all_entries, "lista.m3u")
+    if CHANNEL_LOGOS:
+        found = assign_channel_logos(all_entries)
+        print(f"✓ Logos de canal asignados a {found}/{len(all_entries)} streams")
+
+    # Guardar el M3U (y las exportaciones opcionales)
+    table = StreamTable.from_entries(all_entries)
+    write_m3u(table, "lista.m3u")
+    if "json" in EXPORT_FORMATS:
+        table.to_json("lista.json")
+        print("✓ Exportado lista.json")
+    if "csv" in EXPORT_FORMATS:
+        table.to_csv("lista.csv")
+        print("✓ Exportado lista.csv")
+    if VARIANTS_DIR:
+        now_hhmm = to_spain(time.time()).strftime("%H:%M")
+        manifest = table.write_variants(VARIANTS_DIR, "AGENDA PLATINSPORT", now_hhmm)
+        print(f"✓ {len(manifest['playlists'])} listas derivadas en {VARIANTS_DIR}/ (manifest.json)")
     
     # Mostrar muestra
     print("\n" + "=" * 70)
     print("MUESTRA DE LOS PRIMEROS 10 CANALES:")
     print("=" * 70)
     for i, e in enumerate(all_entries[:10], 1):
-        time_str = f"{e['time']}" if e['time'] else "??:??"
-        print(f"  {i}. {time_str} | {e['league'][:30]} | {e['match'][:30]} | {e['channel']} [{e['country']}]")
+        time_str = f"{e.time}" if e.time else "??:??"
+        print(f"  {i}. {time_str} | {e.league[:30]} | {e.match[:30]} | {e.channel} [{e.country}]")
     
-    # Estadísticas por liga
+    # Estadísticas por liga (agrupadas por id canónico)
+    league_rows = table.group_by("league_id")
     league_counts = {}
-    for e in all_entries:
-        league = e.get('league', 'Unknown')
-        if league not in league_counts:
-            league_counts[league] = 0
-        league_counts[league] += 1
+    for league_id, rows in league_rows.items():
+        known = LEAGUE_MATCHER.get(league_id)
+        league = known.name if known else table.value("league", rows[0])
+        league_counts[league] = league_counts.get(league, 0) + len(rows)
     
     print(f"\n📊 Estadísticas por liga:")
     for league, count in sorted(league_counts.items(), key=lambda x: x[1], reverse=True)[:10]:
         print(f"  {league}: {count} enlaces")
     
+    DEBUG_ARCHIVE.close()
+    
     print("\n" + "=" * 70)
     print("✅ PROCESO COMPLETADO EXITOSAMENTE")
     print("=" * 70)
 
 if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--compare-parsers":
+        with open(sys.argv[2], encoding="utf-8") as f:
+            sys.exit(0 if compare_parsers(f.read()) else 1)
     main()
@@ -7,9 +7,13 @@ import asyncio
 import aiohttp
 import json
 import re
-from datetime import datetime, timezone
+from datetime import datetime
 from typing import List, Dict
-import pytz
+
+from event_store import get_store
+from rate_limiter import AdaptiveRateLimiter
+from stream_prober import MODE as STREAM_PROBE, StreamProber, rank_sources
+from time_zones import to_spain_many
 
 # APIs de PlayTorrio
 CDNLIVE_API = 'https://ntvstream-scraper.aymanisthedude1.workers.dev/cdnlive'
@@ -108,6 +112,7 @@ class PlayTorrioEventsExtractor:
         self.events = []
         self.session = None
         self.request_count = 0
+        self.limiter = AdaptiveRateLimiter()
     
     async def init_session(self):
         """Inicializar sesión HTTP"""
@@ -123,47 +128,49 @@ class PlayTorrioEventsExtractor:
         """Cerrar sesión HTTP"""
         if self.session:
             await self.session.close()
+        self.limiter.print_stats()
+        self.limiter.save()
     
     async def fetch_with_retry(self, url: str, max_retries: int = 3) -> dict:
-        """Fetch con reintentos y delay progresivo"""
+        """Fetch con reintentos bajo el limitador adaptativo (solo frena ante 429/5xx)"""
         self.request_count += 1
         
-        # Delay progresivo para evitar rate limiting
-        if self.request_count > 1:
-            delay = min(10 + (self.request_count * 2), 30)
-            print(f"⏳ Delay de {delay}s para evitar rate limiting...")
-            await asyncio.sleep(delay)
-        
         for attempt in range(max_retries):
+            # El limitador aplica la tasa del host y el backoff de fallos anteriores
+            await self.limiter.acquire(url)
             try:
                 async with self.session.get(url) as response:
+                    delay = self.limiter.record(url, response.status, response.headers.get('Retry-After'))
                     if response.status == 429:
-                        wait_time = 15 + (attempt * 5)
-                        print(f"⏳ Rate limit - esperando {wait_time}s...")
-                        await asyncio.sleep(wait_time)
+                        print(f"⏳ Rate limit - reintento en {delay:.1f}s...")
                         continue
                     
                     if response.status == 200:
                         return await response.json()
-                    else:
-                        print(f"❌ HTTP {response.status} para {url}")
-                        if attempt < max_retries - 1:
-                            await asyncio.sleep(5)
+                    
+                    print(f"❌ HTTP {response.status} para {url}")
+                    if not delay:
+                        # 4xx distinto de 429: reintentar no cambia la respuesta
+                        break
             except Exception as e:
+                self.limiter.record(url, None)
                 print(f"⚠️  Error en intento {attempt + 1}: {e}")
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(5)
         return {}
     
-    def timestamp_to_spain_time(self, timestamp: int) -> str:
-        """Convertir timestamp de milisegundos a hora de España"""
-        try:
-            dt = datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc)
-            spain_tz = pytz.timezone('Europe/Madrid')
-            spain_time = dt.astimezone(spain_tz)
-            return spain_time.strftime('%H:%M')
-        except:
-            return "00:00"
+    async def probe_sources(self):
+        """Comprueba las fuentes y deja las caídas al final (o las quita con STREAM_PROBE=drop)"""
+        if STREAM_PROBE == 'off' or not self.events:
+            return
+        print("\n📡 Comprobando fuentes...")
+        prober = StreamProber(headers=HEADERS)
+        results = await prober.probe_all(s['url'] for e in self.events for s in e['sources'])
+        for event in self.events:
+            for source in event['sources']:
+                source['status'] = results.get(source['url'], {}).get('status', 'unknown')
+            event['sources'] = rank_sources(event['sources'], lambda s: s['url'], results)
+        self.events = [e for e in self.events if e['sources']]
+        prober.print_summary(results)
+        prober.save()
     
     def get_country_name(self, country_code: str) -> str:
         """Obtener nombre del país desde el código"""
@@ -243,10 +250,13 @@ class PlayTorrioEventsExtractor:
             return []
         
         events = []
-        for item in data['live']:
+        # Conversión horaria de todo el lote en una sola llamada
+        times_spain = to_spain_many(
+            [item.get('date', 0) for item in data['live']], ms=True, fmt='%H:%M', default="00:00"
+        )
+        for item, time_spain in zip(data['live'], times_spain):
             try:
                 timestamp = item.get('date', 0)
-                time_spain = self.timestamp_to_spain_time(timestamp)
                 
                 event = {
                     'title': item.get('title', ''),
@@ -315,10 +325,13 @@ class PlayTorrioEventsExtractor:
             return []
         
         events = []
-        for item in data['live']:
+        # Conversión horaria de todo el lote en una sola llamada
+        times_spain = to_spain_many(
+            [item.get('date', 0) for item in data['live']], ms=True, fmt='%H:%M', default="00:00"
+        )
+        for item, time_spain in zip(data['live'], times_spain):
             try:
                 timestamp = item.get('date', 0)
-                time_spain = self.timestamp_to_spain_time(timestamp)
                 
                 event = {
                     'title': item.get('title', ''),
@@ -392,11 +405,11 @@ class PlayTorrioEventsExtractor:
         await self.init_session()
         
         try:
-            # Extraer de CDN Live primero
-            cdn_events = await self.extract_cdnlive_events()
-            
-            # Luego All Sources con delay
-            all_events = await self.extract_all_sources_events()
+            # Ambas fuentes en paralelo; el limitador regula las peticiones al host
+            cdn_events, all_events = await asyncio.gather(
+                self.extract_cdnlive_events(),
+                self.extract_all_sources_events(),
+            )
             
             print(f"\n{'=' * 80}")
             print(f"📊 RESULTADOS PARCIALES:")
@@ -407,6 +420,8 @@ class PlayTorrioEventsExtractor:
             # Combinar y eliminar duplicados
             self.events = self.merge_events([cdn_events, all_events])
             
+            await self.probe_sources()
+            
             # Filtrar eventos en vivo
             live_events = [e for e in self.events if e.get('live', False)]
             
@@ -474,13 +489,17 @@ class PlayTorrioEventsExtractor:
             print(f"   {league}: {count} eventos")
     
     def generate_json(self, output_file: str = 'playtorrio_events.json'):
-        """Generar archivo JSON"""
+        """Generar archivo JSON como vista de la última carga en el almacén de eventos"""
+        # Los eventos ya vienen únicos por título y timestamp (merge_events), la clave del almacén
+        store = get_store()
+        store.upsert_events('playtorrio', self.events)
+        events = store.events('playtorrio')
         with open(output_file, 'w', encoding='utf-8') as f:
             json.dump({
                 'generated_at': datetime.now().isoformat(),
-                'total_events': len(self.events),
-                'live_events': sum(1 for e in self.events if e.get('live', False)),
-                'events': self.events
+                'total_events': len(events),
+                'live_events': sum(1 for e in events if e.get('live', False)),
+                'events': events
             }, f, indent=2, ensure_ascii=False)
         
         print(f"📝 Archivo JSON generado: {output_file}")
@@ -12,9 +12,11 @@ Fecha: 2026-01-27
 import json
 import urllib.parse
 import requests
-import concurrent.futures
 from pathlib import Path
 
+from logo_validator import LogoValidator
+from stream_prober import MODE as STREAM_PROBE, StreamProber, rank_sources
+
 
 def extract_channels_from_api():
     """Extrae canales directamente de la API de PlayTorrio"""
@@ -113,39 +115,22 @@ def process_channels(raw_channels):
     return channels
 
 
-def validate_logo(item):
-    """Valida un logo mediante HTTP real"""
-    name = item['name']
-    logo = item['logo']
-
-    if not logo:
-        return name, None, 'no_logo'
-
-    try:
-        r = requests.get(logo, timeout=15, allow_redirects=True)
-        ct = r.headers.get('content-type', '')
-        if r.status_code == 200 and ct.startswith('image/'):
-            return name, logo, 'valid'
-        else:
-            return name, None, 'invalid'
-    except Exception:
-        return name, None, 'error'
-
-
 def validate_all_logos(channels):
-    """Valida todos los logos con HTTP real en paralelo"""
+    """Valida todos los logos (HEAD / GET parcial) reutilizando la caché de validaciones"""
     print("🌐 Validando logos con HTTP real...")
 
-    # Preparar candidatos
-    candidates = [{'name': ch['name'], 'logo': ch['logo']} for ch in channels]
+    validator = LogoValidator()
+    checked = validator.validate_urls(ch['logo'] for ch in channels)
+    validator.print_stats()
+    validator.save()
 
-    # Validar en paralelo
     results = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=50) as executor:
-        for i, result in enumerate(executor.map(validate_logo, candidates), 1):
-            results.append(result)
-            if i % 50 == 0:
-                print(f"  ... {i}/{len(candidates)} validados")
+    for ch in channels:
+        if not ch['logo']:
+            results.append((ch['name'], None, 'no_logo'))
+            continue
+        status = checked[ch['logo']]['status']
+        results.append((ch['name'], ch['logo'] if status == 'valid' else None, status))
 
     # Analizar resultados
     valid = [r for r in results if r[2] == 'valid']
@@ -167,6 +152,18 @@ def validate_all_logos(channels):
     return logo_map
 
 
+def probe_channels(channels):
+    """Comprueba los reproductores y deja los caídos al final (o los quita con STREAM_PROBE=drop)"""
+    if STREAM_PROBE == 'off':
+        return channels
+    print("📡 Comprobando reproductores...")
+    prober = StreamProber(headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36'})
+    results = prober.probe_urls(ch['player_url'] for ch in channels)
+    prober.print_summary(results)
+    prober.save()
+    return rank_sources(channels, lambda ch: ch['player_url'], results)
+
+
 def generate_m3u(channels, logo_map, output_path='playtorrio_canales.m3u'):
     """Genera archivo M3U con logos validados"""
     print(f"\n📝 Generando M3U...")
@@ -243,8 +240,8 @@ def main():
     # 3. Validar todos los logos
     logo_map = validate_all_logos(channels)
 
-    # 4. Generar M3U
-    output = generate_m3u(channels, logo_map)
+    # 4. Comprobar reproductores y generar M3U
+    output = generate_m3u(probe_channels(channels), logo_map)
 
     print()
     print("=" * 70)
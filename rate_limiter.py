@@ -0,0 +1,173 @@
+"""
+Limitador de peticiones adaptativo por host
+===========================================
+Sustituye las esperas fijas entre peticiones por un cubo de fichas
+(token bucket) por host:
+
+- empieza rápido (RATE_LIMIT_RPS peticiones/s con ráfaga RATE_LIMIT_BURST)
+- solo frena ante 429 o 5xx: la tasa se reduce a la mitad y el host queda
+  bloqueado un tiempo exponencial con jitter (o el que indique Retry-After)
+- cada respuesta correcta sube la tasa poco a poco hasta RATE_LIMIT_MAX_RPS
+- la tasa aprendida de cada host se guarda en RATE_LIMIT_STATE y se usa
+  como punto de partida en la siguiente ejecución
+
+Pensado para asyncio (aiohttp):
+
+    limiter = AdaptiveRateLimiter()
+    await limiter.acquire(url)
+    async with session.get(url) as response:
+        limiter.record(url, response.status, response.headers.get("Retry-After"))
+    ...
+    limiter.save()
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+STATE_FILE = os.environ.get("RATE_LIMIT_STATE", "rate_limits.json")
+INITIAL_RPS = float(os.environ.get("RATE_LIMIT_RPS", "2"))
+MIN_RPS = float(os.environ.get("RATE_LIMIT_MIN_RPS", "0.05"))
+MAX_RPS = float(os.environ.get("RATE_LIMIT_MAX_RPS", "10"))
+BURST = float(os.environ.get("RATE_LIMIT_BURST", "2"))
+
+BASE_BACKOFF = 1.0      # segundos tras el primer fallo
+MAX_BACKOFF = 60.0      # tope del backoff exponencial
+MAX_RETRY_AFTER = 300.0 # tope para Retry-After
+INCREASE_STEP = 0.1     # subida de la tasa por cada respuesta correcta (peticiones/s)
+
+
+def retry_after_seconds(value) -> float:
+    """Retry-After en segundos (acepta segundos o fecha HTTP); None si no es válido"""
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class HostBucket:
+    __slots__ = ("rate", "tokens", "updated", "blocked_until", "failures", "lock")
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = BURST
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.failures = 0
+        self.lock = asyncio.Lock()
+
+    def refill(self, now: float):
+        self.tokens = min(BURST, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class AdaptiveRateLimiter:
+    """Cubo de fichas por host con backoff ante 429/5xx y tasa persistente"""
+
+    def __init__(self, state_path: str = STATE_FILE, initial_rps: float = INITIAL_RPS,
+                 min_rps: float = MIN_RPS, max_rps: float = MAX_RPS, throttle_statuses=None):
+        self.state_path = state_path
+        self.initial_rps = initial_rps
+        self.min_rps = min_rps
+        self.max_rps = max_rps
+        # None: 429 y cualquier 5xx frenan el host
+        self.throttle_statuses = throttle_statuses
+        self.learned = self._load()
+        self.buckets = {}
+        self.stats = {"requests": 0, "throttled": 0, "waited": 0.0}
+
+    def _load(self) -> dict:
+        if not self.state_path:
+            return {}
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        """Guarda la tasa aprendida de cada host usado en esta ejecución"""
+        if not self.state_path:
+            return
+        state = dict(self.learned)
+        for host, bucket in self.buckets.items():
+            state[host] = {"rate": round(bucket.rate, 3), "updated_at": int(time.time())}
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.state_path)
+
+    def bucket(self, url: str) -> HostBucket:
+        host = urlparse(url).netloc or url
+        if host not in self.buckets:
+            rate = self.learned.get(host, {}).get("rate", self.initial_rps)
+            self.buckets[host] = HostBucket(min(self.max_rps, max(self.min_rps, rate)))
+        return self.buckets[host]
+
+    async def acquire(self, url: str):
+        """Espera a que el host no esté bloqueado y haya una ficha disponible"""
+        bucket = self.bucket(url)
+        async with bucket.lock:
+            while True:
+                now = time.monotonic()
+                if now < bucket.blocked_until:
+                    wait = bucket.blocked_until - now
+                else:
+                    bucket.refill(now)
+                    if bucket.tokens >= 1:
+                        bucket.tokens -= 1
+                        self.stats["requests"] += 1
+                        return
+                    wait = (1 - bucket.tokens) / bucket.rate
+                if wait >= 1:
+                    print(f"⏳ Esperando {wait:.1f}s por el límite de {urlparse(url).netloc}...")
+                self.stats["waited"] += wait
+                await asyncio.sleep(wait)
+
+    def record(self, url: str, status, retry_after=None) -> float:
+        """
+        Registra el resultado de una petición (status None = error de red).
+        Retorna el tiempo de bloqueo aplicado al host (0 si la respuesta fue buena).
+        """
+        bucket = self.bucket(url)
+        if self.throttle_statuses is None:
+            throttled = status is None or status == 429 or status >= 500
+        else:
+            throttled = status is None or status in self.throttle_statuses
+        if not throttled:
+            bucket.failures = 0
+            bucket.rate = min(self.max_rps, bucket.rate + INCREASE_STEP)
+            return 0.0
+
+        self.stats["throttled"] += 1
+        bucket.failures += 1
+        bucket.rate = max(self.min_rps, bucket.rate / 2)
+        delay = retry_after_seconds(retry_after)
+        if delay is None:
+            backoff = min(MAX_BACKOFF, BASE_BACKOFF * 2 ** (bucket.failures - 1))
+            delay = random.uniform(backoff / 2, backoff)  # jitter
+        delay = min(delay, MAX_RETRY_AFTER)
+        bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + delay)
+        bucket.tokens = 0
+        return delay
+
+    def print_stats(self):
+        s = self.stats
+        rates = ", ".join(f"{host}: {b.rate:.2f}/s" for host, b in self.buckets.items())
+        print(f"🚦 Limitador: {s['requests']} peticiones, {s['throttled']} frenadas, "
+              f"{s['waited']:.1f}s de espera ({rates})")
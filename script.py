@@ -1,9 +1,13 @@
 import re
 import requests
 from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
+from datetime import datetime
 import xml.etree.ElementTree as ET
-from difflib import get_close_matches
+from functools import lru_cache
+
+from logo_cache import get_cache
+from logo_index import LogoIndex
+from time_zones import to_spain, utc_time_to_spain
 
 def obtener_url_diaria():
     base_url = "https://www.platinsport.com"
@@ -48,15 +52,13 @@ def extraer_eventos(url):
         elif hasattr(element, "name") and element.name == 'time':
             time_val = element.get("datetime", "").strip()
             try:
-                hora_evento = datetime.fromisoformat(time_val.replace("Z", "")).time()
+                hora_evento = to_spain(time_val).time()
             except Exception:
                 try:
-                    hora_evento = datetime.strptime(time_val, "%H:%M").time()
+                    hora_evento = convertir_a_hora_espana(datetime.strptime(time_val, "%H:%M").time())
                 except Exception:
                     hora_evento = datetime.strptime("23:59", "%H:%M").time()
 
-            hora_evento = convertir_a_utc_mas_1(hora_evento)
-
             event_text = ""
             canales = []
 
@@ -100,35 +102,47 @@ def eliminar_repeticiones_live_stream(event_text):
         event_text = event_text.replace("LIVE STREAM", "").strip()
     return event_text
 
-def convertir_a_utc_mas_1(hora):
-    dt = datetime.combine(datetime.today(), hora)
-    dt_utc1 = dt + timedelta(hours=1)
-    return dt_utc1.time()
+def convertir_a_hora_espana(hora):
+    return utc_time_to_spain(hora)
 
 def normalizar_nombre(nombre):
     # Normaliza el nombre eliminando espacios adicionales y convirtiendo a minúsculas
     return re.sub(r'\s+', ' ', nombre).strip().lower()
 
-def buscar_logo_en_archive(nombre_canal):
-    tree = ET.parse('logos.xml')
+LOGOS_ARCHIVE = 'logos.xml'
+LOGOS_PETICIONES_URL = "https://raw.githubusercontent.com/Icastresana/lista1/refs/heads/main/peticiones"
+
+LOGO_CACHE = get_cache()
+
+@lru_cache(maxsize=None)
+def cargar_indice_archive():
+    # logos.xml se lee una sola vez por proceso
+    tree = ET.parse(LOGOS_ARCHIVE)
     root = tree.getroot()
     nombres_logos = {normalizar_nombre(logo.find('name').text): logo.find('url').text for logo in root.findall('logo') if logo.find('name') is not None}
-    nombre_canal_normalizado = normalizar_nombre(nombre_canal)
-    closest_matches = get_close_matches(nombre_canal_normalizado, nombres_logos.keys(), n=3, cutoff=0.6)
-    if closest_matches:
-        for match in closest_matches:
-            if nombre_canal_normalizado in match:
-                return nombres_logos[match]
-        return nombres_logos[closest_matches[0]]
-    return None
-
-def buscar_logo_en_url(nombre_canal):
-    response = requests.get("https://raw.githubusercontent.com/Icastresana/lista1/refs/heads/main/peticiones")
+    return LogoIndex(nombres_logos)
+
+@lru_cache(maxsize=None)
+def version_archive():
+    # Versión de logos.xml para la caché persistente de logos
+    with open(LOGOS_ARCHIVE, 'rb') as f:
+        return LOGO_CACHE.register("script.archive", LOGOS_ARCHIVE, f.read())
+
+@lru_cache(maxsize=None)
+def descargar_peticiones():
+    # La lista de peticiones se descarga una sola vez por proceso
+    response = requests.get(LOGOS_PETICIONES_URL)
     if response.status_code != 200:
         print("Error al acceder a la URL de logos")
         return None
-    logos_data = response.text.split('\n')
-    nombre_canal_normalizado = normalizar_nombre(nombre_canal)
+    return response.text
+
+@lru_cache(maxsize=None)
+def cargar_indice_url():
+    texto = descargar_peticiones()
+    if texto is None:
+        return None
+    logos_data = texto.split('\n')
     nombres_logos = {}
     for line in logos_data:
         match = re.search(r'tvg-logo="([^"]+)" .*?tvg-id="[^"]+", ([^,]+)', line)
@@ -136,13 +150,25 @@ def buscar_logo_en_url(nombre_canal):
             logo_url = match.group(1)
             canal_name = match.group(2).strip().lower()
             nombres_logos[canal_name] = logo_url
-    closest_matches = get_close_matches(nombre_canal_normalizado, nombres_logos.keys(), n=3, cutoff=0.6)
-    if closest_matches:
-        for match in closest_matches:
-            if nombre_canal_normalizado in match:
-                return nombres_logos[match]
-        return nombres_logos[closest_matches[0]]
-    return None
+    return LogoIndex(nombres_logos)
+
+@lru_cache(maxsize=None)
+def version_url():
+    texto = descargar_peticiones()
+    if texto is None:
+        return None
+    return LOGO_CACHE.register("script.peticiones", LOGOS_PETICIONES_URL, texto)
+
+def buscar_logo_en_archive(nombre_canal):
+    # El índice solo se construye si la caché no tiene el nombre
+    return LOGO_CACHE.resolve("script.archive", version_archive(), normalizar_nombre(nombre_canal),
+                              lambda nombre: cargar_indice_archive().best_scored(nombre))
+
+def buscar_logo_en_url(nombre_canal):
+    if descargar_peticiones() is None:
+        return None
+    return LOGO_CACHE.resolve("script.peticiones", version_url(), normalizar_nombre(nombre_canal),
+                              lambda nombre: cargar_indice_url().best_scored(nombre))
 
 def buscar_logo(nombre_canal):
     logo_url = buscar_logo_en_archive(nombre_canal)
@@ -169,7 +195,7 @@ def guardar_lista_m3u(eventos, archivo="lista.m3u"):
     with open(archivo, "w", encoding="utf-8") as f:
         f.write("#EXTM3U\n")
         for item in eventos:
-            hora_ajustada = convertir_a_utc_mas_1(item["hora"])
+            hora_ajustada = item["hora"]
             canal_id = normalizar_nombre(item["nombre"]).replace(" ", "_")
             nombre_evento = limpiar_nombre_evento(" ".join(item['nombre'].split()))
             logo_url = buscar_logo(item["canal"])
@@ -1,8 +1,13 @@
+import re
 import requests
 import xml.etree.ElementTree as ET
-from datetime import datetime, timedelta
+from datetime import datetime
 from bs4 import BeautifulSoup
 
+from http_cache import get_downloads
+from time_zones import UK_TZ, convert_wall_time
+from xml_writer import write_xml
+
 # URL base del sitio
 base_url = "https://deporte-libre.click"
 
@@ -39,9 +44,15 @@ def fetch_player_url(channel_url):
     return None
 
 # Función para obtener los datos de los canales y logos
+channels_url = "https://raw.githubusercontent.com/tutw/platinsport-m3u-updater/refs/heads/main/lista_canales_DEPORTE-LIBRE.FANS.xml"
+# Versión del análisis guardado por fetch_parsed: súbela al cambiar parse_channel_data o lo que llama
+PARSE_CACHE_VERSION = "1"
+
 def fetch_channel_data():
-    response = requests.get("https://raw.githubusercontent.com/tutw/platinsport-m3u-updater/refs/heads/main/lista_canales_DEPORTE-LIBRE.FANS.xml")
-    response.raise_for_status()
+    # Si la lista de canales no cambió (304) se reutiliza el diccionario ya construido
+    return get_downloads().fetch_parsed(channels_url, parse_channel_data, version=PARSE_CACHE_VERSION)
+
+def parse_channel_data(response):
     channels_tree = ET.fromstring(response.content)
     channels_data = {}
     for channel in channels_tree.findall('channel'):
@@ -54,94 +65,77 @@ def fetch_channel_data():
         }
     return channels_data
 
-# Crear un nuevo árbol XML para la lista de agenda
-agenda_root = ET.Element('agenda')
+# Las claves de día son del tipo "Friday 17th Oct 2025 - Schedule Time UK GMT"
+def fecha_de_clave(day):
+    match = re.search(r'(\d{1,2})(?:st|nd|rd|th)?\s+([A-Za-z]+)\s+(\d{4})', day)
+    if match:
+        texto = f"{match.group(1)} {match.group(2)[:3]} {match.group(3)}"
+        try:
+            return datetime.strptime(texto, '%d %b %Y').date()
+        except ValueError:
+            pass
+    return datetime.now().date()
 
 # Obtener los datos de los canales y logos
 channels_data = fetch_channel_data()
 
-# Iterar sobre los endpoints y procesar los datos
-for endpoint in endpoints:
-    json_data = fetch_json_data(endpoint)
+# Escribir la lista de agenda a medida que se procesan los eventos (ya sangrada)
+with write_xml('lista_agenda_DEPORTE-LIBRE.FANS.xml', 'agenda', compat='etree') as xml:
+    # Iterar sobre los endpoints y procesar los datos
+    for endpoint in endpoints:
+        json_data = fetch_json_data(endpoint)
     
-    # Continuar con el siguiente endpoint si hubo un error
-    if json_data is None:
-        continue
+        # Continuar con el siguiente endpoint si hubo un error
+        if json_data is None:
+            continue
     
-    # Imprimir los datos JSON obtenidos para verificar su estructura
-    print(f"Datos obtenidos de {endpoint}:")
-    print(json_data)
+        # Imprimir los datos JSON obtenidos para verificar su estructura
+        print(f"Datos obtenidos de {endpoint}:")
+        print(json_data)
     
-    for day, day_data in json_data.items():
-        for category, events in day_data.items():
-            for event in events:
-                event_time = event['time']
-                event_info = event['event']
+        for day, day_data in json_data.items():
+            fecha_dia = fecha_de_clave(day)
+            for category, events in day_data.items():
+                for event in events:
+                    event_time = event['time']
+                    event_info = event['event']
                 
-                # Convertir el horario a datetime (se suma 1 hora para ajustar a GMT+1, si es necesario)
-                event_datetime = datetime.strptime(event_time, '%H:%M') + timedelta(hours=1)
+                    # Convertir la hora de UK a hora de España (respetando el horario de verano)
+                    event_datetime = convert_wall_time(fecha_dia, event_time, UK_TZ)
                 
-                # Crear un nuevo elemento en el XML de agenda
-                event_element = ET.SubElement(agenda_root, 'event')
-                name_element = ET.SubElement(event_element, 'name')
-                name_element.text = event_info
-                time_element = ET.SubElement(event_element, 'time')
-                time_element.text = event_datetime.strftime('%H:%M')
+                    # Crear un nuevo elemento en el XML de agenda
+                    xml.start('event')
+                    xml.leaf('name', event_info)
+                    xml.leaf('time', event_datetime.strftime('%H:%M'))
                 
-                # Crear elementos para los canales asociados al evento
-                url_set = set()  # Conjunto para almacenar URLs únicas
-                for channel in event.get('channels', []):
-                    # Validar que `channel` es un diccionario
-                    if isinstance(channel, dict):
-                        channel_name = channel.get('channel_name', 'Desconocido')
-                        channel_id = channel.get('channel_id', '0')
-                        channel_url = f"{base_url}/stream/stream-{channel_id}.php"
+                    # Crear elementos para los canales asociados al evento
+                    url_set = set()  # Conjunto para almacenar URLs únicas
+                    for channel in event.get('channels', []):
+                        # Validar que `channel` es un diccionario
+                        if isinstance(channel, dict):
+                            channel_name = channel.get('channel_name', 'Desconocido')
+                            channel_id = channel.get('channel_id', '0')
+                            channel_url = f"{base_url}/stream/stream-{channel_id}.php"
                         
-                        # Obtener la URL del reproductor principal
-                        player_url = fetch_player_url(channel_url)
+                            # Obtener la URL del reproductor principal
+                            player_url = fetch_player_url(channel_url)
                         
-                        # Crear un nuevo elemento de canal en el XML de agenda
-                        if player_url and player_url not in url_set:
-                            channel_element = ET.SubElement(event_element, 'channel')
-                            channel_name_element = ET.SubElement(channel_element, 'name')
-                            channel_name_element.text = channel_name
-                            channel_url_element = ET.SubElement(channel_element, 'url')
-                            channel_url_element.text = player_url
-                            url_set.add(player_url)
+                            # Crear un nuevo elemento de canal en el XML de agenda
+                            if player_url and player_url not in url_set:
+                                xml.start('channel')
+                                xml.leaf('name', channel_name)
+                                xml.leaf('url', player_url)
+                                url_set.add(player_url)
                             
-                            # Añadir URLs adicionales y logo si coinciden los canales
-                            if channel_name in channels_data:
-                                for extra_url in channels_data[channel_name]['urls']:
-                                    if extra_url not in url_set:
-                                        extra_url_element = ET.SubElement(channel_element, 'url')
-                                        extra_url_element.text = extra_url
-                                        url_set.add(extra_url)
-                                if channels_data[channel_name]['logo']:
-                                    logo_element = ET.SubElement(channel_element, 'logo')
-                                    logo_element.text = channels_data[channel_name]['logo']
-
-# Función para indentar el árbol XML
-def indent(elem, level=0):
-    i = "\n" + level * "  "
-    if len(elem):
-        if not elem.text or not elem.text.strip():
-            elem.text = i + "  "
-        if not elem.tail or not elem.tail.strip():
-            elem.tail = i
-        for elem in elem:
-            indent(elem, level + 1)
-        if not elem.tail or not elem.tail.strip():
-            elem.tail = i
-    else:
-        if level and (not elem.tail or not elem.tail.strip()):
-            elem.tail = i
-
-# Indentar el árbol XML para mejorar la legibilidad
-indent(agenda_root)
-
-# Guardar el árbol XML de agenda en un archivo
-agenda_tree = ET.ElementTree(agenda_root)
-with open('lista_agenda_DEPORTE-LIBRE.FANS.xml', 'wb') as f:
-    agenda_tree.write(f, encoding='utf-8', xml_declaration=True)
+                                # Añadir URLs adicionales y logo si coinciden los canales
+                                if channel_name in channels_data:
+                                    for extra_url in channels_data[channel_name]['urls']:
+                                        if extra_url not in url_set:
+                                            xml.leaf('url', extra_url)
+                                            url_set.add(extra_url)
+                                    if channels_data[channel_name]['logo']:
+                                        xml.leaf('logo', channels_data[channel_name]['logo'])
+                                xml.end()
+                    xml.end()
 
 print("La lista de agenda ha sido actualizada exitosamente.")
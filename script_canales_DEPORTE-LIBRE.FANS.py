@@ -1,9 +1,11 @@
 import requests
 from bs4 import BeautifulSoup
 import xml.etree.ElementTree as ET
-from xml.dom import minidom
 import difflib
 
+from logo_cache import get_cache
+from xml_writer import write_xml
+
 # URL principal para scrapear
 main_url = 'https://deporte-libre.click/en-vivo-online/+canales/'
 logos_url = 'https://raw.githubusercontent.com/tutw/platinsport-m3u-updater/refs/heads/main/logos.xml'
@@ -62,32 +64,32 @@ def load_logos(logos_url):
         logos[name] = url
     return logos
 
+logo_cache = get_cache()
+
 # Función para encontrar el logo más parecido al nombre del canal
-def find_logo(channel_name, logos):
-    closest_matches = difflib.get_close_matches(channel_name.lower(), logos.keys(), n=1, cutoff=0.6)
+def search_logo(name, logos):
+    closest_matches = difflib.get_close_matches(name, logos.keys(), n=1, cutoff=0.6)
     if closest_matches:
-        return logos[closest_matches[0]]
-    return None
+        score = difflib.SequenceMatcher(None, name, closest_matches[0]).ratio()
+        return logos[closest_matches[0]], score
+    return None, None
+
+def find_logo(channel_name, logos, logos_version=None):
+    # Con la versión del catálogo el resultado se guarda en la caché persistente
+    return logo_cache.resolve("canales_deporte_libre", logos_version, channel_name.lower(),
+                              lambda name: search_logo(name, logos))
 
 # Función para guardar los resultados en un archivo XML
 def save_to_xml(channel_data, output_path):
-    root = ET.Element('channels')
-    for channel_name, data in channel_data.items():
-        channel_element = ET.SubElement(root, 'channel', name=channel_name)
-        for url in data['urls']:
-            ET.SubElement(channel_element, 'url').text = url
-        if data.get('logo'):
-            ET.SubElement(channel_element, 'logo').text = data['logo']
-    
-    # Convertir el árbol XML a una cadena
-    xml_str = ET.tostring(root, encoding='utf-8')
-    # "Prettify" la cadena XML
-    parsed_xml = minidom.parseString(xml_str)
-    pretty_xml_str = parsed_xml.toprettyxml(indent="  ")
-
-    # Escribir la cadena "prettify" en el archivo
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(pretty_xml_str)
+    # Cada canal se escribe ya sangrado (mismo formato que minidom.toprettyxml)
+    with write_xml(output_path, 'channels', compat='minidom',
+                   declaration='<?xml version="1.0" ?>') as xml:
+        for channel_name, data in channel_data.items():
+            with xml.element('channel', {'name': channel_name}):
+                for url in data['urls']:
+                    xml.leaf('url', url)
+                if data.get('logo'):
+                    xml.leaf('logo', data['logo'])
 
 # Scrapeamos la lista de canales
 print("Starting to scrape the channel list")
@@ -95,13 +97,14 @@ channel_list = get_channel_list(main_url)
 
 # Cargamos los logos
 logos = load_logos(logos_url)
+logos_version = logo_cache.register("canales_deporte_libre", logos_url, logos)
 
 # Obtenemos los enlaces de streaming para cada canal y el logo correspondiente
 channel_data = {}
 for channel_name, channel_url in channel_list:
     try:
         streaming_urls = get_streaming_urls(channel_url)
-        logo_url = find_logo(channel_name, logos)
+        logo_url = find_logo(channel_name, logos, logos_version)
         channel_data[channel_name] = {'urls': streaming_urls, 'logo': logo_url}
     except requests.RequestException as e:
         print(f"Error fetching streaming URLs for channel {channel_name}: {e}")
@@ -109,5 +112,6 @@ for channel_name, channel_url in channel_list:
 # Guardamos los resultados en un archivo XML con un nombre fijo
 output_path = 'lista_canales_DEPORTE-LIBRE.FANS.xml'
 save_to_xml(channel_data, output_path)
+logo_cache.print_stats()
 
 print(f'Resultados guardados en {output_path}')
@@ -3,6 +3,8 @@ import xml.etree.ElementTree as ET
 import re
 from transformers import pipeline
 
+from xml_writer import write_xml
+
 # Modelo multilingüe y público de HuggingFace
 classifier = pipeline("zero-shot-classification", model="joeddav/xlm-roberta-large-xnli")
 
@@ -117,12 +119,9 @@ for url in urls:
         print(f"No se pudo obtener {url}")
 
 # Crea el XML de salida
-root = ET.Element("eventos")
-for nombre, deporte in resultados:
-    evento_elem = ET.SubElement(root, "evento")
-    ET.SubElement(evento_elem, "nombre").text = nombre
-    ET.SubElement(evento_elem, "deporte").text = deporte
-
-tree = ET.ElementTree(root)
-tree.write("deportes-detectados.xml", encoding="utf-8", xml_declaration=True)
+with write_xml("deportes-detectados.xml", "eventos") as xml:
+    for nombre, deporte in resultados:
+        with xml.element("evento"):
+            xml.leaf("nombre", nombre)
+            xml.leaf("deporte", deporte)
 print("Archivo deportes-detectados.xml generado correctamente.")
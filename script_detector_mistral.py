@@ -6,7 +6,8 @@ import sys
 import traceback
 import time
 import subprocess
-from xml.dom import minidom
+
+from xml_writer import write_xml
 
 MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
 MISTRAL_API_URL = "https://api.mistral.ai/v1/chat/completions"
@@ -199,15 +200,12 @@ def trocear_lista(lista, n):
         yield lista[i:i + n]
 
 def actualizar_y_guardar_xml(deportes_dict, logos_dict, filepath):
-    root = ET.Element("deportes_detectados")
-    for nombre, deporte in sorted(deportes_dict.items()):
-        evento_elem = ET.SubElement(root, "evento")
-        ET.SubElement(evento_elem, "nombre").text = nombre
-        ET.SubElement(evento_elem, "deporte").text = deporte
-        ET.SubElement(evento_elem, "logo").text = obtener_logo(deporte, logos_dict)
-    xmlstr = minidom.parseString(ET.tostring(root, encoding="utf-8")).toprettyxml(indent="  ", encoding="utf-8")
-    with open(filepath, "wb") as f:
-        f.write(xmlstr)
+    with write_xml(filepath, "deportes_detectados", compat="minidom") as xml:
+        for nombre, deporte in sorted(deportes_dict.items()):
+            with xml.element("evento"):
+                xml.leaf("nombre", nombre)
+                xml.leaf("deporte", deporte)
+                xml.leaf("logo", obtener_logo(deporte, logos_dict))
     print(f"[OK] Archivo {filepath} actualizado (pretty-printed).")
 
 def subir_archivo_a_git(filepath, mensaje_commit):
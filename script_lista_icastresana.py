@@ -1,6 +1,8 @@
 import requests
 import xml.etree.ElementTree as ET
 
+from http_cache import get_downloads
+
 # URLs de los archivos en GitHub
 eventos_url = "https://raw.githubusercontent.com/Icastresana/lista1/main/eventos.m3u"
 logos_url = "https://raw.githubusercontent.com/tutw/platinsport-m3u-updater/main/logos_icastresana.xml"
@@ -10,7 +12,7 @@ output_path = "lista_icastresana.m3u"
 
 def download_file(url, description):
     try:
-        response = requests.get(url)
+        response = get_downloads().fetch(url)
         response.raise_for_status()
         return response.text
     except requests.RequestException as e:
@@ -74,6 +76,7 @@ def main():
     print("Descargando archivos...")
     eventos_content = download_file(eventos_url, "eventos.m3u").splitlines()
     logos_content = download_file(logos_url, "logos_icastresana.xml")
+    get_downloads().print_stats()
 
     print("Parseando logos_icastresana.xml...")
     acestream_to_logo = parse_logos_xml(logos_content)
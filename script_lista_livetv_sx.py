@@ -4,18 +4,22 @@
 import requests
 from bs4 import BeautifulSoup
 import re
-import xml.etree.ElementTree as ET
-import xml.dom.minidom
 from datetime import datetime, timedelta
 import time
 import random
 from urllib.parse import urljoin, urlparse
 from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import logging
 import urllib3
 import os
 import sys
 
+from crawler import PoliteCrawler
+from event_store import get_store
+from parse_stage import ParseStage
+from xml_writer import write_xml
+
 # Deshabilitar advertencias de SSL
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -48,6 +52,30 @@ DATE_PATTERNS = [
     r'(\d{1,2})\s+(\w+)[\s,]*(\w+)?',
 ]
 
+COMPETITION_PATTERNS = [
+    r'\(([^)]+)\)',
+    r'(\w+\.\s*\w+(?:\s+\w+)*)',
+    r'(Copa\s+[^,\n]+)',
+    r'(Liga\s+[^,\n]+)',
+    r'(Championship\s+[^,\n]+)',
+    r'(Premier\s+[^,\n]+)',
+    r'(Champions\s+[^,\n]+)',
+    r'(\w+\s+Division)',
+    r'(\w+\.\s*\w+)',
+]
+
+# Patrones compilados una sola vez por proceso (también en los del pool de análisis)
+EVENT_PATH_RE = re.compile(EVENT_PATH_REGEX)
+DATE_TIME_RES = [re.compile(p, re.IGNORECASE) for p in DATE_TIME_PATTERNS]
+DATE_RES = [re.compile(p, re.IGNORECASE) for p in DATE_PATTERNS]
+COMPETITION_RES = [re.compile(p, re.IGNORECASE) for p in COMPETITION_PATTERNS]
+DATE_HEADER_RE = re.compile(r'(Hoy|Mañana|\d+\s+de\s+\w+)')
+HOUR_RE = re.compile(r'(\d{1,2}):(\d{2})')
+ONLY_HOUR_RE = re.compile(r'^\d+:\d+$')
+
+# Campos de cada evento (los procesos de análisis retornan tuplas en este orden)
+EVENT_FIELDS = ("nombre", "deporte", "competicion", "fecha", "hora", "url")
+
 # Diccionario de meses en español
 MESES_ES = {
     'enero': '01', 'febrero': '02', 'marzo': '03', 'abril': '04',
@@ -81,6 +109,8 @@ class EventScraper:
         self.session = requests.Session()
         self.session.headers.update(headers)
         self.current_date_context = None
+        self.page_context = (None, None)  # (soup, fecha) de la página en análisis
+        self.parse_stage = None   # ParseStage (pool de procesos) mientras se rastrea
         self.sports_mapping = {}  # Mapeo dinámico de deportes
         self.sports_urls = {}     # URLs de deportes extraídas
 
@@ -98,7 +128,26 @@ class EventScraper:
                 logging.error(f"Error {response.status_code} al acceder a la página principal")
                 return False
 
-            soup = BeautifulSoup(response.text, 'html.parser')
+            self.parse_sports_mapping(response.text)
+            
+            # Si no se encontraron deportes, usar estrategia de fallback
+            if not self.sports_mapping:
+                logging.warning("No se pudieron extraer deportes automáticamente. Usando estrategia de fallback.")
+                self.fallback_sports_detection()
+                return len(self.sports_mapping) > 0
+            
+            self.log_sports_mapping()
+            return True
+            
+        except Exception as e:
+            logging.error(f"Error extrayendo mapeo de deportes: {e}")
+            self.fallback_sports_detection()
+            return len(self.sports_mapping) > 0
+
+    def parse_sports_mapping(self, html):
+        """Rellena sports_mapping y sports_urls a partir del HTML de la página principal"""
+        try:
+            soup = BeautifulSoup(html, 'html.parser')
             
             # Implementar diferentes estrategias para encontrar los enlaces de deportes
             sport_links = []
@@ -149,22 +198,13 @@ class EventScraper:
                     logging.debug(f"Error procesando enlace de deporte: {e}")
                     continue
             
-            # Si no se encontraron deportes, usar estrategia de fallback
-            if not self.sports_mapping:
-                logging.warning("No se pudieron extraer deportes automáticamente. Usando estrategia de fallback.")
-                self.fallback_sports_detection()
-                return len(self.sports_mapping) > 0
-            
-            logging.info(f"✅ Extraídos {len(self.sports_mapping)} deportes dinámicamente:")
-            for page_num, sport_name in sorted(self.sports_mapping.items()):
-                logging.info(f"   {page_num}: {sport_name}")
-            
-            return True
-            
         except Exception as e:
-            logging.error(f"Error extrayendo mapeo de deportes: {e}")
-            self.fallback_sports_detection()
-            return len(self.sports_mapping) > 0
+            logging.error(f"Error analizando mapeo de deportes: {e}")
+
+    def log_sports_mapping(self):
+        logging.info(f"✅ Extraídos {len(self.sports_mapping)} deportes dinámicamente:")
+        for page_num, sport_name in sorted(self.sports_mapping.items()):
+            logging.info(f"   {page_num}: {sport_name}")
 
     def fallback_sports_detection(self):
         """
@@ -179,25 +219,7 @@ class EventScraper:
                 response = self.session.get(url, verify=False, timeout=10)
                 
                 if response.status_code == 200:
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    
-                    # Buscar indicadores del nombre del deporte en la página
-                    title_elements = soup.find_all(['title', 'h1', 'h2', 'h3'])
-                    for element in title_elements:
-                        text = element.get_text().strip()
-                        # Buscar patrones que indiquen nombre de deporte
-                        sport_match = re.search(r'(Fútbol|Hockey|Baloncesto|Tenis|Voleibol|Boxeo|Automovilismo|Futsal|Balonmano|Rugby|Béisbol|Fútbol americano|Billar|Dardos|Badminton|Ciclismo|Críquet)', text, re.IGNORECASE)
-                        if sport_match:
-                            sport_name = sport_match.group(1)
-                            self.sports_mapping[page_num] = sport_name
-                            self.sports_urls[page_num] = url
-                            logging.debug(f"Deporte detectado por fallback: {page_num} -> {sport_name}")
-                            break
-                    
-                    # Si no se encontró en títulos, usar nombre genérico
-                    if page_num not in self.sports_mapping:
-                        self.sports_mapping[page_num] = f"Deporte_{page_num}"
-                        self.sports_urls[page_num] = url
+                    self.detect_sport_from_page(response.text, page_num, url)
                 
                 # Pequeña pausa para evitar bloqueos
                 time.sleep(0.5)
@@ -206,16 +228,38 @@ class EventScraper:
                 logging.debug(f"Error en fallback para página {page_num}: {e}")
                 continue
 
+    def detect_sport_from_page(self, html, page_num, url):
+        """Deduce el deporte de una página allupcomingsports (estrategia de fallback)"""
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        # Buscar indicadores del nombre del deporte en la página
+        title_elements = soup.find_all(['title', 'h1', 'h2', 'h3'])
+        for element in title_elements:
+            text = element.get_text().strip()
+            # Buscar patrones que indiquen nombre de deporte
+            sport_match = re.search(r'(Fútbol|Hockey|Baloncesto|Tenis|Voleibol|Boxeo|Automovilismo|Futsal|Balonmano|Rugby|Béisbol|Fútbol americano|Billar|Dardos|Badminton|Ciclismo|Críquet)', text, re.IGNORECASE)
+            if sport_match:
+                sport_name = sport_match.group(1)
+                self.sports_mapping[page_num] = sport_name
+                self.sports_urls[page_num] = url
+                logging.debug(f"Deporte detectado por fallback: {page_num} -> {sport_name}")
+                break
+        
+        # Si no se encontró en títulos, usar nombre genérico
+        if page_num not in self.sports_mapping:
+            self.sports_mapping[page_num] = f"Deporte_{page_num}"
+            self.sports_urls[page_num] = url
+
     def extract_date_from_context(self, soup):
         """Extrae la fecha del contexto de la página"""
         try:
-            date_headers = soup.find_all(text=re.compile(r'(Hoy|Mañana|\d+\s+de\s+\w+)'))
+            date_headers = soup.find_all(text=DATE_HEADER_RE)
             
             for header in date_headers:
                 header_text = header.strip()
                 
-                for pattern in DATE_PATTERNS:
-                    match = re.search(pattern, header_text, re.IGNORECASE)
+                for pattern in DATE_RES:
+                    match = pattern.search(header_text)
                     if match:
                         groups = match.groups()
                         
@@ -239,16 +283,24 @@ class EventScraper:
             mes_nombre = list(MESES_ES.keys())[int(today.strftime('%m')) - 1]
             return f"{today.day} de {mes_nombre}"
 
+    def context_date(self, page_soup):
+        """Fecha de contexto de la página; la de la página en curso ya está calculada"""
+        if not page_soup:
+            return "No especificado"
+        context_soup, fecha = self.page_context
+        if page_soup is context_soup:
+            return fecha
+        return self.extract_date_from_context(page_soup)
+
     def parse_date_time(self, text, page_soup=None):
         """Función mejorada para extraer fecha y hora del texto"""
         if not text:
-            fecha_contexto = self.extract_date_from_context(page_soup) if page_soup else "No especificado"
-            return fecha_contexto, "No especificado"
+            return self.context_date(page_soup), "No especificado"
         
         text = text.strip()
         
-        for pattern in DATE_TIME_PATTERNS:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in DATE_TIME_RES:
+            match = pattern.search(text)
             if match:
                 groups = match.groups()
                 
@@ -267,18 +319,16 @@ class EventScraper:
                 elif len(groups) == 2:
                     hora, minuto = groups
                     tiempo = f"{hora.zfill(2)}:{minuto}"
-                    fecha_contexto = self.extract_date_from_context(page_soup) if page_soup else "No especificado"
-                    return fecha_contexto, tiempo
+                    return self.context_date(page_soup), tiempo
         
-        hora_match = re.search(r'(\d{1,2}):(\d{2})', text)
+        hora_match = HOUR_RE.search(text)
         if hora_match:
             hora, minuto = hora_match.groups()
             tiempo = f"{hora.zfill(2)}:{minuto}"
-            fecha_contexto = self.extract_date_from_context(page_soup) if page_soup else "No especificado"
-            return fecha_contexto, tiempo
+            return self.context_date(page_soup), tiempo
         
-        for pattern in DATE_PATTERNS:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in DATE_RES:
+            match = pattern.search(text)
             if match:
                 groups = match.groups()
                 if len(groups) >= 2:
@@ -287,8 +337,7 @@ class EventScraper:
                         fecha = f"{dia} de {mes}"
                         return fecha, "No especificado"
         
-        fecha_contexto = self.extract_date_from_context(page_soup) if page_soup else "No especificado"
-        return fecha_contexto, "No especificado"
+        return self.context_date(page_soup), "No especificado"
 
     def extract_sport_and_competition(self, event_container, soup, page_num):
         """Función mejorada para extraer deporte y competición usando mapeo dinámico"""
@@ -301,23 +350,11 @@ class EventScraper:
             if event_container:
                 event_text = event_container.get_text()
                 
-                competition_patterns = [
-                    r'\(([^)]+)\)',
-                    r'(\w+\.\s*\w+(?:\s+\w+)*)',
-                    r'(Copa\s+[^,\n]+)',
-                    r'(Liga\s+[^,\n]+)',
-                    r'(Championship\s+[^,\n]+)',
-                    r'(Premier\s+[^,\n]+)',
-                    r'(Champions\s+[^,\n]+)',
-                    r'(\w+\s+Division)',
-                    r'(\w+\.\s*\w+)',
-                ]
-                
-                for pattern in competition_patterns:
-                    matches = re.findall(pattern, event_text, re.IGNORECASE)
+                for pattern in COMPETITION_RES:
+                    matches = pattern.findall(event_text)
                     if matches:
                         for match in matches:
-                            if len(match.strip()) > 3 and not re.match(r'^\d+:\d+$', match.strip()):
+                            if len(match.strip()) > 3 and not ONLY_HOUR_RE.match(match.strip()):
                                 competition = match.strip()
                                 break
                         if competition != "No especificado":
@@ -328,14 +365,15 @@ class EventScraper:
         
         return sport, competition
 
-    def extract_events_from_page(self, page_num):
-        """Extrae eventos de una página específica usando el mapeo dinámico"""
+    def page_url(self, page_num):
         # Usar URL del mapeo dinámico si está disponible
         if page_num in self.sports_urls:
-            url = self.sports_urls[page_num]
-        else:
-            url = f"{self.base_url}/es/allupcomingsports/{page_num}/"
-        
+            return self.sports_urls[page_num]
+        return f"{self.base_url}/es/allupcomingsports/{page_num}/"
+
+    def extract_events_from_page(self, page_num):
+        """Extrae eventos de una página específica usando el mapeo dinámico"""
+        url = self.page_url(page_num)
         sport_name = self.sports_mapping.get(page_num, f"Deporte_{page_num}")
         logging.info(f"Procesando página {page_num} ({sport_name}): {url}")
 
@@ -347,17 +385,33 @@ class EventScraper:
                 logging.warning(f"Error {response.status_code} al acceder a la página {page_num}")
                 return []
 
-            soup = BeautifulSoup(response.text, 'html.parser')
+            if self.parse_stage:
+                return self.events_from_rows(self.parse_stage.parse(response.text, page_num))
+            return self.parse_events_page(response.text, page_num)
+            
+        except requests.RequestException as e:
+            logging.error(f"Error de conexión en página {page_num}: {e}")
+            return []
+        except Exception as e:
+            logging.error(f"Error general en página {page_num}: {e}")
+            return []
+
+    def parse_events_page(self, html, page_num):
+        """Analiza el HTML de una página de deporte y retorna sus eventos"""
+        sport_name = self.sports_mapping.get(page_num, f"Deporte_{page_num}")
+        try:
+            soup = BeautifulSoup(html, 'html.parser')
             events = []
 
             self.current_date_context = self.extract_date_from_context(soup)
+            self.page_context = (soup, self.current_date_context)
 
-            event_links = soup.find_all('a', href=re.compile(EVENT_PATH_REGEX))
+            event_links = soup.find_all('a', href=EVENT_PATH_RE)
             
             if not event_links:
                 event_rows = soup.find_all('tr', class_=['evdesc', 'evdesc_LIVE'])
                 for row in event_rows:
-                    links = row.find_all('a', href=re.compile(EVENT_PATH_REGEX))
+                    links = row.find_all('a', href=EVENT_PATH_RE)
                     event_links.extend(links)
 
             for link in event_links:
@@ -401,108 +455,179 @@ class EventScraper:
             logging.info(f"Extraídos {len(events)} eventos de la página {page_num} ({sport_name})")
             return events
             
-        except requests.RequestException as e:
-            logging.error(f"Error de conexión en página {page_num}: {e}")
-            return []
         except Exception as e:
             logging.error(f"Error general en página {page_num}: {e}")
             return []
 
     def create_xml(self, events, output_file="eventos_livetv_sx.xml"):
-        root = ET.Element("eventos")
-        root.set("generado", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-        root.set("total", str(len(events)))
-
         seen_urls = set()
-        unique_count = 0
-
+        unique_events = []
         for event in events:
-            if event["url"] in seen_urls:
-                continue
-
-            seen_urls.add(event["url"])
-            unique_count += 1
-
-            evento_elem = ET.SubElement(root, "evento")
-
-            nombre_elem = ET.SubElement(evento_elem, "nombre")
-            nombre_elem.text = event["nombre"]
-
-            deporte_elem = ET.SubElement(evento_elem, "deporte")
-            deporte_elem.text = event["deporte"]
-
-            competicion_elem = ET.SubElement(evento_elem, "competicion")
-            competicion_elem.text = event["competicion"]
-
-            fecha_elem = ET.SubElement(evento_elem, "fecha")
-            fecha_elem.text = event["fecha"]
-
-            hora_elem = ET.SubElement(evento_elem, "hora")
-            hora_elem.text = event["hora"]
-
-            url_elem = ET.SubElement(evento_elem, "url")
-            url_elem.text = event["url"]
-
-        root.set("total", str(unique_count))
-
-        rough_string = ET.tostring(root, encoding="utf-8")
-        reparsed = xml.dom.minidom.parseString(rough_string)
-        pretty_xml = reparsed.toprettyxml(indent="  ", encoding="utf-8").decode("utf-8")
-
-        with open(output_file, "w", encoding="utf-8") as file:
-            file.write(pretty_xml)
-
-        return unique_count
+            if event["url"] not in seen_urls:
+                seen_urls.add(event["url"])
+                unique_events.append(event)
+
+        attrs = {"generado": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                 "total": str(len(unique_events))}
+        with write_xml(output_file, "eventos", attrs, compat="minidom") as xml:
+            for event in unique_events:
+                with xml.element("evento"):
+                    for field in EVENT_FIELDS:
+                        xml.leaf(field, event[field])
+
+        return len(unique_events)
+
+    def create_parse_stage(self):
+        """Pool de procesos para el análisis, con el mapeo de deportes cargado en cada proceso"""
+        return ParseStage(parse_page_worker, initializer=init_parse_worker,
+                          initargs=(self.base_url, dict(self.sports_mapping)))
+
+    @staticmethod
+    def events_from_rows(rows):
+        return [dict(zip(EVENT_FIELDS, row)) for row in rows]
+
+    def pages_to_process(self):
+        pages = list(self.sports_mapping.keys())
+        if self.max_pages < len(pages):
+            pages = pages[:self.max_pages]
+        return pages
+
+    def crawl_threaded(self):
+        """Modo clásico: requests + ThreadPoolExecutor con pausas aleatorias"""
+        # PASO 1: Extraer mapeo dinámico de deportes
+        logging.info("🔍 Paso 1: Extrayendo mapeo dinámico de deportes...")
+        if not self.extract_sports_mapping():
+            logging.error("❌ Error crítico: No se pudo extraer el mapeo de deportes")
+            return False
 
-    def run(self):
+        # PASO 2: Procesar páginas de deportes encontrados
+        pages_to_process = self.pages_to_process()
+        
+        logging.info(f"🔍 Paso 2: Procesando {len(pages_to_process)} páginas de deportes...")
+        
+        self.parse_stage = self.create_parse_stage()
+
+        # Procesar primera página para verificar conectividad
+        if pages_to_process:
+            test_events = self.extract_events_from_page(pages_to_process[0])
+            if test_events:
+                self.all_events.extend(test_events)
+                logging.info("✅ Conexión verificada exitosamente")
+            else:
+                logging.warning("⚠️ No se pudieron extraer eventos de la primera página. Continuando...")
+
+            # Procesar el resto de páginas con ThreadPoolExecutor
+            if len(pages_to_process) > 1:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    future_to_page = {executor.submit(self.extract_events_from_page, page_num): page_num 
+                                    for page_num in pages_to_process[1:]}
+
+                    for future in future_to_page:
+                        try:
+                            page_events = future.result()
+                            self.all_events.extend(page_events)
+                        except Exception as exc:
+                            page_num = future_to_page[future]
+                            logging.error(f"Página {page_num} generó una excepción: {exc}")
+        self.parse_stage.print_stats()
+        self.parse_stage.close()
+        self.parse_stage = None
+        return True
+
+    async def crawl_async(self, event_queue=None, crawler=None):
+        """
+        Modo asíncrono: una sesión aiohttp con keep-alive, límite de
+        peticiones por host y separación mínima entre ellas (PoliteCrawler)
+        en lugar de pausas aleatorias, y el análisis del HTML en un pool de
+        procesos. Los eventos quedan en el mismo orden que en el modo clásico.
+
+        Con event_queue (asyncio.Queue) cada evento se publica en cuanto se
+        analiza su página como ((posición de la página, posición en la
+        página), evento), y al terminar se publica None. Con crawler se
+        reutiliza una sesión ya abierta.
+        """
+        try:
+            if crawler is not None:
+                return await self._crawl_async(crawler, event_queue)
+            async with PoliteCrawler(headers=headers, per_host=self.max_workers) as crawler:
+                ok = await self._crawl_async(crawler, event_queue)
+                crawler.print_stats()
+                return ok
+        finally:
+            if event_queue is not None:
+                event_queue.put_nowait(None)
+
+    async def _crawl_async(self, crawler, event_queue):
+        # PASO 1: Extraer mapeo dinámico de deportes
+        url = f"{self.base_url}/es/"
+        logging.info(f"🔍 Paso 1: Extrayendo mapeo dinámico de deportes desde: {url}")
+        status, html = await crawler.fetch(url)
+        if status == 200:
+            self.parse_sports_mapping(html)
+        else:
+            logging.error(f"Error {status} al acceder a la página principal")
+
+        if not self.sports_mapping:
+            logging.warning("No se pudieron extraer deportes automáticamente. Usando estrategia de fallback.")
+            urls = [f"{self.base_url}/es/allupcomingsports/{page_num}/" for page_num in range(1, 21)]
+            pages = await crawler.fetch_many(urls)
+            for page_num, url, (status, html) in zip(range(1, 21), urls, pages):
+                if status == 200:
+                    self.detect_sport_from_page(html, page_num, url)
+            if not self.sports_mapping:
+                logging.error("❌ Error crítico: No se pudo extraer el mapeo de deportes")
+                return False
+        else:
+            self.log_sports_mapping()
+
+        # PASO 2: Descargar y analizar las páginas de deportes
+        pages_to_process = self.pages_to_process()
+        logging.info(f"🔍 Paso 2: Procesando {len(pages_to_process)} páginas de deportes...")
+
+        with self.create_parse_stage() as stage:
+            async def crawl_page(position, page_num):
+                url = self.page_url(page_num)
+                logging.info(f"Procesando página {page_num} "
+                             f"({self.sports_mapping.get(page_num, f'Deporte_{page_num}')}): {url}")
+                status, html = await crawler.fetch(url)
+                if status != 200:
+                    logging.warning(f"Error {status} al acceder a la página {page_num}")
+                    return []
+                events = self.events_from_rows(await stage.parse_async(html, page_num))
+                if event_queue is not None:
+                    for index, event in enumerate(events):
+                        event_queue.put_nowait(((position, index), event))
+                return events
+
+            results = await asyncio.gather(*(crawl_page(position, page_num)
+                                             for position, page_num in enumerate(pages_to_process)))
+            stage.print_stats()
+
+        for page_events in results:
+            self.all_events.extend(page_events)
+        return True
+
+    def run(self, use_async=False):
         start_time = datetime.now()
         logging.info(f"Iniciando scraping de eventos deportivos en {start_time}")
 
         try:
-            # PASO 1: Extraer mapeo dinámico de deportes
-            logging.info("🔍 Paso 1: Extrayendo mapeo dinámico de deportes...")
-            if not self.extract_sports_mapping():
-                logging.error("❌ Error crítico: No se pudo extraer el mapeo de deportes")
+            if use_async:
+                if not asyncio.run(self.crawl_async()):
+                    return False
+            elif not self.crawl_threaded():
                 return False
 
-            # PASO 2: Procesar páginas de deportes encontrados
-            pages_to_process = list(self.sports_mapping.keys())
-            if self.max_pages < len(pages_to_process):
-                pages_to_process = pages_to_process[:self.max_pages]
-            
-            logging.info(f"🔍 Paso 2: Procesando {len(pages_to_process)} páginas de deportes...")
-            
-            # Procesar primera página para verificar conectividad
-            if pages_to_process:
-                test_events = self.extract_events_from_page(pages_to_process[0])
-                if test_events:
-                    self.all_events.extend(test_events)
-                    logging.info("✅ Conexión verificada exitosamente")
-                else:
-                    logging.warning("⚠️ No se pudieron extraer eventos de la primera página. Continuando...")
-
-                # Procesar el resto de páginas con ThreadPoolExecutor
-                if len(pages_to_process) > 1:
-                    with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                        future_to_page = {executor.submit(self.extract_events_from_page, page_num): page_num 
-                                        for page_num in pages_to_process[1:]}
-
-                        for future in future_to_page:
-                            try:
-                                page_events = future.result()
-                                self.all_events.extend(page_events)
-                            except Exception as exc:
-                                page_num = future_to_page[future]
-                                logging.error(f"Página {page_num} generó una excepción: {exc}")
-
             logging.info(f"Total de eventos extraídos antes de eliminar duplicados: {len(self.all_events)}")
 
             if not self.all_events:
                 logging.error("❌ No se extrajo ningún evento. Verifique la conectividad y la estructura del sitio web.")
                 return False
 
-            # PASO 3: Crear el archivo XML
-            unique_count = self.create_xml(self.all_events)
+            # PASO 3: Guardar en el almacén y exportar el XML como vista de la ejecución
+            store = get_store()
+            store.upsert_events("livetv", self.all_events)
+            unique_count = self.create_xml(store.events("livetv"))
             logging.info(f"✅ Total de eventos únicos guardados en XML: {unique_count}")
 
             # Mostrar resumen por deporte
@@ -524,6 +649,22 @@ class EventScraper:
             logging.error(f"💥 Error crítico durante la ejecución: {e}")
             return False
 
+
+_worker_scraper = None
+
+
+def init_parse_worker(base_url, sports_mapping):
+    """Inicializador de cada proceso de análisis: su propio EventScraper (sin red)"""
+    global _worker_scraper
+    _worker_scraper = EventScraper(base_url)
+    _worker_scraper.sports_mapping = sports_mapping
+
+
+def parse_page_worker(html, page_num):
+    """Analiza una página de deporte en un proceso del pool; retorna tuplas en orden EVENT_FIELDS"""
+    events = _worker_scraper.parse_events_page(html, page_num)
+    return [tuple(event[field] for field in EVENT_FIELDS) for event in events]
+
 # Script principal
 if __name__ == "__main__":
     try:
@@ -533,6 +674,9 @@ if __name__ == "__main__":
         parser.add_argument('--workers', type=int, default=3, help='Número máximo de trabajadores concurrentes (default: 3)')
         parser.add_argument('--output', type=str, default="eventos_livetv_sx.xml", help='Nombre del archivo XML de salida')
         parser.add_argument('--debug', action='store_true', help='Activar logging de debug')
+        parser.add_argument('--async', dest='use_async', action='store_true',
+                            default=os.environ.get('LIVETV_ASYNC', '').lower() in ('1', 'true', 'yes'),
+                            help='Crawler asíncrono (aiohttp + pool de procesos) en lugar de hilos con pausas')
         args = parser.parse_args()
 
         if args.debug:
@@ -542,7 +686,7 @@ if __name__ == "__main__":
 
         # Crear y ejecutar el scraper
         scraper = EventScraper(max_pages=args.pages, max_workers=args.workers)
-        success = scraper.run()
+        success = scraper.run(use_async=args.use_async)
 
         if success:
             print(f"✅ Scraping completado exitosamente. Resultados guardados en {args.output}")
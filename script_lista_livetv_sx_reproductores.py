@@ -1,7 +1,10 @@
 import requests
 import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta
+import asyncio
+import heapq
 import json
+import os
 import time
 import re
 from urllib.parse import urljoin, urlparse
@@ -9,42 +12,74 @@ import warnings
 import ssl
 from bs4 import BeautifulSoup
 
+from crawler import PoliteCrawler
+from event_store import day_bounds, get_store
+from http_cache import get_downloads
+from parse_stage import ParseStage
+from time_zones import localize, parse_fechas_es, to_spain
+from xml_writer import write_xml
+
 warnings.filterwarnings('ignore')
 ssl._create_default_https_context = ssl._create_unverified_context
 
+# Resolución concurrente de streams
+MAX_CONEXIONES = int(os.environ.get('REPRODUCTORES_CONEXIONES', '16'))
+MAX_CONEXIONES_HOST = int(os.environ.get('REPRODUCTORES_CONEXIONES_HOST', '4'))
+IFRAME_CACHE_FILE = os.environ.get('REPRODUCTORES_IFRAME_CACHE', 'iframe_cache.json')
+IFRAME_CACHE_TTL = float(os.environ.get('REPRODUCTORES_IFRAME_TTL_H', '24')) * 3600
+IFRAME_CACHE_TTL_FALLO = float(os.environ.get('REPRODUCTORES_IFRAME_TTL_FALLO_H', '1')) * 3600
+XML_FUENTE_LOCAL = os.environ.get('LIVETV_XML_LOCAL', 'eventos_livetv_sx.xml')
+LIVETV_PAGINAS = int(os.environ.get('LIVETV_PAGINAS', '20'))
+
+# Planificación por hora de inicio
+VENTANA = float(os.environ.get('REPRODUCTORES_VENTANA_H', '3')) * 3600
+MARGEN_DIRECTO = float(os.environ.get('REPRODUCTORES_MARGEN_DIRECTO_MIN', '120')) * 60
+MAX_EVENTOS_SIMULTANEOS = int(os.environ.get('REPRODUCTORES_EVENTOS_SIMULTANEOS', '8'))
+LOTE = int(os.environ.get('REPRODUCTORES_LOTE', '20'))
+OUTPUT_PATH = 'eventos_livetv_sx_con_reproductores.xml'
+# Versión del análisis guardado por fetch_parsed: súbela al cambiar cómo se analiza el XML fuente
+PARSE_CACHE_VERSION = '1'
+
 def obtener_eventos_xml():
-    """Descarga y parsea el XML fuente"""
+    """XML fuente: el generado en local por script_lista_livetv_sx.py si existe; si no, el publicado"""
+    if os.path.exists(XML_FUENTE_LOCAL):
+        try:
+            print(f"📂 Usando el XML local {XML_FUENTE_LOCAL}")
+            return ET.parse(XML_FUENTE_LOCAL).getroot()
+        except ET.ParseError as e:
+            print(f"⚠️  XML local no válido ({e}), se descarga el publicado")
+
     url = "https://raw.githubusercontent.com/tutw/platinsport-m3u-updater/refs/heads/main/eventos_livetv_sx.xml"
     try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        root = ET.fromstring(response.content)
-        return root
+        # Con 304 se reutiliza el árbol ya analizado en la ejecución anterior
+        return get_downloads().fetch_parsed(url, lambda resp: ET.fromstring(resp.content), timeout=30,
+                                              version=PARSE_CACHE_VERSION)
     except Exception as e:
         print(f"Error al obtener XML: {e}")
         return None
 
-def filtrar_eventos_hoy(root):
-    """Filtra eventos del día actual"""
-    eventos_hoy = []
+def fecha_de_hoy():
+    """Fecha de hoy con el formato del XML fuente ("17 de octubre")"""
     # Mapeo de meses en inglés a español
     meses_map = {
         "January": "enero", "February": "febrero", "March": "marzo", "April": "abril",
         "May": "mayo", "June": "junio", "July": "julio", "August": "agosto",
         "September": "septiembre", "October": "octubre", "November": "noviembre", "December": "diciembre"
     }
-    fecha_actual = datetime.now()
+    fecha_actual = to_spain(time.time())
     dia = fecha_actual.day
     mes_ingles = fecha_actual.strftime("%B")
     mes_español = meses_map.get(mes_ingles, mes_ingles.lower())
-    fecha_buscar = f"{dia} de {mes_español}"
+    return f"{dia} de {mes_español}"
 
-    for evento in root.findall('evento'):
-        fecha_elem = evento.find('fecha')
-        if fecha_elem is not None and fecha_elem.text == fecha_buscar:
-            eventos_hoy.append(evento)
-
-    return eventos_hoy
+def eventos_relevantes(store, ahora=None):
+    """
+    Consulta indexada al almacén: eventos de hoy y los de mañana que
+    empiezan dentro de la ventana, en el orden del XML fuente
+    """
+    ahora = ahora or to_spain(time.time())
+    inicio, fin = day_bounds(ahora.date())
+    return store.query('livetv', start=inicio, end=max(fin, ahora.timestamp() + VENTANA))
 
 def crear_mapeo_banderas():
     """Crea el mapeo de números de bandera a idiomas basado en la prueba real"""
@@ -81,87 +116,125 @@ def crear_mapeo_banderas():
         '30': 'Serbio'
     }
 
-def extraer_streams_evento(url):
+HEADERS_EVENTO = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'es-ES,es;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+HEADERS_STREAM = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+}
+
+# Patrones compilados una sola vez por proceso (también en los del pool de análisis)
+PATRONES_BANDERA = [re.compile(patron) for patron in (
+    r'/img/linkflag/(\d+)\.gif',
+    r'/linkflag/(\d+)\.gif',
+    r'linkflag/(\d+)',
+    r'flag.*?(\d+)',
+    r'/(\d+)\.gif',
+)]
+IFRAME_EN_SCRIPT_RE = re.compile(r'["\']https?://[^"\']*(?:embed|player|stream)[^"\']*["\']')
+
+_MAPEO_BANDERAS = crear_mapeo_banderas()
+
+
+def analizar_pagina_evento(html, url):
+    """
+    Análisis (sin red) de la página de un evento, pensado para el pool de
+    procesos. Retorna (hay_links_block, filas, candidatos, ocultos):
+    candidatos son tuplas (numero_bandera, idioma, [enlaces]) en orden de
+    aparición y ocultos, dicts de stream ya completos.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    # Buscar el bloque de enlaces
+    links_block = soup.find(id='links_block')
+    if not links_block:
+        return False, 0, [], []
+
+    candidatos = []
+    # Buscar todas las filas que contienen streams
+    filas = links_block.find_all('tr')
+    for i, fila in enumerate(filas):
+        try:
+            # Buscar imágenes de banderas en la fila
+            imagenes_bandera = fila.find_all('img')
+            enlaces = fila.find_all('a', href=True)
+            
+            if imagenes_bandera and enlaces:
+                for img in imagenes_bandera:
+                    src = img.get('src', '')
+                    
+                    # Extraer número de bandera del src
+                    numero_bandera = extraer_numero_bandera(src)
+                    
+                    if numero_bandera:
+                        idioma = _MAPEO_BANDERAS.get(numero_bandera, f'Bandera #{numero_bandera}')
+                        
+                        # Enlaces de la misma fila, en orden: se usa el primero que resuelva un iframe
+                        hrefs = []
+                        for enlace in enlaces:
+                            href = enlace.get('href')
+                            if href and not href.startswith('#'):
+                                # Convertir URL relativa a absoluta
+                                if href.startswith('/'):
+                                    href = urljoin(url, href)
+                                elif not href.startswith('http'):
+                                    href = urljoin(url, href)
+                                hrefs.append(href)
+                        if hrefs:
+                            candidatos.append((numero_bandera, idioma, hrefs))
+                
+        except Exception as e:
+            print(f"⚠️  Error procesando fila {i}: {e}")
+            continue
+
+    # MEJORA: Buscar iframes adicionales ocultos
+    ocultos = buscar_iframes_ocultos(soup, url)
+    return True, len(filas), candidatos, ocultos
+
+
+def extraer_streams_evento(url, parse_stage=None):
     """Extrae streams de un evento específico con detección correcta de banderas"""
     streams = []
 
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'es-ES,es;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        }
-
-        response = requests.get(url, headers=headers, timeout=15, verify=False)
+        response = requests.get(url, headers=HEADERS_EVENTO, timeout=15, verify=False)
         response.raise_for_status()
 
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Buscar el bloque de enlaces
-        links_block = soup.find(id='links_block')
+        # Los bytes van tal cual al análisis (BeautifulSoup detecta la codificación)
+        if parse_stage:
+            hay_bloque, filas, candidatos, ocultos = parse_stage.parse(response.content, url)
+        else:
+            hay_bloque, filas, candidatos, ocultos = analizar_pagina_evento(response.content, url)
         
-        if links_block:
+        if hay_bloque:
             print(f"✅ Encontrado links_block")
+            print(f"📊 Encontradas {filas} filas en total")
             
-            # Crear mapeo de banderas
-            mapeo_banderas = crear_mapeo_banderas()
-            
-            # Buscar todas las filas que contienen streams
-            filas = links_block.find_all('tr')
-            print(f"📊 Encontradas {len(filas)} filas en total")
-            
-            for i, fila in enumerate(filas):
-                try:
-                    # Buscar imágenes de banderas en la fila
-                    imagenes_bandera = fila.find_all('img')
-                    enlaces = fila.find_all('a', href=True)
-                    
-                    if imagenes_bandera and enlaces:
-                        for img in imagenes_bandera:
-                            src = img.get('src', '')
-                            
-                            # Extraer número de bandera del src
-                            numero_bandera = extraer_numero_bandera(src)
-                            
-                            if numero_bandera:
-                                idioma = mapeo_banderas.get(numero_bandera, f'Bandera #{numero_bandera}')
-                                
-                                # Buscar enlace correspondiente en la misma fila
-                                for enlace in enlaces:
-                                    href = enlace.get('href')
-                                    if href and not href.startswith('#'):
-                                        # Convertir URL relativa a absoluta
-                                        if href.startswith('/'):
-                                            href = urljoin(url, href)
-                                        elif not href.startswith('http'):
-                                            href = urljoin(url, href)
-                                        
-                                        # Extraer iframe real
-                                        iframe_url = extraer_iframe_real(href)
-                                        if iframe_url:
-                                            # CORREGIDO: forzar formato de idioma
-                                            idioma_url = f'https://cdn.livetv860.me/img/linkflag/{numero_bandera}.png'
-
-                                            stream_data = {
-                                                'url': iframe_url,
-                                                'idioma': idioma_url,
-                                                'idioma_nombre': idioma,
-                                                'enlace_original': href
-                                            }
-                                            streams.append(stream_data)
-                                            print(f"  🎯 Stream encontrado: {idioma} -> {iframe_url[:50]}...")
-                                            break  # Un enlace por bandera
-                        
-                except Exception as e:
-                    print(f"⚠️  Error procesando fila {i}: {e}")
-                    continue
-
-            # MEJORA: Buscar iframes adicionales ocultos
-            iframes_ocultos = buscar_iframes_ocultos(soup, url)
-            for iframe_oculto in iframes_ocultos:
+            for numero_bandera, idioma, hrefs in candidatos:
+                for href in hrefs:
+                    # Extraer iframe real
+                    iframe_url = extraer_iframe_real(href)
+                    if iframe_url:
+                        # CORREGIDO: forzar formato de idioma
+                        idioma_url = f'https://cdn.livetv860.me/img/linkflag/{numero_bandera}.png'
+
+                        stream_data = {
+                            'url': iframe_url,
+                            'idioma': idioma_url,
+                            'idioma_nombre': idioma,
+                            'enlace_original': href
+                        }
+                        streams.append(stream_data)
+                        print(f"  🎯 Stream encontrado: {idioma} -> {iframe_url[:50]}...")
+                        break  # Un enlace por bandera
+
+            for iframe_oculto in ocultos:
                 if not any(stream['url'] == iframe_oculto['url'] for stream in streams):
                     streams.append(iframe_oculto)
 
@@ -189,16 +262,8 @@ def extraer_numero_bandera(src):
             return None
             
         # Patrones para detectar números de bandera
-        patrones = [
-            r'/img/linkflag/(\d+)\.gif',
-            r'/linkflag/(\d+)\.gif', 
-            r'linkflag/(\d+)',
-            r'flag.*?(\d+)',
-            r'/(\d+)\.gif'
-        ]
-        
-        for patron in patrones:
-            match = re.search(patron, src)
+        for patron in PATRONES_BANDERA:
+            match = patron.search(src)
             if match:
                 return match.group(1)
         
@@ -234,7 +299,7 @@ def buscar_iframes_ocultos(soup, base_url):
         scripts = soup.find_all('script')
         for script in scripts:
             if script.string:
-                iframe_urls = re.findall(r'["\']https?://[^"\']*(?:embed|player|stream)[^"\']*["\']', script.string)
+                iframe_urls = IFRAME_EN_SCRIPT_RE.findall(script.string)
                 for url_match in iframe_urls:
                     clean_url = url_match.strip('"\'')
                     iframe_data = {
@@ -253,14 +318,19 @@ def buscar_iframes_ocultos(soup, base_url):
 def extraer_iframe_real(stream_url):
     """Extrae el iframe real de una URL de stream"""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        }
-
-        response = requests.get(stream_url, headers=headers, timeout=10, verify=False)
+        response = requests.get(stream_url, headers=HEADERS_STREAM, timeout=10, verify=False)
         response.raise_for_status()
 
-        soup = BeautifulSoup(response.content, 'html.parser')
+        return analizar_pagina_stream(response.content, stream_url)
+
+    except Exception as e:
+        print(f"⚠️  Error extrayendo iframe de {stream_url}: {e}")
+        return None
+
+def analizar_pagina_stream(html, stream_url):
+    """Iframe del reproductor dentro de la página de un enlace (sin red)"""
+    try:
+        soup = BeautifulSoup(html, 'html.parser')
         iframes = soup.find_all('iframe', src=True)
 
         for iframe in iframes:
@@ -284,163 +354,347 @@ def extraer_iframe_real(stream_url):
         return None
 
     except Exception as e:
-        print(f"⚠️  Error extrayendo iframe de {stream_url}: {e}")
+        print(f"⚠️  Error analizando iframe de {stream_url}: {e}")
         return None
 
 def convertir_a_datetime_iso(fecha_str, hora_str):
     """Convierte fecha y hora en formato español a datetime ISO"""
-    try:
-        meses = {
-            'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4,
-            'mayo': 5, 'junio': 6, 'julio': 7, 'agosto': 8,
-            'septiembre': 9, 'octubre': 10, 'noviembre': 11, 'diciembre': 12
-        }
-
-        partes_fecha = fecha_str.split(' de ')
-        if len(partes_fecha) == 2:
-            dia = int(partes_fecha[0])
-            mes_nombre = partes_fecha[1].lower()
-            mes = meses.get(mes_nombre, 6)
-            año = datetime.now().year
-
-            if ':' in hora_str:
-                hora_partes = hora_str.split(':')
-                hora = int(hora_partes[0])
-                minuto = int(hora_partes[1])
-            else:
-                hora = 0
-                minuto = 0
+    return parse_fechas_es([(fecha_str, hora_str)])[0]
 
-            dt = datetime(año, mes, dia, hora, minuto)
-            return dt.strftime('%Y-%m-%dT%H:%M:%S')
+class IframeCache:
+    """Caché persistente enlace_original -> iframe (los fallos caducan antes)"""
 
-        return f"{datetime.now().year}-{datetime.now().month:02d}-{datetime.now().day:02d}T00:00:00"
-
-    except Exception as e:
-        return f"{datetime.now().year}-{datetime.now().month:02d}-{datetime.now().day:02d}T00:00:00"
-
-def procesar_todos_los_eventos(eventos_hoy, max_eventos=None):
-    """Procesa todos los eventos del día y extrae sus streams"""
-    eventos_procesados = []
-    total_eventos = len(eventos_hoy) if max_eventos is None else min(len(eventos_hoy), max_eventos)
-
-    print(f"🔄 Procesando {total_eventos} eventos...")
-
-    for i, evento in enumerate(eventos_hoy[:total_eventos]):
+    def __init__(self, path=IFRAME_CACHE_FILE, ttl=IFRAME_CACHE_TTL, ttl_fallo=IFRAME_CACHE_TTL_FALLO):
+        self.path = path
+        self.ttl = ttl
+        self.ttl_fallo = ttl_fallo
+        self.aciertos = 0
         try:
-            nombre = evento.find('nombre').text if evento.find('nombre') is not None else "N/A"
-            deporte = evento.find('deporte').text if evento.find('deporte') is not None else "N/A"
-            competicion = evento.find('competicion').text if evento.find('competicion') is not None else "N/A"
-            fecha = evento.find('fecha').text if evento.find('fecha') is not None else ""
-            hora = evento.find('hora').text if evento.find('hora') is not None else "00:00"
-            url = evento.find('url').text if evento.find('url') is not None else ""
-
-            print(f"\n📺 Procesando evento {i+1}/{total_eventos}: {nombre}")
-
-            streams = extraer_streams_evento(url)
-            datetime_iso = convertir_a_datetime_iso(fecha, hora)
-
-            evento_procesado = {
-                'id': i + 1,
-                'nombre': nombre,
-                'deporte': deporte,
-                'competicion': competicion,
-                'fecha': fecha,
-                'hora': hora,
-                'url': url,
-                'datetime_iso': datetime_iso,
-                'streams': streams
+            with open(path, encoding='utf-8') as f:
+                self.datos = json.load(f)
+        except (OSError, ValueError):
+            self.datos = {}
+
+    def get(self, enlace):
+        """(True, iframe o None) si hay resultado vigente; (False, None) si hay que resolverlo"""
+        entrada = self.datos.get(enlace)
+        if entrada:
+            ttl = self.ttl if entrada['iframe'] else self.ttl_fallo
+            if time.time() - entrada['fecha'] < ttl:
+                self.aciertos += 1
+                return True, entrada['iframe']
+        return False, None
+
+    def put(self, enlace, iframe):
+        self.datos[enlace] = {'iframe': iframe, 'fecha': int(time.time())}
+
+    def save(self):
+        ahora = time.time()
+        datos = {enlace: e for enlace, e in self.datos.items()
+                 if ahora - e['fecha'] < (self.ttl if e['iframe'] else self.ttl_fallo)}
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+def datos_evento(evento):
+    """Campos de un <evento> del XML fuente"""
+    def texto(tag, defecto):
+        elem = evento.find(tag)
+        return elem.text if elem is not None else defecto
+    return {
+        'nombre': texto('nombre', "N/A"),
+        'deporte': texto('deporte', "N/A"),
+        'competicion': texto('competicion', "N/A"),
+        'fecha': texto('fecha', ""),
+        'hora': texto('hora', "00:00"),
+        'url': texto('url', ""),
+    }
+
+async def resolver_iframe_async(crawler, cache, enlace):
+    """Iframe real de un enlace: desde la caché o descargando la página del enlace"""
+    en_cache, iframe = cache.get(enlace)
+    if en_cache:
+        return iframe
+    status, html = await crawler.fetch(enlace, headers=HEADERS_STREAM)
+    iframe = analizar_pagina_stream(html, enlace) if status == 200 else None
+    if status is not None:
+        # Los errores de red no se guardan: se reintentan en la siguiente ejecución
+        cache.put(enlace, iframe)
+    return iframe
+
+async def resolver_candidato_async(crawler, cache, numero_bandera, idioma, hrefs):
+    """Primer enlace de la bandera que resuelve un iframe (mismo orden que en la página)"""
+    for href in hrefs:
+        iframe_url = await resolver_iframe_async(crawler, cache, href)
+        if iframe_url:
+            return {
+                'url': iframe_url,
+                # CORREGIDO: forzar formato de idioma
+                'idioma': f'https://cdn.livetv860.me/img/linkflag/{numero_bandera}.png',
+                'idioma_nombre': idioma,
+                'enlace_original': href
             }
+    return None
 
-            eventos_procesados.append(evento_procesado)
-            
-            print(f"✅ Evento {i+1} procesado: {len(streams)} streams encontrados")
-            
-            for j, stream in enumerate(streams):
-                idioma_nombre = stream.get('idioma_nombre', 'Sin idioma')
-                print(f"   🎯 Stream {j+1}: {idioma_nombre}")
+async def extraer_streams_evento_async(crawler, parse_stage, cache, url):
+    """Versión concurrente de extraer_streams_evento: todas las banderas a la vez"""
+    status, html = await crawler.fetch(url)
+    if status != 200:
+        print(f"❌ Error al extraer streams de {url}: HTTP {status}")
+        return []
 
-            time.sleep(2)  # Pausa para no sobrecargar el servidor
+    hay_bloque, filas, candidatos, ocultos = await parse_stage.parse_async(html, url)
+    if not hay_bloque:
+        print(f"❌ No se encontró links_block en {url}")
+        return []
 
-        except Exception as e:
-            print(f"❌ Error procesando evento {i+1}: {e}")
-            continue
+    resueltos = await asyncio.gather(*(
+        resolver_candidato_async(crawler, cache, *candidato) for candidato in candidatos
+    ))
+    streams = [stream for stream in resueltos if stream]
+    for iframe_oculto in ocultos:
+        if not any(stream['url'] == iframe_oculto['url'] for stream in streams):
+            streams.append(iframe_oculto)
+
+    # Eliminar streams duplicados por URL
+    unique_streams = {}
+    for stream in streams:
+        unique_streams.setdefault(stream['url'], stream)
+    return list(unique_streams.values())
+
+def evento_resuelto(datos, indice, streams):
+    evento_procesado = {'id': indice}
+    evento_procesado.update(datos)
+    evento_procesado['datetime_iso'] = convertir_a_datetime_iso(datos['fecha'], datos['hora'])
+    evento_procesado['streams'] = streams
+    return evento_procesado
+
+async def procesar_evento_async(crawler, parse_stage, cache, datos, indice):
+    try:
+        streams = await extraer_streams_evento_async(crawler, parse_stage, cache, datos['url'])
+    except Exception as e:
+        print(f"❌ Error procesando evento {indice}: {e}")
+        return None
 
+    evento_procesado = evento_resuelto(datos, indice, streams)
+    idiomas = ", ".join(stream.get('idioma_nombre', 'Sin idioma') for stream in streams)
+    print(f"✅ Evento {indice} {datos['nombre']}: {len(streams)} streams ({idiomas})")
+    return evento_procesado
+
+def inicio_evento(datos):
+    """Hora de inicio del evento (datetime de España con zona); las fechas inválidas dan hoy a las 00:00"""
+    return localize(parse_fechas_es([(datos['fecha'], datos['hora'])], fmt=None)[0])
+
+def es_evento_relevante(datos, fecha_hoy, ahora):
+    """Eventos de hoy y los que empiezan dentro de la ventana aunque ya sean de mañana"""
+    if datos['fecha'] == fecha_hoy:
+        return True
+    return 0 <= (inicio_evento(datos) - ahora).total_seconds() <= VENTANA
+
+class PlanificadorEventos:
+    """
+    Min-heap de eventos por hora de inicio respecto a ahora: primero los que
+    están en juego o empiezan dentro de la ventana, después los posteriores
+    y al final los que ya terminaron.
+    """
+
+    def __init__(self, ahora=None, ventana=VENTANA, margen=MARGEN_DIRECTO):
+        self.ahora = ahora or to_spain(time.time())
+        self.ventana = ventana
+        self.margen = margen
+        self.heap = []
+
+    def prioridad(self, datos):
+        inicio = inicio_evento(datos)
+        delta = (inicio - self.ahora).total_seconds()
+        if -self.margen <= delta <= self.ventana:
+            return (0, inicio.timestamp())
+        if delta > self.ventana:
+            return (1, inicio.timestamp())
+        # Ya terminados: los más recientes antes
+        return (2, -inicio.timestamp())
+
+    def push(self, clave, datos):
+        heapq.heappush(self.heap, (self.prioridad(datos), clave, datos))
+
+    def pop(self):
+        _, clave, datos = heapq.heappop(self.heap)
+        return clave, datos
+
+    def __len__(self):
+        return len(self.heap)
+
+async def procesar_cola_async(cola, fecha=None, crawler=None, publicar=None):
+    """
+    Consume tuplas (clave, datos) de una asyncio.Queue hasta recibir None.
+    Los eventos (solo los relevantes para `fecha` si se indica) entran en un
+    PlanificadorEventos y MAX_EVENTOS_SIMULTANEOS trabajadores los resuelven
+    por orden de inicio: los que empiezan en las próximas horas primero.
+    Cada LOTE eventos resueltos se llama a publicar(eventos) con la salida
+    parcial ya ordenada.
+
+    La clave da el orden del XML fuente: si una URL llega repetida se
+    conservan los datos de la clave menor, como al deduplicar el XML.
+
+    Sesión compartida con límite global y por host (la del llamador si se
+    pasa `crawler`), análisis en el pool de procesos y caché persistente
+    de iframes.
+    """
+    cache = IframeCache()
+    store = get_store()
+    ahora = to_spain(time.time())
+    planificador = PlanificadorEventos(ahora)
+    claves, datos_por_url, resueltos = {}, {}, {}
+    hay_trabajo = asyncio.Event()
+    estado = {'fin_entrada': False, 'iniciados': 0, 'publicados': 0}
+
+    def salida():
+        eventos = []
+        for url, evento in resueltos.items():
+            evento.update(datos_por_url[url])
+            eventos.append(evento)
+        eventos.sort(key=lambda evento: claves[evento['url']])
+        return ordenar_eventos(eventos)
+
+    async def lector():
+        while True:
+            item = await cola.get()
+            if item is None:
+                break
+            clave, datos = item
+            if fecha is not None and not es_evento_relevante(datos, fecha, ahora):
+                continue
+            url = datos['url']
+            if url in claves:
+                if clave < claves[url]:
+                    claves[url], datos_por_url[url] = clave, datos
+                continue
+            claves[url], datos_por_url[url] = clave, datos
+            streams = store.resolved_streams(url)
+            if streams is not None:
+                # Resuelto hace poco en otra ejecución: no se vuelve a descargar
+                resueltos[url] = evento_resuelto(datos, 0, streams)
+                continue
+            planificador.push(clave, datos)
+            hay_trabajo.set()
+        estado['fin_entrada'] = True
+        hay_trabajo.set()
+
+    async def trabajador():
+        while True:
+            if planificador:
+                _, datos = planificador.pop()
+                estado['iniciados'] += 1
+                evento = await procesar_evento_async(crawler, parse_stage, cache, datos,
+                                                     estado['iniciados'])
+                if evento:
+                    store.set_streams('livetv', datos, evento['streams'])
+                    resueltos[datos['url']] = evento
+                    if publicar and len(resueltos) - estado['publicados'] >= LOTE:
+                        estado['publicados'] = len(resueltos)
+                        publicar(salida())
+            elif estado['fin_entrada']:
+                return
+            else:
+                hay_trabajo.clear()
+                await hay_trabajo.wait()
+
+    propio = crawler is None
+    if propio:
+        crawler = PoliteCrawler(headers=HEADERS_EVENTO, total=MAX_CONEXIONES,
+                                per_host=MAX_CONEXIONES_HOST)
+        await crawler.__aenter__()
+    try:
+        with ParseStage(analizar_pagina_evento) as parse_stage:
+            await asyncio.gather(lector(), *(trabajador() for _ in range(MAX_EVENTOS_SIMULTANEOS)))
+            parse_stage.print_stats()
+    finally:
+        if propio:
+            crawler.print_stats()
+            await crawler.__aexit__(None, None, None)
+    print(f"🗂  Caché de iframes: {cache.aciertos} enlaces resueltos sin descargar")
+    store.print_stats()
+    cache.save()
+    return salida()
+
+async def procesar_eventos_async(lista_datos, publicar=None):
+    """Resuelve los streams de una lista de eventos ya filtrada"""
+    cola = asyncio.Queue()
+    for i, datos in enumerate(lista_datos):
+        cola.put_nowait((i, datos))
+    cola.put_nowait(None)
+    return await procesar_cola_async(cola, publicar=publicar)
+
+async def ejecutar_combinado(scraper, publicar=None):
+    """
+    Modo combinado: el scraper de la lista pasa cada evento a la resolución
+    de streams en cuanto analiza su página, sin esperar al XML publicado.
+    Ambas etapas comparten la sesión y los límites por host.
+    """
+    cola = asyncio.Queue()
+    async with PoliteCrawler(headers=HEADERS_EVENTO, total=MAX_CONEXIONES,
+                             per_host=MAX_CONEXIONES_HOST) as crawler:
+        lista = asyncio.create_task(scraper.crawl_async(event_queue=cola, crawler=crawler))
+        eventos = await procesar_cola_async(cola, fecha=fecha_de_hoy(), crawler=crawler,
+                                            publicar=publicar)
+        ok = await lista
+        crawler.print_stats()
+    return ok, eventos
+
+def eventos_desde_store(store, desde, ahora=None):
+    """
+    Vista del XML de salida: eventos relevantes de la última carga con
+    streams resueltos en esta ejecución (o reutilizados, es decir, desde
+    `desde` menos la validez de los streams)
+    """
+    ahora = ahora or to_spain(time.time())
+    inicio, fin = day_bounds(ahora.date())
+    filas = store.query('livetv', start=inicio, end=max(fin, ahora.timestamp() + VENTANA),
+                        resolved_after=desde - store.resolved_ttl)
+    streams = store.streams_of(filas)
+    eventos = [evento_resuelto(datos, 0, streams[datos['url']])
+               for datos in store.livetv_events(filas)]
+    return ordenar_eventos(eventos)
+
+def ordenar_eventos(eventos_procesados):
+    """Reensambla la salida en orden de datetime_iso (estable) y renumera los ids"""
     eventos_procesados.sort(key=lambda x: x['datetime_iso'])
     for i, evento in enumerate(eventos_procesados):
         evento['id'] = i + 1
-
     return eventos_procesados
 
-def generar_xml_final(eventos_procesados):
-    """Genera el XML final con la estructura mejorada"""
-    root = ET.Element("eventos")
-    root.set("generado", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-    root.set("total", str(len(eventos_procesados)))
-
-    for evento_data in eventos_procesados:
-        evento_elem = ET.SubElement(root, "evento")
-        evento_elem.set("id", str(evento_data['id']))
-
-        nombre_elem = ET.SubElement(evento_elem, "nombre")
-        nombre_elem.text = evento_data['nombre']
-
-        deporte_elem = ET.SubElement(evento_elem, "deporte")
-        deporte_elem.text = evento_data['deporte']
-
-        competicion_elem = ET.SubElement(evento_elem, "competicion")
-        competicion_elem.text = evento_data['competicion']
-
-        fecha_elem = ET.SubElement(evento_elem, "fecha")
-        fecha_elem.text = evento_data['fecha']
-
-        hora_elem = ET.SubElement(evento_elem, "hora")
-        hora_elem.text = evento_data['hora']
-
-        url_elem = ET.SubElement(evento_elem, "url")
-        url_elem.text = evento_data['url']
-
-        datetime_iso_elem = ET.SubElement(evento_elem, "datetime_iso")
-        datetime_iso_elem.text = evento_data['datetime_iso']
-
-        streams_elem = ET.SubElement(evento_elem, "streams")
-        streams_elem.set("total", str(len(evento_data['streams'])))
-
-        for i, stream_data in enumerate(evento_data['streams']):
-            stream_elem = ET.SubElement(streams_elem, "stream")
-            stream_elem.set("id", str(i + 1))
-            
-            url_stream_elem = ET.SubElement(stream_elem, "url")
-            url_stream_elem.text = stream_data.get('url', '')
-            
-            idioma_elem = ET.SubElement(stream_elem, "idioma")
-            idioma_elem.text = stream_data.get('idioma', '')
-            
-            idioma_nombre_elem = ET.SubElement(stream_elem, "idioma_nombre")
-            idioma_nombre_elem.text = stream_data.get('idioma_nombre', '')
-            
-            enlace_original_elem = ET.SubElement(stream_elem, "enlace_original")
-            enlace_original_elem.text = stream_data.get('enlace_original', '')
-
-    return root
-
-def formatear_xml(elem, level=0):
-    """Formatea XML con indentación apropiada"""
-    i = "\n" + level * "  "
-    if len(elem):
-        if not elem.text or not elem.text.strip():
-            elem.text = i + "  "
-        if not elem.tail or not elem.tail.strip():
-            elem.tail = i
-        for child in elem:
-            formatear_xml(child, level + 1)
-        if not child.tail or not child.tail.strip():
-            child.tail = i
-    else:
-        if level and (not elem.tail or not elem.tail.strip()):
-            elem.tail = i
+def procesar_todos_los_eventos(eventos_hoy, max_eventos=None, publicar=None):
+    """Procesa todos los eventos del día (dicts o <evento> del XML) y extrae sus streams"""
+    total_eventos = len(eventos_hoy) if max_eventos is None else min(len(eventos_hoy), max_eventos)
 
-def main():
+    print(f"🔄 Procesando {total_eventos} eventos "
+          f"({MAX_CONEXIONES} conexiones, {MAX_CONEXIONES_HOST} por host)...")
+
+    lista_datos = [evento if isinstance(evento, dict) else datos_evento(evento)
+                   for evento in eventos_hoy[:total_eventos]]
+    return asyncio.run(procesar_eventos_async(lista_datos, publicar))
+
+def guardar_xml(eventos_procesados, output_path=OUTPUT_PATH):
+    """Escribe el XML de salida de forma atómica (también las salidas parciales)"""
+    attrs = {"generado": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+             "total": str(len(eventos_procesados))}
+    with write_xml(output_path, "eventos", attrs, compat="etree") as xml:
+        for evento_data in eventos_procesados:
+            with xml.element("evento", {"id": str(evento_data['id'])}):
+                for campo in ('nombre', 'deporte', 'competicion', 'fecha', 'hora', 'url', 'datetime_iso'):
+                    xml.leaf(campo, evento_data[campo])
+                with xml.element("streams", {"total": str(len(evento_data['streams']))}):
+                    for i, stream_data in enumerate(evento_data['streams']):
+                        with xml.element("stream", {"id": str(i + 1)}):
+                            for campo in ('url', 'idioma', 'idioma_nombre', 'enlace_original'):
+                                xml.leaf(campo, stream_data.get(campo, ''))
+
+def publicar_parcial(eventos_procesados):
+    guardar_xml(eventos_procesados)
+    print(f"📤 Salida parcial publicada: {len(eventos_procesados)} eventos resueltos")
+
+def main(combinado=False):
     """Función principal"""
     print("=" * 60)
     print("🎯 EXTRACTOR DE EVENTOS DEPORTIVOS LIVETV.SX")
@@ -449,34 +703,49 @@ def main():
     print(f"⏰ Ejecutado el: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print()
 
-    print("1️⃣ Descargando XML fuente...")
-    xml_root = obtener_eventos_xml()
-    if xml_root is None:
-        print("❌ Error: No se pudo descargar el XML fuente")
-        return
+    store = get_store()
+    inicio_ejecucion = time.time()
+    if combinado:
+        from script_lista_livetv_sx import EventScraper
+
+        print("1️⃣ Modo combinado: rastreando livetv.sx y resolviendo streams a la vez...")
+        scraper = EventScraper(max_pages=LIVETV_PAGINAS, max_workers=MAX_CONEXIONES_HOST)
+        ok, eventos_procesados = asyncio.run(ejecutar_combinado(scraper, publicar_parcial))
+        if not ok or not scraper.all_events:
+            print("❌ Error: No se pudo rastrear la lista de eventos")
+            return
+        store.upsert_events('livetv', scraper.all_events)
+        total = scraper.create_xml(store.events('livetv'), output_file=XML_FUENTE_LOCAL)
+        print(f"✅ {XML_FUENTE_LOCAL} actualizado: {total} eventos")
+        print(f"✅ Total eventos de hoy procesados: {len(eventos_procesados)}")
+    else:
+        print("1️⃣ Descargando XML fuente...")
+        xml_root = obtener_eventos_xml()
+        if xml_root is None:
+            print("❌ Error: No se pudo descargar el XML fuente")
+            return
 
-    print(f"✅ XML descargado. Total eventos: {xml_root.get('total', 'N/A')}")
+        print(f"✅ XML descargado. Total eventos: {xml_root.get('total', 'N/A')}")
+        get_downloads().print_stats()
 
-    print("\n2️⃣ Filtrando eventos del día actual...")
-    eventos_hoy = filtrar_eventos_hoy(xml_root)
-    print(f"✅ Eventos encontrados para hoy: {len(eventos_hoy)}")
+        print("\n2️⃣ Filtrando eventos del día actual...")
+        store.upsert_events('livetv', [datos_evento(evento) for evento in xml_root.findall('evento')])
+        eventos_hoy = store.livetv_events(eventos_relevantes(store))
+        print(f"✅ Eventos encontrados para hoy: {len(eventos_hoy)}")
 
-    if not eventos_hoy:
-        print("⚠️  No hay eventos para procesar hoy")
-        return
+        if not eventos_hoy:
+            print("⚠️  No hay eventos para procesar hoy")
+            return
 
-    print("\n3️⃣ Procesando eventos con detección corregida de banderas...")
-    eventos_procesados = procesar_todos_los_eventos(eventos_hoy)
-    print(f"\n✅ Total eventos procesados: {len(eventos_procesados)}")
+        print("\n3️⃣ Procesando eventos con detección corregida de banderas...")
+        eventos_procesados = procesar_todos_los_eventos(eventos_hoy, publicar=publicar_parcial)
+        print(f"\n✅ Total eventos procesados: {len(eventos_procesados)}")
 
     print("\n4️⃣ Generando XML final...")
-    xml_final = generar_xml_final(eventos_procesados)
-    formatear_xml(xml_final)
-
+    eventos_procesados = eventos_desde_store(store, inicio_ejecucion)
     # Aquí la corrección: nombre correcto del archivo de salida
-    output_path = 'eventos_livetv_sx_con_reproductores.xml'
-    tree = ET.ElementTree(xml_final)
-    tree.write(output_path, encoding='utf-8', xml_declaration=True)
+    output_path = OUTPUT_PATH
+    guardar_xml(eventos_procesados, output_path)
 
     print(f"✅ XML generado exitosamente: {output_path}")
 
@@ -499,4 +768,9 @@ def main():
     print(f"   ✅ Manejo de errores mejorado")
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description='Extractor de reproductores de livetv.sx')
+    parser.add_argument('--combinado', action='store_true',
+                        help='Rastrear la lista de eventos en este mismo proceso y resolver '
+                             'los streams a medida que aparecen (genera también eventos_livetv_sx.xml)')
+    main(combinado=parser.parse_args().combinado)
@@ -1,9 +1,9 @@
 import requests
-from xml.etree.ElementTree import Element, SubElement, tostring
-import xml.dom.minidom
 from datetime import datetime, timezone
 import re
 
+from xml_writer import write_xml
+
 # URL del archivo de texto
 URL_PROG_TXT = "https://sportsonline.ci/prog.txt"
 # Nombre del archivo XML generado
@@ -64,10 +64,7 @@ def procesar_linea(linea):
     return titulo_evento, url_streaming
 
 def generar_lista_xml(contenido):
-    """Genera el contenido de un archivo XML agrupando eventos bajo títulos."""
-    root = Element("playlist")
-    root.set("version", "1")
-
+    """Agrupa los eventos del día bajo sus títulos; retorna (agrupados, adicionales)."""
     agrupados = {}
     dia_actual = obtener_dia_actual()  # Día actual en inglés
     dia_encontrado = None  # Día encontrado en el archivo de texto
@@ -111,33 +108,25 @@ def generar_lista_xml(contenido):
     if eventos_encontrados == 0:
         print(f"No se encontraron eventos para el día actual: {dia_actual}")
 
-    # Crear los elementos XML para los eventos
-    for titulo, urls in agrupados.items():
-        track = SubElement(root, "track")
-        title = SubElement(track, "title")
-        title.text = titulo
-        for url in urls:
-            url_element = SubElement(track, "url")
-            url_element.text = url
-
-    # Agregar las líneas adicionales al final del XML
-    if adicionales:
-        adicionales_section = SubElement(root, "additional")
-        for linea in adicionales:
-            additional_item = SubElement(adicionales_section, "item")
-            additional_item.text = linea
-
-    return root
-
-def guardar_archivo_xml(root):
-    """Guarda el contenido generado en un archivo XML con formato legible."""
-    # Convertir el árbol XML a una cadena con formato
-    xml_bytes = tostring(root, encoding="utf-8")
-    pretty_xml = xml.dom.minidom.parseString(xml_bytes).toprettyxml(indent="  ")
-
-    # Guardar el archivo con formato legible
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as archivo:
-        archivo.write(pretty_xml)
+    return agrupados, adicionales
+
+def guardar_archivo_xml(lista):
+    """Guarda los eventos agrupados en un archivo XML con formato legible."""
+    agrupados, adicionales = lista
+    with write_xml(OUTPUT_FILE, "playlist", {"version": "1"}, compat="minidom",
+                   declaration='<?xml version="1.0" ?>') as xml:
+        # Crear los elementos XML para los eventos
+        for titulo, urls in agrupados.items():
+            with xml.element("track"):
+                xml.leaf("title", titulo)
+                for url in urls:
+                    xml.leaf("url", url)
+
+        # Agregar las líneas adicionales al final del XML
+        if adicionales:
+            with xml.element("additional"):
+                for linea in adicionales:
+                    xml.leaf("item", linea)
 
 def main():
     """Función principal para ejecutar el script."""
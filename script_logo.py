@@ -1,8 +1,9 @@
 import requests
 from bs4 import BeautifulSoup
-import xml.etree.ElementTree as ET
 import re
 
+from xml_writer import write_xml
+
 # URLs to scrape
 urls = [
     "https://github.com/tv-logo/tv-logos/tree/main/countries/albania",
@@ -50,26 +51,17 @@ def scrape_logos(url):
             logos.append((channel_name, raw_url))
     return logos
 
-# Create XML structure
-root = ET.Element("logos")
+# Write logos.xml as the logos are scraped (tab-indented, same bytes as ET.indent)
 unique_logos = set()
 
-for url in urls:
-    logos = scrape_logos(url)
-    for channel_name, img_url in logos:
-        if (channel_name, img_url) not in unique_logos:
-            unique_logos.add((channel_name, img_url))
-            logo_element = ET.SubElement(root, "logo")
-            name_element = ET.SubElement(logo_element, "name")
-            name_element.text = channel_name
-            url_element = ET.SubElement(logo_element, "url")
-            url_element.text = img_url
-
-# Write to logos.xml with pretty printing
-tree = ET.ElementTree(root)
-ET.indent(tree, space="\t", level=0)  # Pretty print with tabs
-
-with open("logos.xml", "wb") as xml_file:
-    tree.write(xml_file, encoding='utf-8', xml_declaration=True)
+with write_xml("logos.xml", "logos", compat="etree.indent", indent="\t") as xml:
+    for url in urls:
+        logos = scrape_logos(url)
+        for channel_name, img_url in logos:
+            if (channel_name, img_url) not in unique_logos:
+                unique_logos.add((channel_name, img_url))
+                with xml.element("logo"):
+                    xml.leaf("name", channel_name)
+                    xml.leaf("url", img_url)
 
 print("Logos scraped and saved to logos.xml")
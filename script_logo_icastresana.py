@@ -2,27 +2,13 @@ import os
 import re
 import requests
 import time
-import xml.etree.ElementTree as ET
 import sys
 
+from xml_writer import write_xml
+
 # Expresión regular para extraer el valor del atributo tvg-logo en la línea EXTINF
 TVG_LOGO_REGEX = re.compile(r'tvg-logo="([^"]*)"')
 
-def indent(elem, level=0):
-    i = "\n" + level * "  "
-    if len(elem):
-        if not elem.text or not elem.text.strip():
-            elem.text = i + "  "
-        if not elem.tail or not elem.tail.strip():
-            elem.tail = i
-        for elem in elem:
-            indent(elem, level + 1)
-        if not elem.tail or not elem.tail.strip():
-            elem.tail = i
-    else:
-        if level and (not elem.tail or not elem.tail.strip()):
-            elem.tail = i
-
 def update_logos():
     peticiones_url = "https://raw.githubusercontent.com/Icastresana/lista1/refs/heads/main/peticiones"
     try:
@@ -54,24 +40,22 @@ def update_logos():
                 i += 1
 
         # Construir XML
-        root = ET.Element("logos")
-        for id_val, url_val in logos_list:
-            logo_elem = ET.SubElement(root, "logo")
-            ET.SubElement(logo_elem, "id").text = id_val
-            ET.SubElement(logo_elem, "url").text = url_val
-
-        indent(root)
-        tree = ET.ElementTree(root)
         abs_path = os.path.abspath("logos_icastresana.xml")
         print(f"Actualizando archivo en: {abs_path}")
         try:
-            tree.write(abs_path, encoding="utf-8", xml_declaration=True)
+            with write_xml(abs_path, "logos", compat="etree") as xml:
+                for id_val, url_val in logos_list:
+                    with xml.element("logo"):
+                        xml.leaf("id", id_val)
+                        xml.leaf("url", url_val)
             print(f"Archivo 'logos_icastresana.xml' actualizado con éxito.")
         except Exception as e:
             print(f"Error al escribir en el archivo {abs_path}: {e}")
-        
+            return
+
         # Imprimir el contenido del archivo XML para verificación
-        ET.dump(root)
+        with open(abs_path, encoding="utf-8") as f:
+            print(f.read())
 
     except Exception as e:
         print("Error al actualizar logos:", e)
@@ -1,16 +1,16 @@
+import os
 import re
 import time
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
-from webdriver_manager.chrome import ChromeDriverManager
-import xml.etree.ElementTree as ET
+
+from browser_service import BrowserServiceClient
+from xml_writer import write_xml
 
 URL = 'https://tarjetarojaenvivo.lat'
 
+# Modo del navegador: "auto" (servicio de navegador persistente y, si no
+# está disponible, Selenium), "service" o "selenium"
+BROWSER_MODE = os.environ.get("REPRODUCTOR_WEB_MODE", "auto").lower()
+
 # Mapeo de canales (correcto)
 channel_names = {
     '1': 'beIN 1',
@@ -215,30 +215,65 @@ channel_names = {
     '200': 'EXTRA SPORT47',
 }
 
-# Configuración del navegador
-chrome_options = Options()
-chrome_options.add_argument("--headless=new")
-chrome_options.add_argument("--disable-gpu")
-chrome_options.add_argument("--no-sandbox")
+def obtener_contenido_servicio():
+    """Lee el textarea con el servicio de navegador persistente (None si no está disponible)"""
+    client = BrowserServiceClient()
+    if not client.available():
+        print(f"Servicio de navegador no disponible en {client.base_url}")
+        return None
+    result = client.read_selector(URL, 'textarea', 'value', timeout_ms=30000)
+    if not result.get('ok'):
+        print(f"Error en el servicio de navegador: {result.get('error')}")
+        return None
+    print(f"Contenido obtenido del servicio de navegador en {result.get('elapsed', 0):.2f}s")
+    return result.get('body', '').strip()
+
+def obtener_contenido_selenium():
+    """Arranca Chrome con Selenium y lee el textarea"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service as ChromeService
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.common.by import By
+    from webdriver_manager.chrome import ChromeDriverManager
 
+    # Configuración del navegador
+    chrome_options = Options()
+    chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+
+    driver = None
+    try:
+        # Inicializar navegador
+        service = ChromeService(executable_path=ChromeDriverManager().install())
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+        driver.get(URL)
+        
+        # Extraer contenido
+        WebDriverWait(driver, 30).until(
+            EC.presence_of_element_located((By.TAG_NAME, 'textarea'))
+        )
+        textarea = driver.find_element(By.TAG_NAME, 'textarea')
+        return textarea.get_attribute('value').strip()
+    finally:
+        if driver is not None:
+            driver.quit()
+
+content = None
 try:
-    # Inicializar navegador
-    service = ChromeService(executable_path=ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    driver.get(URL)
-    
-    # Extraer contenido
-    WebDriverWait(driver, 30).until(
-        EC.presence_of_element_located((By.TAG_NAME, 'textarea'))
-    )
-    textarea = driver.find_element(By.TAG_NAME, 'textarea')
-    content = textarea.get_attribute('value').strip()
-    
+    if BROWSER_MODE in ("auto", "service"):
+        content = obtener_contenido_servicio()
+    if content is None and BROWSER_MODE in ("auto", "selenium"):
+        content = obtener_contenido_selenium()
 except Exception as e:
     print(f"Error crítico: {str(e)}")
     exit(1)
-finally:
-    driver.quit()
+
+if content is None:
+    print("Error crítico: no se pudo obtener el contenido")
+    exit(1)
 
 # Procesar el contenido
 events = []
@@ -285,40 +320,20 @@ for line in content.splitlines():
     
     events.append(event)
 
-# Generar XML
-root = ET.Element('events')
-for event in events:
-    event_elem = ET.SubElement(root, 'event')
-    ET.SubElement(event_elem, 'datetime').text = event['datetime']
-    ET.SubElement(event_elem, 'league').text = event['league']
-    ET.SubElement(event_elem, 'teams').text = event['teams']
-    
-    channels_elem = ET.SubElement(event_elem, 'channels')
-    for channel in event['channels']:
-        channel_elem = ET.SubElement(channels_elem, 'channel')
-        ET.SubElement(channel_elem, 'channel_name').text = channel['channel_name']
-        ET.SubElement(channel_elem, 'channel_id').text = channel['channel_id']
-        ET.SubElement(channel_elem, 'url').text = channel['url']
-
-# Formatear XML
-def indent(elem, level=0):
-    i = "\n" + "  " * level
-    if len(elem):
-        if not elem.text or not elem.text.strip():
-            elem.text = i + "  "
-        if not elem.tail or not elem.tail.strip():
-            elem.tail = i
-        for subelem in elem:
-            indent(subelem, level + 1)
-        if not subelem.tail or not elem.tail.strip():
-            subelem.tail = i
-    else:
-        if level and (not elem.tail or not elem.tail.strip()):
-            elem.tail = i
+# Generar XML (cada evento se escribe ya sangrado)
+with write_xml('lista_reproductor_web.xml', 'events', compat='etree') as xml:
+    for event in events:
+        with xml.element('event'):
+            xml.leaf('datetime', event['datetime'])
+            xml.leaf('league', event['league'])
+            xml.leaf('teams', event['teams'])
 
-indent(root)
-tree = ET.ElementTree(root)
-tree.write('lista_reproductor_web.xml', encoding='utf-8', xml_declaration=True)
+            with xml.element('channels'):
+                for channel in event['channels']:
+                    with xml.element('channel'):
+                        xml.leaf('channel_name', channel['channel_name'])
+                        xml.leaf('channel_id', channel['channel_id'])
+                        xml.leaf('url', channel['url'])
 
 # Generar M3U
 with open('lista_reproductor_web.m3u', 'w', encoding='utf-8') as f:
@@ -1,32 +1,47 @@
 import requests
 import xml.etree.ElementTree as ET
-from fuzzywuzzy import fuzz, process
+from fuzzywuzzy import fuzz, process, utils
 from datetime import datetime
 
+from http_cache import get_downloads
+from logo_cache import get_cache
+
 # URL de la API
 API_URL = "https://api.acestream.me/all?api_version=1&api_key=test_api_key"
 # URL del archivo de logos
 LOGOS_URL = "https://raw.githubusercontent.com/tutw/platinsport-m3u-updater/main/logos.xml"
+# Versión del análisis guardado por fetch_parsed: súbela al cambiar parse_logos
+PARSE_CACHE_VERSION = "1"
+
+def parse_logos(response):
+    root = ET.fromstring(response.content)
+    return {logo.find('name').text: logo.find('url').text for logo in root.findall('logo')}
 
 def get_logos():
     try:
-        response = requests.get(LOGOS_URL)
-        response.raise_for_status()
-        logos_xml = response.content
-        root = ET.fromstring(logos_xml)
-        logos = {logo.find('name').text: logo.find('url').text for logo in root.findall('logo')}
-        return logos
+        # logos.xml solo se descarga y analiza si cambió desde la última ejecución
+        return get_downloads().fetch_parsed(LOGOS_URL, parse_logos, version=PARSE_CACHE_VERSION)
     except Exception as e:
         print(f"Error al obtener logos: {e}")
         return {}
 
-def find_best_match(name, logos):
+LOGO_CACHE = get_cache()
+
+def search_logo(name, logos):
     match = process.extractOne(name, logos.keys(), scorer=fuzz.token_sort_ratio, score_cutoff=80)
     if not match:
         match = process.extractOne(name, logos.keys(), scorer=fuzz.partial_ratio, score_cutoff=75)
     if match:
-        return logos[match[0]]
-    return ''
+        return logos[match[0]], match[1]
+    return None, None
+
+def find_best_match(name, logos, logos_version=None):
+    # extractOne compara los nombres tras full_process, que es la clave de la caché
+    key = utils.full_process(name)
+    if not key:
+        return ''
+    return LOGO_CACHE.resolve("acestream_api", logos_version, key,
+                              lambda _: search_logo(name, logos)) or ''
 
 def scrape_acestream_api():
     try:
@@ -34,6 +49,7 @@ def scrape_acestream_api():
         response.raise_for_status()
         data = response.json()
         logos = get_logos()
+        logos_version = LOGO_CACHE.register("acestream_api", LOGOS_URL, logos) if logos else None
         
         if isinstance(data, list):
             # Crear la lista M3U
@@ -41,7 +57,7 @@ def scrape_acestream_api():
             for item in data:
                 name = item.get('name', 'Unknown')
                 infohash = item.get('infohash', '')
-                logo_url = find_best_match(name, logos)
+                logo_url = find_best_match(name, logos, logos_version)
                 m3u_content += f'#EXTINF:-1 tvg-logo="{logo_url}",{name}\n'
                 m3u_content += f"http://127.0.0.1:6878/ace/getstream?id={infohash}\n"
             
@@ -49,6 +65,7 @@ def scrape_acestream_api():
             with open("lista_scraper_acestream_api.m3u", "w") as m3u_file:
                 m3u_file.write(m3u_content)
             
+            LOGO_CACHE.print_stats()
             print(f"Lista M3U actualizada: {datetime.now()}")
         else:
             print("Formato de datos no esperado. Se esperaba una lista.")
@@ -0,0 +1,285 @@
+"""
+Modelo compacto de streams
+==========================
+- StreamEntry: una entrada (evento + canal + enlace) con __slots__ y las
+  cadenas repetitivas (liga, país, idioma, canal) internadas.
+- StreamTable: contenedor en columnas; liga, país e idioma se guardan como
+  códigos enteros sobre un diccionario de valores, lo que permite contar y
+  agrupar sin recorrer cadenas y exportar directamente a M3U, JSON y CSV.
+"""
+
+import csv
+import json
+import os
+import sys
+from array import array
+from collections import Counter
+
+ACESTREAM_PREFIX = "acestream://"
+ACESTREAM_PLAYER = "http://127.0.0.1:6878/ace/getstream?id="
+# Listas derivadas cuyo número varía entre ejecuciones (las fijas se reescriben siempre)
+VARIANT_PREFIXES = ("liga_", "pais_")
+
+
+def _minutes(hhmm: str):
+    """'21:30' -> 1290 (None si no es una hora)"""
+    try:
+        hours, minutes = hhmm.split(":")
+        return int(hours) * 60 + int(minutes)
+    except (AttributeError, ValueError):
+        return None
+
+
+class StreamEntry:
+    FIELDS = ("time", "match", "league", "league_id", "lang_code",
+              "country", "channel", "url", "tvg_id", "logo")
+    # Campos con muchos valores repetidos entre entradas
+    INTERNED = ("league", "league_id", "lang_code", "country", "channel", "logo")
+
+    __slots__ = FIELDS
+
+    def __init__(self, time="", match="", league="", league_id="", lang_code="",
+                 country="", channel="", url="", tvg_id="", logo=""):
+        intern = sys.intern
+        self.time = time
+        self.match = match
+        self.league = intern(league)
+        self.league_id = intern(league_id)
+        self.lang_code = intern(lang_code)
+        self.country = intern(country)
+        self.channel = intern(channel)
+        self.url = url
+        self.tvg_id = tvg_id
+        self.logo = intern(logo)
+
+    def __eq__(self, other):
+        if not isinstance(other, StreamEntry):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.FIELDS)
+
+    def __repr__(self):
+        return f"StreamEntry({self.time!r}, {self.match!r}, {self.channel!r}, {self.url!r})"
+
+    def as_dict(self) -> dict:
+        return {f: getattr(self, f) for f in self.FIELDS}
+
+    @property
+    def stream_url(self) -> str:
+        """Enlace reproducible (acestream:// -> reproductor local)"""
+        if self.url.startswith(ACESTREAM_PREFIX):
+            return ACESTREAM_PLAYER + self.url[len(ACESTREAM_PREFIX):]
+        return self.url
+
+
+class StreamTable:
+    """Columnas de entradas con codificación por diccionario de las columnas categóricas"""
+
+    CATEGORICAL = ("league", "league_id", "lang_code", "country", "logo")
+    PLAIN = ("time", "match", "channel", "url", "tvg_id")
+
+    def __init__(self):
+        self._plain = {name: [] for name in self.PLAIN}
+        self._codes = {name: array("I") for name in self.CATEGORICAL}
+        self._values = {name: [] for name in self.CATEGORICAL}
+        self._index = {name: {} for name in self.CATEGORICAL}
+
+    @classmethod
+    def from_entries(cls, entries):
+        table = cls()
+        table.extend(entries)
+        return table
+
+    def _encode(self, name, value):
+        index = self._index[name]
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(self._values[name])
+            self._values[name].append(sys.intern(value))
+        return code
+
+    def append(self, entry: StreamEntry):
+        for name in self.PLAIN:
+            self._plain[name].append(getattr(entry, name))
+        for name in self.CATEGORICAL:
+            self._codes[name].append(self._encode(name, getattr(entry, name)))
+
+    def extend(self, entries):
+        for entry in entries:
+            self.append(entry)
+
+    def __len__(self):
+        return len(self._plain["url"])
+
+    def value(self, name, i):
+        if name in self._codes:
+            return self._values[name][self._codes[name][i]]
+        return self._plain[name][i]
+
+    def column(self, name) -> list:
+        if name in self._codes:
+            values = self._values[name]
+            return [values[c] for c in self._codes[name]]
+        return self._plain[name]
+
+    def row(self, i) -> StreamEntry:
+        return StreamEntry(**{f: self.value(f, i) for f in StreamEntry.FIELDS})
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def count_by(self, name) -> Counter:
+        """Número de entradas por valor de una columna"""
+        if name in self._codes:
+            values = self._values[name]
+            return Counter({values[c]: n for c, n in Counter(self._codes[name]).items()})
+        return Counter(self._plain[name])
+
+    def group_by(self, name) -> dict:
+        """Índices de fila por valor de una columna, en orden de aparición"""
+        groups = {}
+        for i, value in enumerate(self.column(name)):
+            groups.setdefault(value, []).append(i)
+        return groups
+
+    # ------------------------------------------------------------------
+    # Exportación
+    # ------------------------------------------------------------------
+
+    def m3u_records(self, group_title: str):
+        """
+        Un registro M3U ("#EXTINF...\nURL") por entrada, en orden de fila,
+        con formato de visualización: HH:MM | Liga | Evento | Canal | [País]
+        """
+        cols = [self.column(f) for f in ("time", "league", "match", "channel",
+                                         "country", "tvg_id", "lang_code", "url", "logo")]
+        for event_time, league, match, channel, country, tvg_id, lang_code, url, logo in zip(*cols):
+            display_name_parts = []
+            if event_time:
+                display_name_parts.append(event_time)
+            if league:
+                display_name_parts.append(league)
+            if match:
+                display_name_parts.append(match)
+            display_name_parts.append(channel)
+            if country and country != "Internacional":
+                display_name_parts.append(f"[{country}]")
+
+            extinf_parts = ['#EXTINF:-1']
+            if tvg_id:
+                extinf_parts.append(f'tvg-id="{tvg_id}"')
+            extinf_parts.append(f'tvg-name="{channel}"')
+            if logo:
+                extinf_parts.append(f'tvg-logo="{logo}"')
+            extinf_parts.append(f'group-title="{group_title}"')
+            if lang_code and lang_code != "XX":
+                extinf_parts.append(f'tvg-country="{lang_code}"')
+
+            if url.startswith(ACESTREAM_PREFIX):
+                url = ACESTREAM_PLAYER + url[len(ACESTREAM_PREFIX):]
+            yield ' '.join(extinf_parts) + ',' + " | ".join(display_name_parts) + "\n" + url
+
+    def to_m3u(self, out_path: str, group_title: str):
+        with open(out_path, "w", encoding="utf-8") as f:
+            f.write("#EXTM3U\n")
+            f.writelines(record + "\n" for record in self.m3u_records(group_title))
+
+    def sorted_index(self) -> list:
+        """Filas ordenadas por hora de inicio (las entradas sin hora al final)"""
+        times = self._plain["time"]
+        return sorted(range(len(self)), key=lambda i: (not times[i], times[i]))
+
+    def write_variants(self, out_dir: str, group_title: str, now_hhmm: str,
+                       window_minutes: int = 120, source: str = "lista.m3u") -> dict:
+        """
+        Escribe en una sola pasada las listas derivadas a partir de un único
+        índice ordenado por hora: por liga, por país (código), próximas horas
+        (incluye lo que empezó dentro de la misma ventana), hoy completo y sin
+        duplicados por id de acestream. Devuelve el manifiesto.
+        """
+        records = list(self.m3u_records(group_title))
+        times = self._plain["time"]
+        urls = self._plain["url"]
+        league_codes, league_ids = self._codes["league_id"], self._values["league_id"]
+        league_names = self._values["league"]
+        league_name_codes = self._codes["league"]
+        lang_codes, langs = self._codes["lang_code"], self._values["lang_code"]
+
+        now = _minutes(now_hhmm)
+        variants = {
+            "hoy": {"title": "Hoy", "rows": []},
+            "proximas": {"title": f"En juego y próximas {window_minutes // 60}h", "rows": []},
+            "sin_duplicados": {"title": "Sin duplicados", "rows": []},
+        }
+        seen_urls = set()
+
+        for i in self.sorted_index():
+            start = _minutes(times[i])
+            variants["hoy"]["rows"].append(i)
+            if start is not None and now is not None:
+                delta = (start - now + 720) % 1440 - 720  # medianoche incluida
+                if -window_minutes <= delta <= window_minutes:
+                    variants["proximas"]["rows"].append(i)
+            if urls[i] not in seen_urls:
+                seen_urls.add(urls[i])
+                variants["sin_duplicados"]["rows"].append(i)
+
+            league_key = "liga_" + (league_ids[league_codes[i]] or "desconocida")
+            variants.setdefault(league_key, {"title": league_names[league_name_codes[i]], "rows": []})
+            variants[league_key]["rows"].append(i)
+
+            lang = langs[lang_codes[i]]
+            if lang and lang != "XX":
+                country_key = "pais_" + lang.lower()
+                variants.setdefault(country_key, {"title": lang, "rows": []})
+                variants[country_key]["rows"].append(i)
+
+        os.makedirs(out_dir, exist_ok=True)
+        previous = self._previous_playlists(out_dir)
+        written = set()
+        manifest = {"source": source, "generated_for": now_hhmm, "playlists": []}
+        # Primero las listas fijas y después ligas y países en orden alfabético
+        ordered = sorted(variants.items(), key=lambda kv: (kv[0].startswith(VARIANT_PREFIXES), kv[0]))
+        for key, variant in ordered:
+            file_name = key + ".m3u"
+            with open(os.path.join(out_dir, file_name), "w", encoding="utf-8") as f:
+                f.write("#EXTM3U\n")
+                f.writelines(records[i] + "\n" for i in variant["rows"])
+            written.add(file_name)
+            manifest["playlists"].append({
+                "id": key, "title": variant["title"],
+                "file": file_name, "entries": len(variant["rows"]),
+            })
+
+        # Quitar listas de ligas/países que ya no existen: solo las que escribió
+        # la ejecución anterior (el directorio puede contener otras listas)
+        for name in previous - written:
+            if name.startswith(VARIANT_PREFIXES) and os.path.isfile(os.path.join(out_dir, name)):
+                os.remove(os.path.join(out_dir, name))
+
+        with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        return manifest
+
+    @staticmethod
+    def _previous_playlists(out_dir: str) -> set:
+        """Ficheros del manifest.json anterior del directorio (vacío si no hay)"""
+        try:
+            with open(os.path.join(out_dir, "manifest.json"), encoding="utf-8") as f:
+                playlists = json.load(f).get("playlists", [])
+        except (OSError, ValueError):
+            return set()
+        return {p["file"] for p in playlists if isinstance(p, dict) and "/" not in p.get("file", "/")}
+
+    def to_json(self, out_path: str):
+        cols = [self.column(f) for f in StreamEntry.FIELDS]
+        rows = [dict(zip(StreamEntry.FIELDS, values)) for values in zip(*cols)]
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+    def to_csv(self, out_path: str):
+        cols = [self.column(f) for f in StreamEntry.FIELDS]
+        with open(out_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(StreamEntry.FIELDS)
+            writer.writerows(zip(*cols))
@@ -0,0 +1,247 @@
+"""
+Comprobación de streams HLS
+===========================
+Comprueba de forma concurrente (asyncio + aiohttp) si las fuentes que
+publican las listas realmente responden:
+
+- lista .m3u8: descarga la lista, si es maestra sigue la variante de menor
+  bitrate y pide los primeros bytes (Range) del primer segmento
+- cualquier otra URL (páginas de reproductor): basta con una respuesta < 400
+- concurrencia limitada en total y por host
+- por cada URL se guarda estado, código HTTP, tiempo hasta el primer byte
+  y bitrates de las variantes en una caché con TTL (STREAM_PROBE_CACHE),
+  así que una URL no se vuelve a comprobar en cada ejecución
+
+Estados: "live" (se puede reproducir), "page" (página que responde),
+"dead" (error HTTP o lista vacía) y "error" (fallo de red o timeout).
+
+Configuración por variables de entorno:
+    STREAM_PROBE               demote | drop | off (default: demote)
+    STREAM_PROBE_CACHE         fichero de la caché (default: stream_probes.json)
+    STREAM_PROBE_TTL_LIVE      validez de un resultado bueno en s (default: 1800)
+    STREAM_PROBE_TTL_DEAD      validez de un resultado malo en s (default: 600)
+    STREAM_PROBE_PER_HOST      peticiones simultáneas por host (default: 4)
+    STREAM_PROBE_TOTAL         peticiones simultáneas en total (default: 32)
+    STREAM_PROBE_TIMEOUT       timeout por comprobación en s (default: 10)
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+from urllib.parse import urljoin, urlparse
+
+MODE = os.environ.get("STREAM_PROBE", "demote").lower()
+CACHE_FILE = os.environ.get("STREAM_PROBE_CACHE", "stream_probes.json")
+TTL_LIVE = float(os.environ.get("STREAM_PROBE_TTL_LIVE", "1800"))
+TTL_DEAD = float(os.environ.get("STREAM_PROBE_TTL_DEAD", "600"))
+PER_HOST = int(os.environ.get("STREAM_PROBE_PER_HOST", "4"))
+TOTAL = int(os.environ.get("STREAM_PROBE_TOTAL", "32"))
+TIMEOUT = float(os.environ.get("STREAM_PROBE_TIMEOUT", "10"))
+
+ALIVE = ("live", "page")
+MAX_PLAYLIST_BYTES = 1024 * 1024
+SEGMENT_RANGE = "bytes=0-1023"
+
+_ATTR_RE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+def is_hls(url: str) -> bool:
+    return urlparse(url).path.lower().endswith(".m3u8")
+
+
+def parse_attributes(line: str) -> dict:
+    """'#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360' -> {'BANDWIDTH': '800000', ...}"""
+    return {k: v.strip('"') for k, v in _ATTR_RE.findall(line.split(":", 1)[-1])}
+
+
+def parse_playlist(text: str, base_url: str):
+    """
+    Retorna (variantes, segmentos). Las variantes son dicts con uri,
+    bandwidth y resolution; los segmentos, URIs absolutas.
+    """
+    variants, segments = [], []
+    pending = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("#EXT-X-STREAM-INF"):
+            attrs = parse_attributes(line)
+            pending = {"bandwidth": int(attrs.get("BANDWIDTH", 0) or 0),
+                       "resolution": attrs.get("RESOLUTION", "")}
+        elif line.startswith("#"):
+            continue
+        elif pending is not None:
+            pending["uri"] = urljoin(base_url, line)
+            variants.append(pending)
+            pending = None
+        else:
+            segments.append(urljoin(base_url, line))
+    return variants, segments
+
+
+def is_alive(result) -> bool:
+    """Sin resultado (no comprobado) cuenta como vivo"""
+    return result is None or result.get("status") in ALIVE
+
+
+class StreamProber:
+    """Comprobaciones concurrentes con límite por host y caché con TTL"""
+
+    def __init__(self, cache_path: str = CACHE_FILE, headers: dict = None,
+                 per_host: int = PER_HOST, total: int = TOTAL, timeout: float = TIMEOUT,
+                 ttl_live: float = TTL_LIVE, ttl_dead: float = TTL_DEAD):
+        self.cache_path = cache_path
+        self.headers = headers or {}
+        self.per_host = per_host
+        self.total = total
+        self.timeout = timeout
+        self.ttl_live = ttl_live
+        self.ttl_dead = ttl_dead
+        self.cache = self._load()
+        self.stats = {"cached": 0, "probed": 0}
+        self._host_limits = {}
+
+    def _load(self) -> dict:
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        now = time.time()
+        # Solo se conservan los resultados que siguen vigentes
+        cache = {url: r for url, r in self.cache.items() if self._fresh(r, now)}
+        tmp = self.cache_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp, self.cache_path)
+
+    def _fresh(self, result: dict, now: float) -> bool:
+        ttl = self.ttl_live if result.get("status") in ALIVE else self.ttl_dead
+        return now - result.get("checked_at", 0) < ttl
+
+    def cached(self, url: str):
+        result = self.cache.get(url)
+        if result and self._fresh(result, time.time()):
+            return result
+        return None
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        return self._host_limits[host]
+
+    async def _get(self, session, url: str, headers=None, limit: int = MAX_PLAYLIST_BYTES):
+        """GET limitado por host; retorna (status, ttfb_ms, cuerpo)"""
+        async with self._host_limit(url):
+            start = time.perf_counter()
+            async with session.get(url, headers=headers, allow_redirects=True) as resp:
+                ttfb = (time.perf_counter() - start) * 1000
+                body = await resp.content.read(limit)
+                return resp.status, ttfb, body
+
+    async def _probe(self, session, url: str) -> dict:
+        result = {"status": "error", "http_status": None, "ttfb_ms": None, "variants": []}
+        status, ttfb, body = await self._get(session, url)
+        result["http_status"] = status
+        result["ttfb_ms"] = round(ttfb)
+        if status >= 400:
+            result["status"] = "dead"
+            return result
+
+        text = body.decode("utf-8", errors="replace")
+        if not is_hls(url) and not text.lstrip().startswith("#EXTM3U"):
+            result["status"] = "page"
+            return result
+        if not text.lstrip().startswith("#EXTM3U"):
+            result["status"] = "dead"
+            return result
+
+        variants, segments = parse_playlist(text, url)
+        if variants:
+            result["variants"] = [{"bandwidth": v["bandwidth"], "resolution": v["resolution"]}
+                                  for v in variants]
+            # La variante más ligera basta para saber si el canal emite
+            variant = min(variants, key=lambda v: v["bandwidth"] or float("inf"))
+            status, _, body = await self._get(session, variant["uri"])
+            if status >= 400:
+                result["status"] = "dead"
+                return result
+            _, segments = parse_playlist(body.decode("utf-8", errors="replace"), variant["uri"])
+
+        if not segments:
+            result["status"] = "dead"
+            return result
+        status, _, body = await self._get(session, segments[0], headers={"Range": SEGMENT_RANGE},
+                                          limit=1024)
+        result["status"] = "live" if status < 400 and body else "dead"
+        return result
+
+    async def probe(self, session, url: str) -> dict:
+        try:
+            result = await asyncio.wait_for(self._probe(session, url), self.timeout)
+        except asyncio.TimeoutError:
+            result = {"status": "error", "http_status": None, "ttfb_ms": None,
+                      "variants": [], "error": "timeout"}
+        except Exception as e:
+            result = {"status": "error", "http_status": None, "ttfb_ms": None,
+                      "variants": [], "error": str(e)[:200]}
+        result["checked_at"] = int(time.time())
+        self.cache[url] = result
+        self.stats["probed"] += 1
+        return result
+
+    async def probe_all(self, urls) -> dict:
+        """Resultado por URL; las que están en caché no se vuelven a comprobar"""
+        import aiohttp
+
+        results, pending = {}, []
+        for url in dict.fromkeys(u for u in urls if u):
+            cached = self.cached(url)
+            if cached:
+                results[url] = cached
+                self.stats["cached"] += 1
+            else:
+                pending.append(url)
+
+        if pending:
+            total = asyncio.Semaphore(self.total)
+            connector = aiohttp.TCPConnector(limit=self.total, limit_per_host=self.per_host)
+            async with aiohttp.ClientSession(connector=connector, headers=self.headers) as session:
+                async def bounded(url):
+                    async with total:
+                        return url, await self.probe(session, url)
+                for url, result in await asyncio.gather(*(bounded(u) for u in pending)):
+                    results[url] = result
+        return results
+
+    def probe_urls(self, urls) -> dict:
+        """Versión síncrona de probe_all (para scripts que no usan asyncio)"""
+        return asyncio.run(self.probe_all(urls))
+
+    def print_summary(self, results: dict):
+        counts = {}
+        for result in results.values():
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+        detail = ", ".join(f"{status}: {n}" for status, n in sorted(counts.items()))
+        print(f"📡 Streams comprobados: {len(results)} ({detail}); "
+              f"{self.stats['cached']} desde caché, {self.stats['probed']} nuevas comprobaciones")
+
+
+def rank_sources(items, url_of, results: dict, mode: str = MODE) -> list:
+    """
+    Ordena las fuentes según su estado: las que funcionan primero y las
+    caídas al final (demote) o fuera de la lista (drop).
+    """
+    if mode == "off":
+        return list(items)
+    alive = [item for item in items if is_alive(results.get(url_of(item)))]
+    if mode == "drop":
+        return alive
+    dead = [item for item in items if not is_alive(results.get(url_of(item)))]
+    return alive + dead
@@ -0,0 +1,137 @@
+"""
+Conversión horaria compartida
+=============================
+Motor único de conversión de horas para todos los scrapers, basado en
+zoneinfo: cada zona se crea una sola vez y zoneinfo ya guarda sus
+transiciones de horario de verano, así que no se recalculan domingos.
+
+Uso:
+    from time_zones import to_spain, to_spain_many
+
+    to_spain("2025-10-26T14:00:00Z").strftime("%H:%M")                 # '15:00'
+    to_spain_many([1730000000000, 1730003600000], ms=True, fmt="%H:%M")
+"""
+
+import re
+from datetime import datetime, date, time, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+SPAIN_TZ = "Europe/Madrid"
+UK_TZ = "Europe/London"
+
+MESES = {
+    'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4,
+    'mayo': 5, 'junio': 6, 'julio': 7, 'agosto': 8,
+    'septiembre': 9, 'octubre': 10, 'noviembre': 11, 'diciembre': 12
+}
+
+_HORA_RE = re.compile(r"(\d{1,2}):(\d{2})")
+
+
+@lru_cache(maxsize=None)
+def _zone(name: str) -> ZoneInfo:
+    return ZoneInfo(name)
+
+
+@lru_cache(maxsize=None)
+def _offset_cache(offset_seconds: int) -> timezone:
+    return timezone(timedelta(seconds=offset_seconds))
+
+
+def utc_offset(ts: float, tz_name: str = SPAIN_TZ) -> int:
+    """Offset en segundos de la zona para un instante UTC (timestamp en segundos)"""
+    return int(datetime.fromtimestamp(ts, _zone(tz_name)).utcoffset().total_seconds())
+
+
+def _to_timestamp(value, ms: bool = False) -> float:
+    """Acepta timestamp (s o ms), cadena ISO (con 'Z' o sin zona = UTC) o datetime"""
+    if isinstance(value, (int, float)):
+        return value / 1000 if ms else value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    raise TypeError(f"Valor de hora no soportado: {value!r}")
+
+
+def to_local(value, tz_name: str = SPAIN_TZ, ms: bool = False) -> datetime:
+    """Convierte un instante UTC a la hora local de la zona (datetime con offset fijo)"""
+    ts = _to_timestamp(value, ms)
+    offset = utc_offset(ts, tz_name)
+    return datetime.fromtimestamp(ts, _offset_cache(offset))
+
+
+def to_spain(value, ms: bool = False) -> datetime:
+    """Convierte un instante UTC a hora de España (Europe/Madrid)"""
+    return to_local(value, SPAIN_TZ, ms)
+
+
+def to_local_many(values, tz_name: str = SPAIN_TZ, ms: bool = False, fmt: str = None,
+                  default=None) -> list:
+    """
+    Convierte una lista completa de instantes en una llamada. Con `fmt`
+    devuelve cadenas formateadas; los valores inválidos producen `default`.
+    """
+    results = []
+    for value in values:
+        try:
+            dt = to_local(value, tz_name, ms)
+        except (TypeError, ValueError, OverflowError):
+            results.append(default)
+            continue
+        results.append(dt.strftime(fmt) if fmt else dt)
+    return results
+
+
+def to_spain_many(values, ms: bool = False, fmt: str = None, default=None) -> list:
+    return to_local_many(values, SPAIN_TZ, ms, fmt, default)
+
+
+def convert_wall_time(day: date, hhmm, from_tz: str, to_tz: str = SPAIN_TZ) -> datetime:
+    """Convierte una hora de reloj de una zona (p.ej. hora de UK) a otra zona"""
+    if isinstance(hhmm, str):
+        hhmm = datetime.strptime(hhmm.strip(), "%H:%M").time()
+    local = datetime.combine(day, hhmm).replace(tzinfo=_zone(from_tz))
+    return to_local(local, to_tz)
+
+
+def localize(naive: datetime, tz_name: str = SPAIN_TZ) -> datetime:
+    """Interpreta un datetime sin zona como hora de reloj de la zona indicada"""
+    return to_local(naive.replace(tzinfo=_zone(tz_name)), tz_name)
+
+
+def utc_time_to_spain(hhmm: time, day: date = None) -> time:
+    """Convierte una hora UTC sin fecha (se asume el día indicado o hoy) a hora de España"""
+    day = day or datetime.now(timezone.utc).date()
+    return to_spain(datetime.combine(day, hhmm)).time()
+
+
+def parse_fecha_es(fecha_str: str, hora_str: str = "", year: int = None) -> datetime:
+    """
+    Interpreta una fecha en español ("5 de octubre") y una hora ("21:30")
+    como hora de reloj de España. Lanza ValueError si la fecha no es válida.
+    """
+    partes = (fecha_str or "").strip().split(' de ')
+    if len(partes) != 2:
+        raise ValueError(f"Fecha no reconocida: {fecha_str!r}")
+    dia = int(partes[0])
+    mes = MESES.get(partes[1].strip().lower(), 6)
+    m = _HORA_RE.search(hora_str or "")
+    hora, minuto = (int(m.group(1)), int(m.group(2))) if m else (0, 0)
+    return datetime(year or datetime.now().year, mes, dia, hora, minuto)
+
+
+def parse_fechas_es(pares, year: int = None, fmt: str = '%Y-%m-%dT%H:%M:%S') -> list:
+    """Versión por lotes de parse_fecha_es; las fechas inválidas producen hoy a las 00:00"""
+    hoy = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    results = []
+    for fecha_str, hora_str in pares:
+        try:
+            dt = parse_fecha_es(fecha_str, hora_str, year)
+        except ValueError:
+            dt = hoy
+        results.append(dt.strftime(fmt) if fmt else dt)
+    return results
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Renovación de tokens de los canales de PlayTorrio
+=================================================
+Las URLs de channels_final.json llevan un token firmado con su caducidad
+(timestamp Unix) dentro:
+
+    .../index.m3u8?token=<firma>.<caducidad>.<...>
+
+En lugar de reconstruir toda la lista, este script:
+
+- lee la caducidad de cada token y monta un min-heap ordenado por ella
+- solo vuelve a pedir el reproductor de los canales que caducan dentro del
+  horizonte (TOKEN_REFRESH_HORIZON_MIN), empezando por los más urgentes
+  y con un máximo por ejecución (TOKEN_REFRESH_MAX)
+- respeta el limitador adaptativo por host (rate_limiter)
+- parchea las URLs nuevas en channels_final.json y en las listas M3U que
+  contengan las antiguas, sin tocar el resto de líneas
+- los canales que fallan se aparcan con espera exponencial guardada en
+  disco (TOKEN_REFRESH_STATE), así que unos pocos canales caídos no se
+  comen el cupo de cada ejecución
+- con --watch sigue en marcha y duerme hasta la siguiente caducidad
+
+Ningún generador publica todavía URLs con token: playtorrio_canales.py
+escribe las URLs del reproductor, así que el workflow solo se lanza a mano.
+
+Configuración por variables de entorno:
+    TOKEN_REFRESH_JSON          fichero de canales (default: channels_final.json)
+    TOKEN_REFRESH_M3U           listas a parchear, separadas por comas
+                                (default: playtorrio_canales.m3u)
+    TOKEN_REFRESH_HORIZON_MIN   margen antes de caducar en minutos (default: 30)
+    TOKEN_REFRESH_MAX           renovaciones máximas por pasada (default: 100)
+    TOKEN_REFRESH_STATE         fallos por canal (default: token_refresh_state.json)
+    TOKEN_REFRESH_BACKOFF_MIN   espera tras el primer fallo, se duplica en cada
+                                fallo seguido hasta 24 h (default: 60)
+
+Uso:
+    python token_refresher.py                 # una pasada
+    python token_refresher.py --watch 3600    # renovar durante una hora
+"""
+
+import asyncio
+import heapq
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import parse_qs, quote_plus, urlparse
+
+from rate_limiter import AdaptiveRateLimiter
+
+JSON_FILE = os.environ.get("TOKEN_REFRESH_JSON", "channels_final.json")
+M3U_FILES = [p for p in os.environ.get("TOKEN_REFRESH_M3U", "playtorrio_canales.m3u").split(",") if p]
+HORIZON = float(os.environ.get("TOKEN_REFRESH_HORIZON_MIN", "30")) * 60
+MAX_REFRESH = int(os.environ.get("TOKEN_REFRESH_MAX", "100"))
+STATE_FILE = os.environ.get("TOKEN_REFRESH_STATE", "token_refresh_state.json")
+BACKOFF = float(os.environ.get("TOKEN_REFRESH_BACKOFF_MIN", "60")) * 60
+MAX_BACKOFF = 24 * 3600
+PLAYERS_FILE = "channels_players.json"
+
+PLAYER_URL = "https://cdn-live.tv/api/v1/channels/player/?name={name}&code={code}&user=cdnlivetv&plan=free"
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
+    'Referer': 'https://iptv.playtorrio.xyz/',
+    'Accept': 'text/html,application/xhtml+xml,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+# URL del stream con token dentro de la página del reproductor (a veces con \/ escapadas)
+STREAM_RE = re.compile(r'https?:(?:\\?/){2}[^"\'\s<>]+?index\.m3u8\?token=[0-9a-fA-F.]+')
+SLUG_RE = re.compile(r'/channels/([a-z]{2})-([^/]+)/index\.m3u8')
+
+
+def token_expiry(url: str):
+    """Caducidad (timestamp Unix) del token de la URL; None si no tiene"""
+    token = parse_qs(urlparse(url).query).get("token", [""])[0]
+    for part in token.split(".")[1:]:
+        if len(part) == 10 and part.isdigit():
+            return int(part)
+    return None
+
+
+def player_url_for(channel: dict, players: dict) -> str:
+    """URL del reproductor del canal: la de channels_players.json o la deducida del stream"""
+    if channel.get("player_url"):
+        return channel["player_url"]
+    if channel.get("name") in players:
+        return players[channel["name"]]
+    match = SLUG_RE.search(channel.get("stream_url", ""))
+    if not match:
+        return ""
+    code, slug = match.groups()
+    return PLAYER_URL.format(name=quote_plus(slug.replace("-", " ")), code=code)
+
+
+def channel_key(channel: dict, index: int) -> str:
+    return channel.get("name") or f"#{index}"
+
+
+def extract_stream_url(html: str):
+    """Primera URL .m3u8 con token de la página del reproductor"""
+    match = STREAM_RE.search(html)
+    return match.group(0).replace("\\/", "/") if match else None
+
+
+class TokenRefresher:
+    """Min-heap de canales por caducidad del token y renovación de los próximos a caducar"""
+
+    def __init__(self, json_path: str = JSON_FILE, m3u_paths=None,
+                 horizon: float = HORIZON, max_refresh: int = MAX_REFRESH,
+                 state_path: str = STATE_FILE, backoff: float = BACKOFF):
+        self.json_path = json_path
+        self.m3u_paths = M3U_FILES if m3u_paths is None else m3u_paths
+        self.horizon = horizon
+        self.max_refresh = max_refresh
+        self.state_path = state_path
+        self.backoff = backoff
+        self.channels = json.loads(Path(json_path).read_text(encoding="utf-8"))
+        self.players = self._load_players()
+        self.failures = self._load_failures()
+        self.limiter = AdaptiveRateLimiter()
+        self.stats = {"refreshed": 0, "failed": 0, "no_token": 0, "backoff": 0}
+        self.heap = []
+        now = time.time()
+        for index, channel in enumerate(self.channels):
+            expiry = token_expiry(channel.get("stream_url", ""))
+            if expiry is None:
+                self.stats["no_token"] += 1
+                continue
+            # Un canal en espera entra en el heap cuando termina su espera
+            retry_at = self.failures.get(channel_key(channel, index), {}).get("retry_at", 0)
+            if retry_at > now:
+                self.stats["backoff"] += 1
+                expiry = max(expiry, retry_at + self.horizon)
+            self.heap.append((expiry, index))
+        heapq.heapify(self.heap)
+
+    def _load_failures(self) -> dict:
+        if not self.state_path:
+            return {}
+        try:
+            return json.loads(Path(self.state_path).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        """Guarda los fallos pendientes (solo los de canales que siguen en la lista)"""
+        if not self.state_path:
+            return
+        names = {channel_key(ch, i) for i, ch in enumerate(self.channels)}
+        state = {k: v for k, v in self.failures.items() if k in names}
+        tmp = self.state_path + ".tmp"
+        Path(tmp).write_text(json.dumps(state, indent=2, sort_keys=True, ensure_ascii=False),
+                             encoding="utf-8")
+        os.replace(tmp, self.state_path)
+
+    def _record_failure(self, index: int, now: float) -> float:
+        """Anota un fallo y devuelve cuándo se puede volver a intentar"""
+        key = channel_key(self.channels[index], index)
+        count = self.failures.get(key, {}).get("failures", 0) + 1
+        retry_at = now + min(self.backoff * 2 ** (count - 1), MAX_BACKOFF)
+        self.failures[key] = {"failures": count, "retry_at": int(retry_at)}
+        return retry_at
+
+    @staticmethod
+    def _load_players() -> dict:
+        try:
+            players = json.loads(Path(PLAYERS_FILE).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return {ch["name"]: ch["player_url"] for ch in players if ch.get("player_url")}
+
+    def due(self, now: float = None) -> list:
+        """Saca del heap los canales que caducan dentro del horizonte (los más urgentes primero)"""
+        limit = (now or time.time()) + self.horizon
+        due = []
+        while self.heap and self.heap[0][0] <= limit and len(due) < self.max_refresh:
+            due.append(heapq.heappop(self.heap)[1])
+        return due
+
+    def next_expiry(self):
+        return self.heap[0][0] if self.heap else None
+
+    async def _fetch(self, session, index: int):
+        channel = self.channels[index]
+        player_url = player_url_for(channel, self.players)
+        if not player_url:
+            return index, None
+        await self.limiter.acquire(player_url)
+        try:
+            async with session.get(player_url) as response:
+                self.limiter.record(player_url, response.status, response.headers.get("Retry-After"))
+                if response.status != 200:
+                    return index, None
+                return index, extract_stream_url(await response.text())
+        except Exception as e:
+            self.limiter.record(player_url, None)
+            print(f"⚠️  Error renovando {channel.get('name')}: {e}")
+            return index, None
+
+    async def refresh(self, indices: list) -> dict:
+        """Renueva los canales indicados; retorna {url antigua: url nueva}"""
+        import aiohttp
+
+        replaced = {}
+        timeout = aiohttp.ClientTimeout(total=20)
+        async with aiohttp.ClientSession(headers=HEADERS, timeout=timeout) as session:
+            results = await asyncio.gather(*(self._fetch(session, i) for i in indices))
+
+        now = time.time()
+        for index, new_url in results:
+            channel = self.channels[index]
+            old_url = channel.get("stream_url", "")
+            expiry = token_expiry(new_url) if new_url else None
+            if expiry is None:
+                self.stats["failed"] += 1
+                # Vuelve al heap cuando termine su espera
+                retry_at = self._record_failure(index, now)
+                heapq.heappush(self.heap, (retry_at + self.horizon, index))
+                continue
+            self.failures.pop(channel_key(channel, index), None)
+            channel["stream_url"] = new_url
+            replaced[old_url] = new_url
+            heapq.heappush(self.heap, (expiry, index))
+            self.stats["refreshed"] += 1
+        return replaced
+
+    def patch_files(self, replaced: dict):
+        """Escribe el JSON y sustituye en las M3U solo las líneas con URLs renovadas"""
+        if not replaced:
+            return
+        tmp = self.json_path + ".tmp"
+        Path(tmp).write_text(json.dumps(self.channels, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.json_path)
+        print(f"💾 {len(replaced)} URLs actualizadas en {self.json_path}")
+
+        for path in self.m3u_paths:
+            if not os.path.exists(path):
+                continue
+            lines = Path(path).read_text(encoding="utf-8").split("\n")
+            patched = 0
+            for i, line in enumerate(lines):
+                new_url = replaced.get(line.strip())
+                if new_url:
+                    lines[i] = new_url
+                    patched += 1
+            if patched:
+                tmp = path + ".tmp"
+                Path(tmp).write_text("\n".join(lines), encoding="utf-8")
+                os.replace(tmp, path)
+                print(f"💾 {patched} URLs actualizadas en {path}")
+
+    async def run_once(self) -> int:
+        """Una pasada: renueva lo que caduca dentro del horizonte y parchea los ficheros"""
+        due = self.due()
+        if not due:
+            return 0
+        print(f"🔑 Renovando {len(due)} canales que caducan en menos de {self.horizon / 60:.0f} min...")
+        self.patch_files(await self.refresh(due))
+        return len(due)
+
+    async def watch(self, duration: float):
+        """Pasadas sucesivas durante duration segundos, durmiendo hasta la siguiente caducidad"""
+        end = time.time() + duration
+        while time.time() < end:
+            await self.run_once()
+            expiry = self.next_expiry()
+            if expiry is None:
+                break
+            wake = max(expiry - self.horizon, time.time() + 60)
+            if wake >= end:
+                break
+            print(f"💤 Siguiente renovación a las {datetime.fromtimestamp(wake):%H:%M:%S}")
+            await asyncio.sleep(wake - time.time())
+
+    def print_summary(self):
+        s = self.stats
+        expiry = self.next_expiry()
+        following = f"{datetime.fromtimestamp(expiry):%Y-%m-%d %H:%M}" if expiry else "-"
+        print(f"🔑 Tokens: {s['refreshed']} renovados, {s['failed']} fallidos, "
+              f"{s['backoff']} en espera por fallos previos, {s['no_token']} sin token; "
+              f"próxima caducidad: {following}")
+        self.limiter.print_stats()
+
+
+def main(argv):
+    refresher = TokenRefresher()
+    if len(argv) > 2 and argv[1] == "--watch":
+        asyncio.run(refresher.watch(float(argv[2])))
+    else:
+        asyncio.run(refresher.run_once())
+    refresher.print_summary()
+    refresher.save()
+    refresher.limiter.save()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
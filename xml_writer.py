@@ -0,0 +1,150 @@
+"""
+Escritura incremental de XML
+============================
+Los generadores construían el árbol completo con ElementTree, lo
+serializaban, lo volvían a analizar con minidom y lo imprimían con sangría
+(tres copias del documento en memoria y una pasada DOM), o lo sangraban con
+una función indent() recursiva copiada en varios scripts.
+
+XMLWriter escribe cada elemento en el fichero en cuanto se genera, ya
+sangrado, sobre xml.sax.saxutils.XMLGenerator: la memoria no depende del
+tamaño del documento.
+
+Compatibilidad byte a byte opcional (compat=):
+    None            declaración de XMLGenerator, vacíos <a/> (por defecto)
+    "etree"         igual que indent() + ElementTree.write(xml_declaration=True)
+    "etree.indent"  igual que ElementTree.indent() + write(xml_declaration=True)
+    "minidom"       igual que minidom.toprettyxml(indent="  ", encoding="utf-8")
+
+Uso:
+    with write_xml("salida.xml", "eventos", {"total": "3"}, compat="etree") as xml:
+        with xml.element("evento", {"id": "1"}):
+            xml.leaf("nombre", "A vs B")
+"""
+
+import os
+from contextlib import contextmanager
+from xml.sax.saxutils import XMLGenerator, escape
+
+ETREE_ATTR = {'"': "&quot;", "\r": "&#13;", "\n": "&#10;", "\t": "&#09;"}
+
+# (declaración, cierre de vacío, entidades extra del texto, entidades extra de
+# atributos, salto de línea final: siempre / solo si la raíz tiene hijos / nunca)
+STYLES = {
+    None: ('<?xml version="1.0" encoding="{encoding}"?>', "/>", {},
+           {'"': "&quot;", "\r": "&#13;", "\n": "&#10;", "\t": "&#9;"}, "always"),
+    "etree": ("<?xml version='1.0' encoding='{encoding}'?>", " />", {}, ETREE_ATTR, "children"),
+    "etree.indent": ("<?xml version='1.0' encoding='{encoding}'?>", " />", {}, ETREE_ATTR, "never"),
+    "minidom": ('<?xml version="1.0" encoding="{encoding}"?>', "/>", {'"': "&quot;"},
+                {'"': "&quot;"}, "always"),
+}
+
+
+class XMLWriter(XMLGenerator):
+    """XMLGenerator que sangra los elementos a medida que se escriben"""
+
+    def __init__(self, out, compat: str = None, indent: str = "  ", encoding: str = "utf-8",
+                 declaration=True):
+        super().__init__(out, encoding, short_empty_elements=True)
+        self.compat = compat
+        self.indent = indent
+        (template, self._empty, self._text_entities, self._attr_entities,
+         self._final_newline) = STYLES[compat]
+        if declaration is True:
+            declaration = template.format(encoding=encoding)
+        self.declaration = declaration
+        self._stack = []
+
+    # Métodos de XMLGenerator con el formato del estilo elegido
+
+    def startDocument(self):
+        if self.declaration:
+            self._write(self.declaration + "\n")
+
+    def startElement(self, name, attrs):
+        self._finish_pending_start_element()
+        self._write("<" + name)
+        for key, value in attrs.items():
+            self._write(' %s="%s"' % (key, escape(value, self._attr_entities)))
+        self._pending_start_element = True
+
+    def endElement(self, name):
+        if self._pending_start_element:
+            self._write(self._empty)
+            self._pending_start_element = False
+        else:
+            self._write("</%s>" % name)
+
+    def characters(self, content):
+        if self.compat == "minidom":
+            # minidom recibía el texto ya normalizado por el analizador
+            content = content.replace("\r\n", "\n").replace("\r", "\n")
+        if content:
+            self._finish_pending_start_element()
+            self._write(escape(content, self._text_entities))
+
+    # Escritura con sangría
+
+    def _open_child(self):
+        if self._stack:
+            self._stack[-1][1] = True
+            self._finish_pending_start_element()
+            self._write("\n" + self.indent * len(self._stack))
+        elif self.declaration is not None:
+            self.startDocument()
+            self.declaration = None
+
+    def start(self, tag: str, attrs: dict = None):
+        """Abre un elemento con hijos"""
+        self._open_child()
+        self.startElement(tag, attrs or {})
+        self._stack.append([tag, False])
+
+    def end(self):
+        """Cierra el último elemento abierto"""
+        tag, has_children = self._stack.pop()
+        if has_children:
+            self._write("\n" + self.indent * len(self._stack))
+        self.endElement(tag)
+        if not self._stack and (self._final_newline == "always"
+                                or self._final_newline == "children" and has_children):
+            self._write("\n")
+
+    @contextmanager
+    def element(self, tag: str, attrs: dict = None):
+        self.start(tag, attrs)
+        yield self
+        self.end()
+
+    def leaf(self, tag: str, text: str = None, attrs: dict = None):
+        """Elemento sin hijos; sin texto se escribe vacío (<a/>)"""
+        self._open_child()
+        self.startElement(tag, attrs or {})
+        if text:
+            self.characters(text)
+        self.endElement(tag)
+
+    def close(self):
+        while self._stack:
+            self.end()
+        self.endDocument()
+
+
+@contextmanager
+def write_xml(path: str, root: str, attrs: dict = None, **options):
+    """
+    Escribe el documento en path de forma atómica (fichero temporal +
+    os.replace); la raíz se abre al entrar y se cierra al salir
+    """
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "wb") as f:
+            writer = XMLWriter(f, **options)
+            writer.start(root, attrs)
+            yield writer
+            writer.close()
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise